@@ -0,0 +1,102 @@
+# ==========================================
+# Benchmark: tiến độ hạn mức
+#   legacy  = 1 truy vấn SUM trên transactions cho mỗi hạn mức (cách cũ)
+#   set     = budget_progress_df (1 truy vấn trên daily_totals cho mọi hạn mức)
+# Chạy: python benchmarks/bench_budget_progress.py [--sizes 10 100 1000] [--repeat 5]
+# ==========================================
+
+import argparse, datetime as dt, os, random, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pandas as pd
+from expense_app import db, schema
+from expense_app.aggregates import budget_progress_df
+from expense_app.db import db_stats, fetchone, get_df, get_pool, transaction
+from expense_app.helpers import TX_KINDS, day_range, now_created, start_months_back
+
+
+def legacy_budget_progress_df(uid, d1, d2):
+    """Cách cũ: lặp từng hạn mức, mỗi hạn mức 1 lần SUM trên transactions."""
+    b = get_df("""SELECT b.id, b.category_id, c.name AS category, b.amount, b.start_date, b.end_date
+                      FROM budgets b JOIN categories c ON c.id=b.category_id
+                      WHERE b.user_id=? AND b.end_date>=? AND b.start_date<=?
+                      ORDER BY b.start_date DESC""", (uid, str(d1), str(d2)))
+    if b.empty:
+        return b
+    rows = []
+    for _, r in b.iterrows():
+        s = max(dt.date.fromisoformat(str(r["start_date"])), d1)
+        e = min(dt.date.fromisoformat(str(r["end_date"])), d2)
+        spent = fetchone("""SELECT COALESCE(SUM(amount),0) s FROM transactions
+                                WHERE user_id=? AND kind=0 AND category_id=?
+                                  AND occurred_at>=? AND occurred_at<?""",
+                             (uid, int(r["category_id"]), *day_range(s, e)))
+        used = int(spent["s"] or 0)
+        limit = int(r["amount"])
+        rows.append({"Danh mục": r["category"], "Đã dùng": used, "Hạn mức": limit,
+                     "%": 0.0 if limit <= 0 else 100.0 * used / limit})
+    return pd.DataFrame(rows)
+
+
+def make_user(n_budgets, n_categories=50, n_tx=20_000, seed=42):
+    """User tổng hợp: n_categories danh mục chi, n_tx giao dịch trong 2 năm, n_budgets hạn mức theo tháng."""
+    rng = random.Random(seed)
+    now = now_created()
+    with transaction() as c:
+        uid = c.execute("INSERT INTO users(email,password_hash,created_at,onboarded) VALUES(?,?,?,1)",
+                        (f"bench{n_budgets}@expense.local", "-", now)).lastrowid
+        acc = c.execute("INSERT INTO accounts(user_id,name,type,created_at) VALUES(?,?,?,?)",
+                        (uid, "Tiền mặt", "cash", now)).lastrowid
+        cats = [c.execute("INSERT INTO categories(user_id,name,type) VALUES(?,?,?)",
+                          (uid, f"Danh mục {i}", "expense")).lastrowid for i in range(n_categories)]
+        start = dt.datetime(2023, 1, 1)
+        c.executemany("""INSERT INTO transactions(user_id,account_id,kind,category_id,amount,occurred_at,created_at)
+                         VALUES(?,?,?,?,?,?,?)""",
+                      [(uid, acc, TX_KINDS["expense"], rng.choice(cats), rng.randint(10_000, 2_000_000),
+                        (start + dt.timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))).strftime("%Y-%m-%d %H:%M"),
+                        now) for _ in range(n_tx)])
+        budgets = []
+        for i in range(n_budgets):
+            first = start_months_back(dt.date(2024, 12, 1), i // n_categories + 1)
+            last = (first.replace(day=28) + dt.timedelta(days=4)).replace(day=1) - dt.timedelta(days=1)
+            budgets.append((uid, cats[i % n_categories], rng.randint(1, 10) * 1_000_000, str(first), str(last)))
+        c.executemany("INSERT INTO budgets(user_id,category_id,amount,start_date,end_date) VALUES(?,?,?,?,?)", budgets)
+    return uid
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_budget_")
+    db.DB_PATH = os.path.join(tmp, "bench.db")
+    schema.ENABLE_DEMO = False
+    schema.init_db()
+
+    d1, d2 = dt.date(2023, 1, 1), dt.date(2024, 12, 31)
+    print(f"{'budgets':>8} | {'legacy (ms)':>12} | {'set (ms)':>10} | {'speedup':>8} | stmts legacy/set")
+    for n in args.sizes:
+        uid = make_user(n)
+        set_based = budget_progress_df.__wrapped__   # bỏ qua cache dùng chung
+        a, b = legacy_budget_progress_df(uid, d1, d2), set_based(uid, d1, d2)
+        assert len(a) == len(b) and (a["Đã dùng"].round(2).values == b["Đã dùng"].round(2).values).all()
+        pool = get_pool()
+        pool.reset_stats(); legacy_budget_progress_df(uid, d1, d2); s_old = db_stats()["statements"]
+        pool.reset_stats(); set_based(uid, d1, d2); s_new = db_stats()["statements"]
+        t_old = timeit(lambda: legacy_budget_progress_df(uid, d1, d2), args.repeat)
+        t_new = timeit(lambda: set_based(uid, d1, d2), args.repeat)
+        print(f"{n:>8} | {t_old*1000:>12.2f} | {t_new*1000:>10.2f} | {t_old/t_new:>7.1f}x | {s_old}/{s_new}")
+
+
+if __name__ == "__main__":
+    main()
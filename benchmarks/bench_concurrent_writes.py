@@ -0,0 +1,92 @@
+# ==========================================
+# Benchmark: nhiều session cùng thêm giao dịch
+#   legacy = mỗi lệnh ghi mở connection riêng + commit ngay (journal mặc định, busy timeout ngắn)
+#   writer = add_transaction qua thread ghi duy nhất (WAL, gom commit, ack sau khi xuống đĩa)
+# Chạy: python benchmarks/bench_concurrent_writes.py [--threads 1 8 32] [--writes 200]
+# ==========================================
+
+import argparse, datetime as dt, os, sqlite3, statistics, sys, tempfile, threading, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from expense_app import db, schema
+from expense_app.db import fetchone, get_pool, writer_stats
+from expense_app.queries import add_transaction, create_user
+
+INSERT = """INSERT INTO transactions(user_id,account_id,type,category_id,amount,currency,occurred_at,created_at)
+            VALUES(?,?,?,?,?,?,?,?)"""
+
+
+def legacy_add(path, uid, acc):
+    c = sqlite3.connect(path, timeout=0.1)       # journal mặc định (DELETE), chờ khoá rất ngắn
+    try:
+        c.execute(INSERT, (uid, acc, "expense", None, 1000, "VND", "2024-01-01 10:00", dt.datetime.now().isoformat()))
+        c.commit()
+    finally:
+        c.close()
+
+
+def run(n_threads, n_writes, fn):
+    """n_threads thread, mỗi thread n_writes lệnh; trả về (giây, [độ trễ ms], số lỗi)."""
+    lat, errors, lock = [], [0], threading.Lock()
+    start = threading.Barrier(n_threads)
+
+    def worker():
+        start.wait()
+        mine = []
+        for _ in range(n_writes):
+            t = time.perf_counter()
+            try:
+                fn()
+            except sqlite3.OperationalError:
+                with lock: errors[0] += 1
+            mine.append((time.perf_counter() - t) * 1000)
+        with lock: lat.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    t0 = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return time.perf_counter() - t0, lat, errors[0]
+
+
+def p95(xs):
+    return sorted(xs)[int(0.95 * (len(xs) - 1))] if xs else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--writes", type=int, default=200, help="Số lệnh ghi mỗi thread")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_writes_")
+    legacy_path = os.path.join(tmp, "legacy.db")
+    sqlite3.connect(legacy_path).executescript(
+        "CREATE TABLE transactions(id INTEGER PRIMARY KEY, user_id, account_id, type, category_id, amount,"
+        " currency, occurred_at, created_at);")
+    db.DB_PATH = os.path.join(tmp, "writer.db")
+    schema.ENABLE_DEMO = False
+    schema.init_db()
+    create_user("bench@expense.local", "x")
+    uid = int(fetchone("SELECT id FROM users WHERE email='bench@expense.local'")["id"])
+    acc = int(fetchone("SELECT id FROM accounts WHERE user_id=? ORDER BY id", (uid,))["id"])
+
+    print(f"{'threads':>7} | {'mode':<6} | {'writes/s':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'locked':>6} | nhóm TB")
+    for n in args.threads:
+        for mode, fn in (("legacy", lambda: legacy_add(legacy_path, uid, acc)),
+                         ("writer", lambda: add_transaction(uid, acc, "expense", None, 1000, None,
+                                                            "2024-01-01 10:00"))):
+            before = writer_stats()
+            secs, lat, errors = run(n, args.writes, fn)
+            after = writer_stats()
+            groups = after["groups"] - before["groups"]
+            batch = (after["committed"] - before["committed"]) / groups if mode == "writer" and groups else None
+            print(f"{n:>7} | {mode:<6} | {n * args.writes / secs:>9.0f} | {statistics.median(lat):>7.2f} | "
+                  f"{p95(lat):>7.2f} | {errors:>6} | {f'{batch:.1f}' if batch else '-'}")
+    print(writer_stats())
+    get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# ==========================================
+# Benchmark: helper định dạng / bỏ dấu trên DataFrame
+#   legacy = Series.map(hàm scalar) trên từng dòng (cách cũ)
+#   vec    = format_vnd / strip_accents_lower / type_labels_vi nhận thẳng Series
+# Chạy: python benchmarks/bench_formatting.py [--sizes 1000 100000 1000000] [--repeat 3]
+# ==========================================
+
+import argparse, sys, time, unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import numpy as np, pandas as pd
+from expense_app.helpers import TYPE_LABELS_VN, _type_key_series, format_vnd, strip_accents_lower, type_labels_vi
+
+CATEGORIES = ["Ăn uống", "Cà phê", "Đi lại", "Mua sắm", "Giải trí", "Tiền học", "Lương", "Thưởng", "Bán đồ cũ"]
+
+
+def legacy_format_vnd(n):
+    try:
+        return f"{float(n):,.0f}".replace(",", ".")
+    except Exception:
+        return str(n)
+
+
+def legacy_strip_accents_lower(s):
+    if s is None:
+        return ""
+    s = unicodedata.normalize("NFD", str(s))
+    return "".join(ch for ch in s if unicodedata.category(ch) != "Mn").lower()
+
+
+def legacy_type_key(x) -> int:
+    x = str(x).replace("🟢", "").replace("🔴", "").strip()
+    x_no = legacy_strip_accents_lower(x)
+    return 0 if "chi tieu" in x_no else 1 if "thu nhap" in x_no else 2
+
+
+def make_frame(n, seed=42):
+    """n giao dịch giả: số tiền tròn nghìn (lặp nhiều như dữ liệu thật) + số tiền gần như không lặp, danh mục, loại, ghi chú."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "amount": (rng.integers(1, 5_000, n) * 1_000).astype(float),
+        "amount_distinct": rng.integers(-10**12, 10**12, n),
+        "category": rng.choice(CATEGORIES, n),
+        "type": rng.choice(["expense", "income"], n, p=[0.8, 0.2]),
+        "notes": pd.Series(rng.choice(CATEGORIES, n)) + " #" + pd.Series(rng.integers(0, 500, n)).astype(str),
+    })
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best
+
+
+def cases(df):
+    labels = df["type"].map(TYPE_LABELS_VN)
+    return [
+        ("format_vnd",
+         lambda: df["amount"].map(legacy_format_vnd),
+         lambda: format_vnd(df["amount"])),
+        ("format_vnd distinct",
+         lambda: df["amount_distinct"].map(legacy_format_vnd),
+         lambda: format_vnd(df["amount_distinct"])),
+        ("strip_accents_lower",
+         lambda: df["notes"].map(legacy_strip_accents_lower),
+         lambda: strip_accents_lower(df["notes"])),
+        ("type label",
+         lambda: df["type"].map({"expense": "Chi tiêu", "income": "Thu nhập"}).fillna(df["type"]),
+         lambda: type_labels_vi(df["type"])),
+        ("type sort key",
+         lambda: labels.astype(str).map(legacy_type_key),
+         lambda: _type_key_series(labels)),
+    ]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'rows':>9} | {'helper':<20} | {'legacy (ms)':>12} | {'vec (ms)':>10} | {'speedup':>8}")
+    for n in args.sizes:
+        df = make_frame(n)
+        for name, old, new in cases(df):
+            assert list(old().astype(str)) == list(new().astype(str)), name
+            t_old, t_new = timeit(old, args.repeat), timeit(new, args.repeat)
+            print(f"{n:>9} | {name:<20} | {t_old*1000:>12.2f} | {t_new*1000:>10.2f} | {t_old/t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
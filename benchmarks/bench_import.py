@@ -0,0 +1,84 @@
+# ==========================================
+# Benchmark: nhập CSV hàng loạt (import_transactions)
+#   dòng/s   = tổng (đọc + tra cứu + ghi) / số dòng; "khoá ghi" = thời gian giữ transaction ghi
+#   chờ ghi  = độ trễ lớn nhất của add_transaction chạy song song (thread ghi) trong lúc nhập
+# 3 lượt trên cùng DB: file 1 vào bảng trống (index dựng lại sau khi chèn), file 2 vào bảng đã có dữ liệu,
+# nhập lại file 1 (toàn bộ trùng, không ghi). File CSV sinh với seed cố định: ghi chú + 0–2 thẻ / dòng.
+# Chạy: python benchmarks/bench_import.py [--rows 100000] [--repeat 3]
+# ==========================================
+
+import argparse, os, random, sys, tempfile, threading, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from expense_app import db, schema
+from expense_app.db import fetchone, get_pool
+from expense_app.importer import import_transactions
+from expense_app.maintenance import check_daily_totals
+from expense_app.queries import add_transaction, create_user
+
+TAGS = ["Du lịch", "công tác", "TẾT", "quà", "gia đình", "  du lich ", "Quà"]
+
+
+def write_csv(path, rows, seed):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Ngày,Loại,Số tiền,Ghi chú,Thẻ\n")
+        for i in range(rows):
+            tags = ", ".join(rng.sample(TAGS, rng.randint(0, 2)))
+            f.write(f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+                    f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d},"
+                    f"{'Chi tiêu' if rng.random() < .8 else 'Thu nhập'},{rng.randint(1, 5000) * 1000},"
+                    f"ghi chú {seed}-{i},\"{tags}\"\n")
+
+
+def run_import(path, uid, acc):
+    """Nhập path, song song 1 thread thêm giao dịch liên tục; trả về (report, độ trễ ghi lớn nhất ms)."""
+    stop, lat = threading.Event(), [0.0]
+
+    def writer():
+        while not stop.is_set():
+            t = time.perf_counter()
+            add_transaction(uid, acc, "expense", None, 1000, None, "2024-01-01 10:00")
+            lat[0] = max(lat[0], (time.perf_counter() - t) * 1000)
+            time.sleep(0.005)
+
+    th = threading.Thread(target=writer)
+    th.start()
+    try:
+        with open(path, "rb") as fh:
+            r = import_transactions(uid, fh, "csv", default_account_id=acc)
+    finally:
+        stop.set(); th.join()
+    return r, lat[0]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=3, help="Số lần chạy lại cả 3 lượt trên DB mới")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_import_")
+    files = [os.path.join(tmp, f"f{i}.csv") for i in (1, 2)]
+    for i, f in enumerate(files, 1):
+        write_csv(f, args.rows, i)
+
+    print(f"{'lượt':<11} | {'dòng':>8} | {'đã ghi':>8} | {'dòng/s':>8} | {'khoá ghi (s)':>12} | {'chờ ghi (ms)':>12}")
+    for k in range(args.repeat):
+        db.DB_PATH = os.path.join(tmp, f"run{k}.db")
+        schema.ENABLE_DEMO = False
+        schema.init_db()
+        create_user("bench@expense.local", "x")
+        uid = int(fetchone("SELECT id FROM users WHERE email='bench@expense.local'")["id"])
+        acc = int(fetchone("SELECT id FROM accounts WHERE user_id=? ORDER BY id", (uid,))["id"])
+        for name, f in (("bảng trống", files[0]), ("bảng có sẵn", files[1]), ("nhập lại", files[0])):
+            r, wait_ms = run_import(f, uid, acc)
+            print(f"{name:<11} | {r['rows']:>8,} | {r['inserted']:>8,} | {r['rows_per_sec']:>8,.0f} | "
+                  f"{r['write_seconds']:>12.2f} | {wait_ms:>12.0f}")
+        assert check_daily_totals() == 0, "daily_totals lệch sau khi nhập"
+        get_pool().close()
+
+
+if __name__ == "__main__":
+    main()
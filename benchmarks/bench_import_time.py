@@ -0,0 +1,59 @@
+# ==========================================
+# Benchmark: thời gian import lúc khởi động lạnh (python -X importtime)
+#   core   = db/queries/aggregates/schema/export/importer (dùng được từ CLI/worker, không kéo streamlit)
+#   ui     = expense_app.ui (streamlit + pandas; altair chỉ nạp khi vẽ biểu đồ đầu tiên)
+#   legacy = streamlit + pandas + altair: cái giá file đơn cũ phải trả ngay khi import
+# Chạy: python benchmarks/bench_import_time.py [--repeat 5]
+# ==========================================
+
+import argparse, os, statistics, subprocess, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TARGETS = {
+    "core":   "import expense_app.aggregates, expense_app.export, expense_app.importer, "
+              "expense_app.queries, expense_app.schema",
+    "ui":     "import expense_app.ui",
+    "legacy": "import streamlit, pandas, altair",
+}
+HEAVY = ("streamlit", "pandas", "numpy", "altair", "xlsxwriter", "openpyxl")
+
+
+def import_time(stmt: str) -> tuple[float, set[str]]:
+    """Chạy stmt trong process mới; trả về (tổng thời gian import, ms) và các gói nặng đã bị nạp."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", stmt],
+                       capture_output=True, text=True, env=env, cwd=ROOT, check=True)
+    total, loaded = 0, set()
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  ") and name.strip() != "site":   # cấp ngoài cùng; site = khởi động interpreter
+            total += int(cumulative)
+        top = name.strip().split(".")[0]
+        if top in HEAVY:
+            loaded.add(top)
+    return total / 1000.0, loaded
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    for stmt in TARGETS.values():   # làm nóng page cache của ổ đĩa / .pyc
+        import_time(stmt)
+    print(f"{'target':<8} | {'median (ms)':>11} | {'min (ms)':>9} | nạp gói nặng")
+    results = {}
+    for name, stmt in TARGETS.items():
+        runs = [import_time(stmt) for _ in range(args.repeat)]
+        times = [t for t, _ in runs]
+        results[name] = statistics.median(times)
+        print(f"{name:<8} | {results[name]:>11.1f} | {min(times):>9.1f} | {', '.join(sorted(runs[0][1])) or '-'}")
+    print(f"core nhanh hơn legacy {results['legacy'] / results['core']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
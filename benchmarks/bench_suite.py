@@ -0,0 +1,144 @@
+# ==========================================
+# Benchmark tổng: các hàm nóng trên DB tổng hợp 10k / 1M / 10M giao dịch (datagen.py, seed cố định)
+#   - mỗi cỡ dữ liệu 1 file DB, giữ lại trong --db-dir để lần sau dùng lại (10M sinh mất vài phút)
+#   - đo bản không cache (__wrapped__), best + median của --repeat lần
+#   - ghi JSON (kèm commit, phiên bản Python/SQLite) để so sánh giữa các commit: --compare cũ.json
+# Chạy: python benchmarks/bench_suite.py [--rows 10000 1000000 10000000] [--repeat 5]
+#                                        [--db-dir /tmp/expense_bench] [--out kết_quả.json] [--compare cũ.json]
+# ==========================================
+
+import argparse, datetime as dt, json, os, platform, sqlite3, statistics, subprocess, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import datagen
+from expense_app import aggregates, dashboard, db, export, queries, schema
+from expense_app.db import fetchone, get_df
+from expense_app.helpers import start_months_back, start_weeks_back, year_window
+
+USERS, YEARS, SEED = 4, 3, 42
+
+
+def dataset(rows: int, db_dir: str) -> tuple[str, dict]:
+    """DB có ~rows giao dịch (sinh nếu chưa có); trả về (đường dẫn, thông tin)."""
+    path = os.path.join(db_dir, f"bench_{rows}_u{USERS}_y{YEARS}_s{SEED}.db")
+    info = {"rows": None, "gen_seconds": None, "reused": os.path.exists(path)}
+    if not info["reused"]:
+        print(f"# sinh {rows:,} giao dịch -> {path}", file=sys.stderr)
+        g = datagen.generate(path, USERS, YEARS, datagen.per_day_for(rows, USERS, YEARS), SEED,
+                             progress=lambda done, total: print(f"\r  {done:,}/{total:,}", end="", file=sys.stderr))
+        print(file=sys.stderr)
+        info["gen_seconds"] = g["seconds"]
+    db.DB_PATH = path
+    schema.ENABLE_DEMO = False
+    schema.init_db(path)                 # DB cũ sinh từ commit trước: chạy migration còn thiếu
+    info["rows"] = int(fetchone("SELECT COUNT(*) n FROM transactions")["n"])
+    return path, info
+
+
+def cases(uid):
+    """(tên, hàm) — khoảng ngày giống Trang chủ/Báo cáo: tháng cuối, 12 tuần/tháng, 5 năm."""
+    end = datagen.END
+    m1 = end.replace(day=1)
+    acc_ids = [int(x) for x in get_df("SELECT id FROM accounts WHERE user_id=?", (uid,))["id"]]
+    windows = {"day": (m1, end), "week": (start_weeks_back(end, 12), end),
+               "month": (start_months_back(end, 12), end), "year": year_window(end, 5)}
+    out = [
+        ("list_transactions[month]", lambda: queries.list_transactions.__wrapped__(uid, m1, end)),
+        ("list_transactions_page", lambda: queries.list_transactions_page.__wrapped__(uid, m1, end)),
+        ("period_sum[month]", lambda: aggregates.period_sum.__wrapped__(uid, m1, end)),
+        ("period_sum[year]", lambda: aggregates.period_sum.__wrapped__(uid, dt.date(end.year, 1, 1), end)),
+    ]
+    out += [(f"query_agg_expense[{m}]", lambda m=m, w=w: aggregates.query_agg_expense.__wrapped__(uid, *w, m))
+            for m, w in windows.items()]
+    out += [
+        ("pie_by_category (category_expense_df)",
+         lambda: aggregates.category_expense_df.__wrapped__(uid, m1, end, True)),
+        ("category_subtree_totals[year]",
+         lambda: aggregates.category_subtree_totals.__wrapped__(uid, dt.date(end.year, 1, 1), end)),
+        ("top_merchants_df[year]",
+         lambda: aggregates.top_merchants_df.__wrapped__(uid, dt.date(end.year, 1, 1), end)),
+        ("budget_progress_df", lambda: aggregates.budget_progress_df.__wrapped__(uid, m1, end)),
+        ("dashboard_snapshot", lambda: dashboard.load_dashboard_snapshot.__wrapped__(
+            uid, *dashboard.dashboard_window(m1, end))),
+        ("current_balance[all accounts]", lambda: [queries.current_balance(uid, a) for a in acc_ids]),
+        ("build_category_tree", lambda: queries.build_category_tree(uid, "expense")),
+        ("export_csv[month]", lambda: _export_devnull(uid, m1, end)),
+    ]
+    return out
+
+
+def _export_devnull(uid, d1, d2):
+    with open(os.devnull, "wb") as fh:
+        return export.export_csv(uid, d1, d2, fh)
+
+
+def measure(fn, repeat):
+    fn()                                  # làm nóng page cache / statement cache
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); times.append(time.perf_counter() - t)
+    return min(times) * 1000, statistics.median(times) * 1000
+
+
+def meta(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "time": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "users": USERS, "years": YEARS, "seed": SEED,
+            "repeat": args.repeat}
+
+
+def compare(results, old_path):
+    old = {(r["rows"], r["case"]): r for r in json.load(open(old_path, encoding="utf-8"))["results"]}
+    print(f"\n# so với {old_path} (best, >1 = chậm hơn)")
+    for r in results:
+        o = old.get((r["rows"], r["case"]))
+        if o:
+            ratio = r["best_ms"] / max(o["best_ms"], 1e-9)
+            flag = "  <-- chậm hơn" if ratio > 1.2 else ""
+            print(f"{r['rows']:>10,} | {r['case']:<38} | {o['best_ms']:>10.2f} -> {r['best_ms']:>10.2f} ms"
+                  f" | {ratio:>5.2f}x{flag}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000],
+                    help="Cỡ dữ liệu (thêm 10000000 cho lần chạy đầy đủ)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--db-dir", default=os.path.join(os.environ.get("TMPDIR", "/tmp"), "expense_bench"))
+    ap.add_argument("--out", help="File JSON kết quả (mặc định bench-<commit>.json)")
+    ap.add_argument("--compare", help="File JSON của lần chạy trước để so sánh")
+    args = ap.parse_args()
+
+    os.makedirs(args.db_dir, exist_ok=True)
+    m = meta(args)
+    report = {"meta": m, "datasets": {}, "results": []}
+    for rows in args.rows:
+        path, info = dataset(rows, args.db_dir)
+        report["datasets"][str(rows)] = info
+        uid = int(fetchone("SELECT id FROM users WHERE email='bench1@expense.local'")["id"])
+        print(f"# {info['rows']:,} giao dịch ({USERS} người dùng) · best/median of {args.repeat}")
+        for name, fn in cases(uid):
+            best, med = measure(fn, args.repeat)
+            report["results"].append({"rows": rows, "case": name, "best_ms": round(best, 3),
+                                      "median_ms": round(med, 3)})
+            print(f"{rows:>10,} | {name:<38} | {best:>10.2f} | {med:>10.2f} ms")
+        db.get_pool(path).close()
+
+    out = args.out or f"bench-{m['commit'] or 'local'}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"# đã ghi {out}")
+    if args.compare:
+        compare(report["results"], args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# ==========================================
+# Benchmark: top nơi chi tiêu trong khoảng ngày
+#   full     = GROUP BY merchant_id trên mọi giao dịch của khoảng (cách thẳng)
+#   partials = top_merchants_df (tháng trọn vẹn từ monthly_merchant_totals + ngày lẻ 2 đầu từ index phủ)
+# DB sinh bằng datagen.py (seed cố định), giữ lại trong --db-dir để lần sau dùng lại.
+# Chạy: python benchmarks/bench_top_merchants.py [--rows 1000000] [--repeat 5] [--db-dir /tmp/expense_bench]
+# ==========================================
+
+import argparse, datetime as dt, os, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import datagen
+from expense_app import db, schema
+from expense_app.aggregates import TOP_MERCHANT_ORDER, top_merchants_df
+from expense_app.db import fetchone, get_df
+from expense_app.fx import fx_amount_sql
+from expense_app.helpers import day_range
+
+USERS, YEARS, SEED = 4, 3, 42
+
+
+def full_top_merchants(uid, d1, d2, limit=10, by="amount"):
+    """Cách thẳng: quy đổi + GROUP BY trên từng giao dịch của khoảng (cùng cột/thứ tự với top_merchants_df)."""
+    return get_df(f"""
+        SELECT m.name AS Nơi_chi_tiêu,
+               SUM({fx_amount_sql("t.amount", "t.currency", "substr(t.occurred_at,1,10)")}) AS Chi_tiêu,
+               COUNT(*) AS Số_giao_dịch
+        FROM transactions t JOIN merchants m ON m.id=t.merchant_id
+        WHERE t.user_id=? AND t.kind=0 AND t.occurred_at>=? AND t.occurred_at<? AND t.merchant_id IS NOT NULL
+        GROUP BY t.merchant_id HAVING Chi_tiêu>0 ORDER BY {TOP_MERCHANT_ORDER[by]} DESC, m.norm_name LIMIT ?""",
+        (uid, *day_range(d1, d2), int(limit)))
+
+
+def timeit(fn, repeat):
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--db-dir", default="/tmp/expense_bench")
+    args = ap.parse_args()
+
+    os.makedirs(args.db_dir, exist_ok=True)
+    path = os.path.join(args.db_dir, f"bench_{args.rows}_u{USERS}_y{YEARS}_s{SEED}.db")
+    if not os.path.exists(path):
+        print(f"# sinh {args.rows:,} giao dịch -> {path}", file=sys.stderr)
+        datagen.generate(path, USERS, YEARS, datagen.per_day_for(args.rows, USERS, YEARS), SEED)
+    db.DB_PATH = path
+    schema.ENABLE_DEMO = False
+    schema.init_db(path)
+    uid = fetchone("SELECT id FROM users WHERE email='bench1@expense.local'")["id"]
+    if not fetchone("SELECT COUNT(*) n FROM transactions WHERE user_id=? AND merchant_id IS NOT NULL", (uid,))["n"]:
+        sys.exit(f"{path}: chưa có nơi chi tiêu (DB sinh trước khi datagen ghi merchant_id) — xoá file để sinh lại.")
+
+    end = datagen.END
+    ranges = {
+        "3 năm": (dt.date(end.year - 2, 1, 1), end),
+        "3 năm lẻ": (dt.date(end.year - 2, 2, 17), end - dt.timedelta(days=20)),
+        "1 năm": (dt.date(end.year, 1, 1), end),
+        "quý lẻ": (dt.date(end.year, 6, 10), dt.date(end.year, 8, 31)),
+        "nửa tháng": (dt.date(end.year, 3, 5), dt.date(end.year, 3, 20)),
+    }
+    partials = top_merchants_df.__wrapped__   # bỏ qua cache dùng chung
+    print(f"{'khoảng':>10} | {'by':>6} | {'full (ms)':>10} | {'partials (ms)':>13} | {'speedup':>8}")
+    for name, (d1, d2) in ranges.items():
+        for by in TOP_MERCHANT_ORDER:
+            a, b = full_top_merchants(uid, d1, d2, by=by), partials(uid, d1, d2, by=by)
+            assert a.equals(b), f"{name}/{by}: kết quả khác nhau"
+            t_full = timeit(lambda: full_top_merchants(uid, d1, d2, by=by), args.repeat)
+            t_part = timeit(lambda: partials(uid, d1, d2, by=by), args.repeat)
+            print(f"{name:>10} | {by:>6} | {t_full*1000:>10.2f} | {t_part*1000:>13.2f} | {t_full/t_part:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# ==========================================
+# Expense Manager (Streamlit + SQLite)
+#   db          pool connection SQLite, get_df/execute/fetchone
+#   cache       cache kết quả truy vấn theo data version
+#   schema      migration + khởi tạo DB (seed: dữ liệu DEMO)
+#   queries     đăng nhập, giao dịch, ví, danh mục, hạn mức
+#   aggregates  KPI/biểu đồ/báo cáo từ daily_totals
+#   dashboard   snapshot NumPy cho Trang chủ (1 lần đọc, mọi widget tính trong bộ nhớ)
+#   export      xuất CSV/XLSX   ·   importer  nhập CSV/XLSX/OFX
+#   maintenance dựng lại bảng dẫn xuất, kiểm tra số dư / query plan
+#   ui          trang Streamlit (chỉ phần này import streamlit/altair)
+#   cli         expense-cli: report/export/import/rebuild-rollups/vacuum/bench
+# Submodule được nạp khi truy cập lần đầu: `import expense_app` gần như không tốn gì.
+# ==========================================
+import importlib
+
+__all__ = ["aggregates", "cache", "cli", "dashboard", "db", "export", "helpers", "importer", "maintenance",
+           "queries", "schema", "seed", "ui"]
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
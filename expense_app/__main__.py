@@ -0,0 +1,6 @@
+# python -m expense_app ...  (= expense-cli)
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,206 @@
+# ==========================================
+# Số liệu tổng hợp cho KPI / biểu đồ / báo cáo, đọc từ bảng rollup daily_totals.
+# Mọi tổng đã quy đổi về tiền tệ báo cáo (fx.fx_amount_sql, tỷ giá tính đến ngày của dòng tổng).
+# ==========================================
+import datetime as dt
+from typing import Tuple
+
+from .cache import cached_query
+from .db import fetchone, get_df
+from .fx import fx_amount_sql
+from .helpers import TX_KINDS, bucket_key, day_range
+
+# Số tiền của 1 dòng daily_totals (alias d) theo tiền tệ báo cáo
+_AMOUNT = fx_amount_sql("d.amount_sum", "d.currency", "d.day")
+
+# ---------- Aggregations & Delta ----------
+@cached_query
+def period_sum(uid:int, d1:dt.date, d2:dt.date) -> Tuple[int,int,int]:
+    # amount_sum là INTEGER (đơn vị nhỏ nhất), quy đổi làm tròn từng dòng ngày nên tổng vẫn là số nguyên
+    r = fetchone(f"""
+        SELECT
+          COALESCE(SUM(CASE WHEN d.kind=1 THEN {_AMOUNT} END),0) AS income,
+          COALESCE(SUM(CASE WHEN d.kind=0 THEN {_AMOUNT} END),0) AS expense
+        FROM daily_totals d
+        WHERE d.user_id=? AND d.day>=? AND d.day<?""",
+        (uid, *day_range(d1, d2)))
+    income, expense = int(r["income"] or 0), int(r["expense"] or 0)
+    return income, expense, (income-expense)
+
+def previous_period(d1:dt.date, d2:dt.date, mode:str) -> Tuple[dt.date,dt.date]:
+    # khoảng KPI luôn theo đúng "Từ ngày" - "Đến ngày" đang chọn, chỉ giai đoạn trước phụ thuộc mode để so sánh
+    if mode=="day":
+        span = (d2 - d1).days + 1
+        return d1 - dt.timedelta(days=span), d2 - dt.timedelta(days=span)
+    if mode=="week":
+        return d1 - dt.timedelta(days=7), d2 - dt.timedelta(days=7)
+    if mode=="month":
+        y = d1.year; m = d1.month
+        first_this = dt.date(y, m, 1)
+        prev_last = first_this - dt.timedelta(days=1)
+        prev_first = dt.date(prev_last.year, prev_last.month, 1)
+        return prev_first, prev_last
+    # year
+    return dt.date(d1.year-1,1,1), dt.date(d1.year-1,12,31)
+
+# mode -> (cột khoá trong daily_totals, nhãn trục, kiểu trục Altair)
+AGG_MODES = {
+    "day":   ("day",       "Ngày",  "T"),
+    "week":  ("week_key",  "Tuần",  "O"),
+    "month": ("month_key", "Tháng", "O"),
+    "year":  ("year_key",  "Năm",   "O"),
+}
+
+@cached_query
+def query_agg_expense(uid, d1, d2, mode):
+    # Đọc từ daily_totals: số dòng phải gộp tỉ lệ với số ngày, không phải số giao dịch.
+    # Nhóm theo cột khoá sinh sẵn (schema.BUCKET_KEYS_SQL); lọc thêm khoảng khoá để SQLite
+    # đi thẳng vào đoạn index (user_id, khoá), còn điều kiện day cắt các tuần/tháng lẻ ở hai đầu.
+    if mode not in AGG_MODES:
+        mode = "year"
+    g, label, xtype = AGG_MODES[mode]
+    lo, hi = day_range(d1, d2)
+    df = get_df(f"""
+        SELECT d.{g} AS label,
+               COALESCE(SUM(CASE WHEN d.kind=0 THEN {_AMOUNT} END),0) AS Chi_tieu
+        FROM daily_totals d
+        WHERE d.user_id=? AND d.{g} BETWEEN ? AND ? AND d.day>=? AND d.day<?
+        GROUP BY d.{g} ORDER BY d.{g}
+    """, (uid, bucket_key(d1, mode), bucket_key(d2, mode), lo, hi))
+    if df.empty:
+        import pandas as pd
+        df = pd.DataFrame(columns=[label,"Chi_tieu"])
+    df = df.rename(columns={"label": label})
+    return df, label, xtype
+
+@cached_query
+def category_expense_df(uid, d1, d2, group_parent=True, limit=None, level=None):
+    """
+    Tổng chi theo danh mục trong [d1, d2], giảm dần.
+    - level=k: danh mục sâu hơn cấp k gộp về tổ tiên ở cấp k (0 = gốc); group_parent=True ~ level=0
+    - không gộp: từng danh mục lá như đã ghi
+    1 phép JOIN qua category_closure (tổ tiên ở khoảng cách level(c) - k), không đệ quy.
+    """
+    if level is None and group_parent:
+        level = 0
+    depth = "0" if level is None else "MAX(c.level - ?, 0)"
+    q = f"""
+        SELECT COALESCE(a.name,'(Không danh mục)') AS Danh_mục,
+               SUM({_AMOUNT}) AS Chi_tiêu
+        FROM daily_totals d
+        LEFT JOIN categories c        ON c.id=d.category_id
+        LEFT JOIN category_closure cc ON cc.descendant_id=d.category_id AND cc.depth={depth}
+        LEFT JOIN categories a        ON a.id=cc.ancestor_id
+        WHERE d.user_id=? AND d.kind=0 AND d.day>=? AND d.day<?
+        GROUP BY Danh_mục HAVING Chi_tiêu>0 ORDER BY Chi_tiêu DESC"""
+    p = ([] if level is None else [int(level)]) + [uid, *day_range(d1, d2)]
+    if limit:
+        q += " LIMIT ?"; p.append(int(limit))
+    return get_df(q, tuple(p))
+
+@cached_query
+def tag_expense_df(uid, d1, d2, limit=None):
+    """
+    Tổng chi theo thẻ trong [d1, d2], giảm dần: Thẻ | Chi_tiêu | Số_giao_dịch.
+    Đọc rollup daily_tag_totals (khoá user, kind, day); giao dịch nhiều thẻ được tính vào từng thẻ.
+    """
+    q = f"""
+        SELECT g.name AS Thẻ, SUM({_AMOUNT}) AS Chi_tiêu, SUM(d.tx_count) AS Số_giao_dịch
+        FROM daily_tag_totals d JOIN tags g ON g.id=d.tag_id
+        WHERE d.user_id=? AND d.kind=0 AND d.day>=? AND d.day<?
+        GROUP BY d.tag_id HAVING Chi_tiêu>0 ORDER BY Chi_tiêu DESC"""
+    p = [uid, *day_range(d1, d2)]
+    if limit:
+        q += " LIMIT ?"; p.append(int(limit))
+    return get_df(q, tuple(p))
+
+def _month_split(d1, d2):
+    """
+    [d1, d2] -> (tháng trọn vẹn [m1, m2) dạng 'YYYY-MM' hoặc None, các đoạn ngày lẻ [a, b) ở 2 đầu).
+    Vd. 2025-01-15 → 2025-04-10: tháng 02–03 trọn vẹn; lẻ 01-15→02-01 và 04-01→04-11.
+    """
+    lo, hi = day_range(d1, d2)
+    a, b = dt.date.fromisoformat(lo), dt.date.fromisoformat(hi)
+    m1 = a if a.day == 1 else (a.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+    m2 = b.replace(day=1)
+    if m1 >= m2:
+        return None, [(lo, hi)]
+    edges = [(x, y) for x, y in ((lo, str(m1)), (str(m2), hi)) if x < y]
+    return (str(m1)[:7], str(m2)[:7]), edges
+
+TOP_MERCHANT_ORDER = {"amount": "Chi_tiêu", "count": "Số_giao_dịch"}
+
+@cached_query
+def top_merchants_df(uid, d1, d2, limit=10, by="amount"):
+    """
+    Top nơi chi tiêu trong [d1, d2] theo tổng chi (by="amount") hoặc số giao dịch (by="count"):
+    Nơi_chi_tiêu | Chi_tiêu | Số_giao_dịch. Không GROUP BY trên toàn bộ giao dịch của khoảng:
+    - tháng trọn vẹn: cộng sẵn ở monthly_merchant_totals (quy đổi theo tỷ giá ngày đầu tháng)
+    - ngày lẻ ở 2 đầu khoảng: đọc index phủ idx_txk_user_kind_time_merchant (quy đổi theo ngày giao dịch)
+    nên chi phí theo số tháng × số nơi chi tiêu, không theo số giao dịch.
+    """
+    months, edges = _month_split(d1, d2)
+    arms, p = [], []
+    if months:
+        arms.append(f"""SELECT merchant_id, {fx_amount_sql("amount_sum", "currency", "month||'-01'")} AS amount,
+                               tx_count AS n
+                        FROM monthly_merchant_totals WHERE user_id=? AND kind=0 AND month>=? AND month<?""")
+        p += [uid, *months]
+    for a, b in edges:
+        arms.append(f"""SELECT merchant_id, {fx_amount_sql("amount", "currency", "substr(occurred_at,1,10)")} AS amount,
+                               1 AS n
+                        FROM transactions WHERE user_id=? AND kind=0 AND occurred_at>=? AND occurred_at<?
+                          AND merchant_id IS NOT NULL""")
+        p += [uid, a, b]
+    q = f"""
+        SELECT m.name AS Nơi_chi_tiêu, SUM(x.amount) AS Chi_tiêu, SUM(x.n) AS Số_giao_dịch
+        FROM ({" UNION ALL ".join(arms)}) x JOIN merchants m ON m.id=x.merchant_id
+        GROUP BY x.merchant_id HAVING Chi_tiêu>0 ORDER BY {TOP_MERCHANT_ORDER[by]} DESC, m.norm_name"""
+    if limit:
+        q += " LIMIT ?"; p.append(int(limit))
+    return get_df(q, tuple(p))
+
+@cached_query
+def category_subtree_totals(uid, d1, d2, ctype="expense"):
+    """{category_id: tổng của cả cây con} trong [d1, d2] — mỗi danh mục cộng mọi hậu duệ (kể cả chính nó)."""
+    df = get_df(f"""
+        SELECT cc.ancestor_id AS id, COALESCE(SUM({_AMOUNT}),0) AS total
+        FROM daily_totals d
+        JOIN category_closure cc ON cc.descendant_id=d.category_id
+        WHERE d.user_id=? AND d.kind=? AND d.day>=? AND d.day<?
+        GROUP BY cc.ancestor_id""", (uid, TX_KINDS[ctype], *day_range(d1, d2)))
+    return dict(zip(df["id"].astype(int).tolist(), df["total"].astype("int64").tolist()))
+
+# ----------- BUDGETS: % đúng thực, auto-scale, 2 chế độ hiển thị -----------
+@cached_query
+def budget_progress_df(uid, d1, d2):
+    """
+    Trả về DataFrame: Danh mục | Đã dùng | Hạn mức | %
+    - % KHÔNG bị cắt, hiển thị đúng giá trị thực (có thể > 100, 200, 300%…)
+    - 1 truy vấn cho mọi hạn mức giao với [d1, d2]: mỗi hạn mức cộng daily_totals của cả cây con
+      danh mục (qua category_closure) trong phần giao [max(start,d1), min(end,d2)] (tra index)
+    """
+    d1, d2 = str(d1)[:10], str(d2)[:10]
+    # hạn mức ghi theo tiền tệ báo cáo
+    df = get_df(f"""
+        SELECT c.name AS category, b.amount AS lim,
+               (SELECT COALESCE(SUM({_AMOUNT}),0)
+                  FROM category_closure cc
+                  JOIN daily_totals d ON d.user_id=b.user_id AND d.kind=0
+                                     AND d.category_id=cc.descendant_id
+                                     AND d.day>=MAX(b.start_date, ?) AND d.day<=MIN(b.end_date, ?)
+                 WHERE cc.ancestor_id=b.category_id) AS used
+        FROM budgets b JOIN categories c ON c.id=b.category_id
+        WHERE b.user_id=? AND b.end_date>=? AND b.start_date<=?
+        ORDER BY b.start_date DESC""", (d1, d2, uid, d1, d2))
+    if df.empty:
+        return df
+    return budget_frame(df["category"], df["used"], df["lim"])
+
+def budget_frame(category, used, limit):
+    """Danh mục | Đã dùng | Hạn mức | % (dùng chung cho budget_progress_df và dashboard snapshot)."""
+    import pandas as pd
+    used = pd.Series(used, dtype="int64")
+    limit = pd.Series(limit, dtype="int64")
+    pct = (100.0 * used / limit.where(limit > 0)).fillna(0.0)   # <-- KHÔNG CLIP
+    return pd.DataFrame({"Danh mục": list(category), "Đã dùng": used, "Hạn mức": limit, "%": pct})
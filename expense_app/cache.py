@@ -0,0 +1,147 @@
+# ==========================================
+# Cache kết quả truy vấn dùng chung cả process, vô hiệu hoá theo data version của user.
+# ==========================================
+import functools, sys, threading, time
+from collections import OrderedDict
+
+from . import profiling
+
+def _is_frame(v) -> bool:
+    # chưa import pandas (hoặc thread khác đang import dở) -> chưa thể có DataFrame
+    frame = getattr(sys.modules.get("pandas"), "DataFrame", None)
+    return frame is not None and isinstance(v, frame)
+
+# ---------- Shared query cache ----------
+class QueryCache:
+    """
+    Cache LRU dùng chung cho cả process (mọi tab/session) cho kết quả truy vấn tổng hợp.
+    - Giới hạn theo dung lượng ước lượng (max_bytes) + TTL
+    - Key chứa data version của user; mọi hàm ghi gọi bump_data_version(uid) sau khi commit
+      nên kết quả cũ không bao giờ được trả lại sau khi dữ liệu đổi
+    - get_or_compute: nhiều thread cùng miss 1 key (các job nền, nhiều tab) thì chỉ 1 thread tính,
+      các thread khác chờ rồi đọc kết quả (thread tính lỗi/bị huỷ -> thread chờ tự tính lại)
+    """
+    def __init__(self, max_bytes: int = 64 * 2**20, ttl: float = 300.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()   # key -> (hết hạn lúc, size, value)
+        self._bytes = 0
+        self._versions = {}           # uid -> version
+        self._epoch = 0               # tăng khi xoá toàn bộ (ghi không rõ user)
+        self._inflight = {}           # key -> Event của thread đang tính key đó
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _sizeof(v) -> int:
+        if _is_frame(v):
+            return int(v.memory_usage(deep=True).sum())
+        if isinstance(v, (tuple, list)):
+            return sys.getsizeof(v) + sum(QueryCache._sizeof(x) for x in v)
+        return sys.getsizeof(v)
+
+    def version(self, uid):
+        with self._lock:
+            return self._epoch, self._versions.get(uid, 0)
+
+    def bump(self, uid=None):
+        with self._lock:
+            if uid is None:
+                self._epoch += 1
+                self._items.clear(); self._bytes = 0
+                return
+            self._versions[uid] = self._versions.get(uid, 0) + 1
+            for k in [k for k in self._items if k[1] == uid]:
+                self._bytes -= self._items.pop(k)[1]
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    self._bytes -= self._items.pop(key)[1]
+                self.misses += 1
+                return False, None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return True, item[2]
+
+    def set(self, key, value):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._bytes -= self._items.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        while True:
+            hit, val = self.get(key)
+            if hit:
+                return val
+            with self._lock:
+                ev = self._inflight.get(key)
+                leader = ev is None
+                if leader:
+                    ev = self._inflight[key] = threading.Event()
+            if not leader:
+                ev.wait()
+                continue
+            try:
+                val = compute()
+                self.set(key, val)
+                return val
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                ev.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._items), "bytes": self._bytes}
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_query_cache() -> QueryCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = QueryCache()
+    return _CACHE
+
+def bump_data_version(uid=None):
+    """Gọi sau mỗi lần ghi (đã commit) của user; uid=None -> bỏ toàn bộ cache."""
+    get_query_cache().bump(None if uid is None else int(uid))
+
+def cache_stats() -> dict:
+    return get_query_cache().stats()
+
+def _copy_result(v):
+    if _is_frame(v):
+        return v.copy()
+    if isinstance(v, tuple):
+        return tuple(_copy_result(x) for x in v)
+    return v
+
+def cached_query(fn):
+    """Cache kết quả fn(uid, ...) theo (tên hàm, uid, data version, tham số). fn.__wrapped__ = bản không cache."""
+    @functools.wraps(fn)
+    def wrapper(uid, *args, **kwargs):
+        cache = get_query_cache()
+        uid = int(uid)
+        key = (fn.__name__, uid, cache.version(uid), args, tuple(sorted(kwargs.items())))
+
+        def compute():
+            with profiling.span("query", fn.__name__):
+                return fn(uid, *args, **kwargs)
+        return _copy_result(cache.get_or_compute(key, compute))   # người gọi có thể sửa DataFrame, không làm hỏng bản trong cache
+    return wrapper
@@ -0,0 +1,342 @@
+# ==========================================
+# expense-cli: báo cáo, xuất/nhập, bảo trì DB chạy ngoài Streamlit, dùng chung tầng truy vấn.
+#   expense-cli report  --email a@b.c --from 2024-01-01 --to 2024-12-31 --mode month
+#   expense-cli export  --all-users --format xlsx --out-dir exports/
+#   expense-cli import  sao_ke.csv --email a@b.c
+#   expense-cli migrate --batch-rows 5000 --pause 0.05
+#   expense-cli rebuild-rollups | vacuum | bench
+# (chưa cài package: python -m expense_app ...)
+# ==========================================
+import argparse, datetime as dt, json, os, sys, time
+from pathlib import Path
+
+from . import db, profiling
+from .db import fetchone, get_pool
+
+MODES = ("day", "week", "month", "year")
+SECTIONS = ("kpi", "series", "categories", "budgets")
+
+
+# ---------- Tiện ích chung ----------
+def _date(s: str) -> dt.date:
+    try:
+        return dt.date.fromisoformat(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ngày không hợp lệ (YYYY-MM-DD): {s!r}")
+
+def _open_db(path: str, migrate: bool = True):
+    """Trỏ tầng db vào file `path` và nâng schema nếu cần (không tạo DB mới, không seed DEMO)."""
+    if not Path(path).exists():
+        raise SystemExit(f"Không có DB: {path}")
+    from .schema import migrate_schema
+    db.DB_PATH = path
+    if migrate:
+        with get_pool().connection() as c:
+            migrate_schema(c)
+
+def _users(args) -> list:
+    """[(id, email)] theo --email hoặc --all-users."""
+    if getattr(args, "all_users", False):
+        with get_pool().connection() as c:
+            return [(r["id"], r["email"]) for r in c.execute("SELECT id,email FROM users ORDER BY id")]
+    u = fetchone("SELECT id,email FROM users WHERE email=?", (args.email.lower(),))
+    if not u:
+        raise SystemExit(f"Không có người dùng {args.email}")
+    return [(u["id"], u["email"])]
+
+def _add_user_args(p, allow_all=False):
+    if allow_all:
+        g = p.add_mutually_exclusive_group(required=True)
+        g.add_argument("--email")
+        g.add_argument("--all-users", action="store_true", help="Lần lượt mọi người dùng")
+    else:
+        p.add_argument("--email", required=True)
+
+def _add_range_args(p):
+    today = dt.date.today()
+    p.add_argument("--from", dest="d1", type=_date, default=today.replace(day=1), help="Mặc định: đầu tháng này")
+    p.add_argument("--to", dest="d2", type=_date, default=today, help="Mặc định: hôm nay")
+
+def _output(path):
+    """'-' -> stdout; còn lại mở file text utf-8."""
+    if path in (None, "-"):
+        return sys.stdout
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+# ---------- report ----------
+def report_data(uid, d1, d2, mode) -> dict:
+    """Các số liệu của trang chủ/báo cáo cho 1 user, dạng dict (dùng cho text/json/csv)."""
+    from .aggregates import budget_progress_df, category_expense_df, period_sum, previous_period, query_agg_expense
+    income, expense, net = period_sum(uid, d1, d2)
+    p1, p2 = previous_period(d1, d2, mode)
+    pin, pex, pnet = period_sum(uid, p1, p2)
+    series, label, _ = query_agg_expense(uid, d1, d2, mode)
+    return {
+        "kpi": [{"period": f"{d1}..{d2}", "income": income, "expense": expense, "net": net},
+                {"period": f"{p1}..{p2}", "income": pin, "expense": pex, "net": pnet}],
+        "series": series.rename(columns={label: "label", "Chi_tieu": "expense"}).to_dict("records"),
+        "categories": category_expense_df(uid, d1, d2, True)
+                      .rename(columns={"Danh_mục": "category", "Chi_tiêu": "expense"}).to_dict("records"),
+        "budgets": budget_progress_df(uid, d1, d2)
+                   .rename(columns={"Danh mục": "category", "Đã dùng": "used", "Hạn mức": "limit", "%": "pct"})
+                   .to_dict("records"),
+    }
+
+def _write_text(out, email, d1, d2, data):
+    from .helpers import format_vnd
+    out.write(f"# {email} · {d1} → {d2}\n")
+    cur, prev = data["kpi"]
+    for k, name in (("income", "Thu"), ("expense", "Chi"), ("net", "Chênh lệch")):
+        out.write(f"{name:<11} {format_vnd(cur[k]):>16} VND   (kỳ trước {format_vnd(prev[k])})\n")
+    for title, rows, cols in (("Chi tiêu theo kỳ", data["series"], ("label", "expense")),
+                              ("Danh mục", data["categories"], ("category", "expense")),
+                              ("Hạn mức", data["budgets"], ("category", "used", "limit", "pct"))):
+        out.write(f"\n## {title}\n")
+        if not rows:
+            out.write("(trống)\n")
+        for r in rows:
+            out.write("  ".join(f"{r[c]:.0f}%" if c == "pct" else
+                                f"{format_vnd(r[c]):>14}" if isinstance(r[c], (int, float)) else f"{str(r[c]):<20}"
+                                for c in cols) + "\n")
+    out.write("\n")
+
+def cmd_report(args) -> int:
+    import csv
+    if args.format == "csv" and args.section == "all":
+        raise SystemExit("--format csv cần chọn 1 --section")
+    out = _output(args.output)
+    try:
+        w = None
+        for uid, email in _users(args):
+            data = report_data(uid, args.d1, args.d2, args.mode)
+            if args.section != "all":
+                data = {args.section: data[args.section]}
+            if args.format == "json":   # JSON Lines: 1 dòng / user, đọc dần được
+                out.write(json.dumps({"user": email, "from": str(args.d1), "to": str(args.d2),
+                                      "mode": args.mode, **data}, ensure_ascii=False, default=str) + "\n")
+            elif args.format == "csv":
+                rows = data[args.section]
+                if rows and w is None:
+                    w = csv.DictWriter(out, fieldnames=["user", *rows[0]])
+                    w.writeheader()
+                for r in rows:
+                    w.writerow({"user": email, **r})
+            else:
+                _write_text(out, email, args.d1, args.d2, data)
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+# ---------- export ----------
+def cmd_export(args) -> int:
+    from .export import EXPORT_FORMATS, EXPORT_MAX_ROWS
+    writer, fname, _ = EXPORT_FORMATS[args.format.upper()]
+    max_rows = args.max_rows or EXPORT_MAX_ROWS
+    users = _users(args)
+    to_stdout = args.output == "-"
+    if to_stdout and (args.format == "xlsx" or len(users) > 1):
+        raise SystemExit("stdout chỉ dùng cho CSV của 1 người dùng")
+    if args.out_dir:
+        Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+    for uid, email in users:
+        t0 = time.perf_counter()
+        if to_stdout:
+            rows = writer(uid, args.d1, args.d2, sys.stdout.buffer, max_rows=max_rows)
+            sys.stdout.buffer.flush()
+            path = "-"
+        else:
+            path = args.output if args.output and len(users) == 1 else os.path.join(
+                args.out_dir or ".", f"{uid}_{email.replace('@', '_at_')}_{args.d1}_{args.d2}{Path(fname).suffix}")
+            tmp = path + ".part"   # ghi file tạm rồi đổi tên: job chạy đêm bị ngắt không để lại file dở
+            with open(tmp, "wb") as fh:
+                rows = writer(uid, args.d1, args.d2, fh, max_rows=max_rows)
+            os.replace(tmp, path)
+        print(f"{email}: {rows} dòng -> {path} ({time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+    return 0
+
+
+# ---------- import ----------
+def cmd_import(args) -> int:
+    from .importer import IMPORT_READERS, format_import_report, import_transactions
+    (uid, _), = _users(args)
+    acc_id = None
+    if args.account:
+        a = fetchone("SELECT id FROM accounts WHERE user_id=? AND name=?", (uid, args.account))
+        if not a:
+            print(f"Không có ví {args.account!r}", file=sys.stderr); return 2
+        acc_id = a["id"]
+    fmt = args.format or Path(args.file).suffix.lstrip(".").lower()
+    if fmt not in IMPORT_READERS:
+        print(f"Không hỗ trợ định dạng {fmt!r}", file=sys.stderr); return 2
+    with (sys.stdin.buffer if args.file == "-" else open(args.file, "rb")) as fh:
+        r = import_transactions(uid, fh, fmt, acc_id, dry_run=args.dry_run,
+                                create_categories=args.create_categories)
+    print("\n".join(format_import_report(r)))
+    for line, msg in r["errors"]:
+        print(f"  dòng {line}: {msg}")
+    # dòng trùng (đã nhập trước đó) không tính là lỗi; có dòng lỗi -> mã 1 trừ khi --allow-partial
+    return 1 if r["error_count"] and not args.allow_partial else 0
+
+def cmd_fx_load(args) -> int:
+    from .fx import load_rates_csv
+    with (sys.stdin.buffer if args.file == "-" else open(args.file, "rb")) as fh:
+        r = load_rates_csv(fh)
+    print(f"Nạp {r['loaded']}/{r['rows']} dòng tỷ giá: {', '.join(r['pairs']) or '-'}")
+    for line, msg in r["errors"]:
+        print(f"  dòng {line}: {msg}")
+    return 1 if r["errors"] and not r["loaded"] else 0
+
+
+# ---------- bảo trì ----------
+def cmd_migrate(args) -> int:
+    """Nâng schema, bước online chạy theo lô (app vẫn mở được trong lúc chạy), in tiến độ ra stderr."""
+    from .schema import SCHEMA_VERSION, migrate_schema
+    t0 = time.perf_counter()
+    def progress(done, total):
+        print(f"\r  đã chép tới id {done}/{total} ({time.perf_counter() - t0:.1f}s)", end="", file=sys.stderr)
+    with get_pool().connection() as c:
+        before = c.execute("PRAGMA user_version").fetchone()[0]
+        after = migrate_schema(c, batch_rows=args.batch_rows, pause=args.pause, progress=progress)
+    print(file=sys.stderr)
+    print(f"schema {before} -> {after} ({time.perf_counter() - t0:.2f}s)")
+    return 0 if after == SCHEMA_VERSION else 1
+
+def cmd_rebuild_rollups(args) -> int:
+    from .maintenance import (check_balances, check_category_closure, check_daily_totals, rebuild_balances,
+                              rebuild_category_closure, rebuild_daily_totals)
+    uid = _users(args)[0][0] if args.email else None
+    t0 = time.perf_counter()
+    before = check_daily_totals(uid), len(check_balances(uid)), check_category_closure()
+    rebuild_daily_totals(uid)
+    rebuild_balances(uid)
+    if before[2]:
+        rebuild_category_closure()
+    after = check_daily_totals(uid), len(check_balances(uid)), check_category_closure()
+    print(f"daily_totals lệch {before[0]} -> {after[0]} dòng · số dư lệch {before[1]} -> {after[1]} ví · "
+          f"closure danh mục lệch {before[2]} -> {after[2]} dòng ({time.perf_counter() - t0:.2f}s)")
+    return 0 if after == (0, 0, 0) else 1
+
+def cmd_vacuum(args) -> int:
+    def size():
+        return sum(os.path.getsize(p) for p in (db.DB_PATH, db.DB_PATH + "-wal") if os.path.exists(p))
+    before, t0 = size(), time.perf_counter()
+    with get_pool().connection() as c:   # autocommit: VACUUM không chạy được trong transaction
+        c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        c.execute("ANALYZE")
+        c.execute("VACUUM")
+        c.execute("PRAGMA optimize")
+        c.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(f"{before / 2**20:.1f} MB -> {size() / 2**20:.1f} MB ({time.perf_counter() - t0:.2f}s)")
+    return 0
+
+def cmd_bench(args) -> int:
+    """Đo các hàm truy vấn nóng (bản không cache) trên DB thật + kiểm tra query plan."""
+    from . import aggregates, dashboard, queries, search
+    from .maintenance import check_query_plans
+    (uid, email), = _users(args)
+    d1, d2 = args.d1, args.d2
+    cases = [("period_sum", lambda: aggregates.period_sum.__wrapped__(uid, d1, d2))]
+    cases += [(f"query_agg_expense[{m}]", lambda m=m: aggregates.query_agg_expense.__wrapped__(uid, d1, d2, m))
+              for m in MODES]
+    cases += [
+        ("category_expense_df", lambda: aggregates.category_expense_df.__wrapped__(uid, d1, d2, True)),
+        ("top_merchants_df", lambda: aggregates.top_merchants_df.__wrapped__(uid, d1, d2)),
+        ("budget_progress_df", lambda: aggregates.budget_progress_df.__wrapped__(uid, d1, d2)),
+        ("dashboard_snapshot", lambda: dashboard.load_dashboard_snapshot.__wrapped__(
+            uid, *dashboard.dashboard_window(d1, d2))),
+        ("list_transactions_page", lambda: queries.list_transactions_page.__wrapped__(uid, d1, d2)),
+        ("count_transactions", lambda: queries.count_transactions.__wrapped__(uid, d1, d2)),
+        ("search_transactions", lambda: search.search_transactions.__wrapped__(uid, args.search, d1, d2)),
+    ]
+    print(f"# {email} · {d1} → {d2} · best of {args.repeat}")
+    for name, fn in cases:
+        best = float("inf")
+        for _ in range(args.repeat):
+            t = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t)
+        print(f"{name:<26} {best * 1000:>9.2f} ms")
+    bad = check_query_plans(uid, d1, d2)
+    print("query plan: OK" if not bad else f"query plan: {len(bad)} câu full-scan")
+    for sql, detail in bad:
+        print(f"  {detail}: {' '.join(sql.split())[:120]}")
+    return 0 if not bad else 1
+
+
+# ---------- main ----------
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="expense-cli", description="Expense Manager chạy không cần Streamlit.")
+    ap.add_argument("--db", default=db.DB_PATH, help=f"File SQLite (mặc định {db.DB_PATH})")
+    ap.add_argument("--profile", metavar="LOG", help="Ghi thời gian từng câu SQL/hàm truy vấn ra file JSONL")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("report", help="KPI, chi tiêu theo kỳ, danh mục, hạn mức")
+    _add_user_args(p, allow_all=True); _add_range_args(p)
+    p.add_argument("--mode", choices=MODES, default="month")
+    p.add_argument("--format", choices=("text", "json", "csv"), default="text")
+    p.add_argument("--section", choices=("all", *SECTIONS), default="all")
+    p.add_argument("-o", "--output", default="-")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("export", help="Xuất giao dịch CSV/XLSX (theo luồng)")
+    _add_user_args(p, allow_all=True); _add_range_args(p)
+    p.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+    p.add_argument("-o", "--output", help="File đích (1 người dùng) hoặc '-' = stdout")
+    p.add_argument("--out-dir", help="Thư mục đích, mỗi người dùng 1 file")
+    p.add_argument("--max-rows", type=int, default=None, help="Mặc định EXPORT_MAX_ROWS (giới hạn XLSX)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="Nhập giao dịch hàng loạt từ CSV/XLSX/OFX")
+    p.add_argument("file", help="'-' = stdin")
+    _add_user_args(p)
+    p.add_argument("--account", help="Tên ví mặc định cho dòng không ghi ví")
+    p.add_argument("--format", help="csv/xlsx/ofx/qfx, mặc định theo đuôi file")
+    p.add_argument("--dry-run", action="store_true", help="Chỉ kiểm tra, không ghi")
+    p.add_argument("--create-categories", action="store_true")
+    p.add_argument("--allow-partial", action="store_true",
+                   help="Vẫn trả mã 0 khi có dòng lỗi (dòng hợp lệ vẫn được nhập)")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("fx-load", help="Nạp bảng tỷ giá từ CSV (date, from, to, rate)")
+    p.add_argument("file", help="'-' = stdin")
+    p.set_defaults(func=cmd_fx_load)
+
+    p = sub.add_parser("migrate", help="Nâng schema; bước chuyển đổi lớn chạy theo lô, không khoá app cả buổi")
+    p.add_argument("--batch-rows", type=int, default=5_000, help="Số giao dịch mỗi lô (mỗi lô 1 transaction)")
+    p.add_argument("--pause", type=float, default=0.05, help="Nghỉ giữa các lô (giây) để app ghi xen vào")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("rebuild-rollups", help="Tính lại daily_totals + số dư ví từ transactions, closure danh mục")
+    p.add_argument("--email", help="Chỉ 1 người dùng (mặc định tất cả)")
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("vacuum", help="Checkpoint WAL, ANALYZE, VACUUM")
+    p.set_defaults(func=cmd_vacuum)
+
+    p = sub.add_parser("bench", help="Đo các truy vấn nóng + kiểm tra query plan")
+    _add_user_args(p); _add_range_args(p)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--search", default="ca phe", help="Chuỗi tìm cho search_transactions")
+    p.set_defaults(func=cmd_bench)
+    return ap
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.cmd == "export" and not (args.output or args.out_dir):
+        args.out_dir = "."
+    if args.profile:
+        profiling.enable(args.profile)
+    _open_db(args.db, migrate=args.cmd != "migrate")
+    profiling.begin_run(args.cmd)
+    try:
+        return args.func(args)
+    except BrokenPipeError:   # vd. `expense-cli report ... | head`
+        sys.stderr.close()
+        return 0
+    finally:
+        profiling.end_run()
+
+if __name__ == "__main__":
+    sys.exit(main())
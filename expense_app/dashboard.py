@@ -0,0 +1,169 @@
+# ==========================================
+# Snapshot số liệu cho Trang chủ: đọc daily_totals của cả "cửa sổ hợp" 1 lần vào mảng NumPy
+# (ngày, loại, danh mục, số tiền đã quy đổi về tiền tệ báo cáo), rồi KPI / kỳ trước / biểu đồ mọi chế độ / cơ cấu danh mục /
+# tiến độ hạn mức đều tính trong bộ nhớ. Cache theo (user, cửa sổ, data version):
+# đổi Ngày/Tuần/Tháng/Năm hay bật/tắt gộp danh mục cha không chạm DB.
+# ==========================================
+import datetime as dt, sys
+
+from .aggregates import AGG_MODES, budget_frame, previous_period
+from .cache import cached_query
+from .db import get_pool
+from .fx import fx_amount_sql
+from .helpers import TX_KINDS, bucket_key, start_months_back, start_weeks_back, year_window
+
+_EPOCH = dt.date(1970, 1, 1)
+KIND_EXPENSE, KIND_INCOME, KIND_OTHER = TX_KINDS["expense"], TX_KINDS["income"], TX_KINDS["other"]
+
+def _days(d) -> int:
+    """Ngày -> số ngày kể từ 1970-01-01 (khớp datetime64[D])."""
+    return (dt.date.fromisoformat(str(d)[:10]) - _EPOCH).days
+
+def dashboard_window(d1: dt.date, d2: dt.date) -> tuple[str, str]:
+    """
+    Khoảng ngày bao mọi thứ Trang chủ có thể cần với bộ lọc [d1, d2]: khoảng đang chọn,
+    kỳ trước của cả 4 chế độ và khoảng biểu đồ của cả 4 chế độ (12 tuần / 12 tháng / 5 năm).
+    """
+    y1, y2 = year_window(d2, 5)
+    starts = [d1, start_weeks_back(d2, 12), start_months_back(d2, 12), y1]
+    ends = [d2, y2]
+    for mode in AGG_MODES:
+        p1, p2 = previous_period(d1, d2, mode)
+        starts.append(p1); ends.append(p2)
+    return str(min(starts)), str(max(ends))
+
+class DashboardSnapshot:
+    """
+    Các dòng daily_totals trong [w1, w2] dạng cột (mảng chỉ đọc, sắp theo ngày):
+      day (int32, ngày từ 1970-01-01) · kind (int8, KIND_*) · category (int64, 0 = không danh mục) · amount (int64)
+    kèm bảng danh mục (tên, cha), chuỗi tổ tiên của từng danh mục (từ category_closure)
+    và các hạn mức giao với cửa sổ.
+    """
+    def __init__(self, w1, w2, day, kind, category, amount, categories, ancestors, budgets):
+        import numpy as np
+        self.w1, self.w2 = dt.date.fromisoformat(w1), dt.date.fromisoformat(w2)
+        self.day = np.asarray(day, dtype=np.int32)
+        self.kind = np.asarray(kind, dtype=np.int8)
+        self.category = np.asarray(category, dtype=np.int64)
+        self.amount = np.asarray(amount, dtype=np.int64)
+        for a in (self.day, self.kind, self.category, self.amount):
+            a.flags.writeable = False   # snapshot nằm trong cache dùng chung, không ai được sửa
+        self.categories = categories    # id -> (tên, id cha | None)
+        self.ancestors = ancestors      # id -> (chính nó, cha, ..., gốc)
+        self.budgets = budgets          # [(tên danh mục, category_id, start, end, hạn mức)], start giảm dần
+
+    def __sizeof__(self) -> int:       # QueryCache tính dung lượng qua sys.getsizeof
+        return (object.__sizeof__(self) + self.day.nbytes + self.kind.nbytes + self.category.nbytes
+                + self.amount.nbytes + sys.getsizeof(self.categories) + sys.getsizeof(self.ancestors)
+                + sys.getsizeof(self.budgets))
+
+    def _slice(self, d1, d2) -> slice:
+        if str(d1)[:10] < str(self.w1) or str(d2)[:10] > str(self.w2):
+            raise ValueError(f"[{d1}, {d2}] nằm ngoài snapshot [{self.w1}, {self.w2}]")
+        import numpy as np
+        lo = int(np.searchsorted(self.day, _days(d1), "left"))
+        hi = int(np.searchsorted(self.day, _days(d2), "right"))
+        return slice(lo, hi)
+
+    # ---------- Số liệu dẫn xuất ----------
+    def period_sum(self, d1, d2) -> tuple[int, int, int]:
+        """= aggregates.period_sum: (thu, chi, thu - chi) trong [d1, d2]."""
+        s = self._slice(d1, d2)
+        kind, amount = self.kind[s], self.amount[s]
+        income = int(amount[kind == KIND_INCOME].sum())
+        expense = int(amount[kind == KIND_EXPENSE].sum())
+        return income, expense, income - expense
+
+    def agg_expense(self, d1, d2, mode):
+        """= aggregates.query_agg_expense: (df[nhãn, Chi_tieu], nhãn, kiểu trục)."""
+        import numpy as np, pandas as pd
+        if mode not in AGG_MODES:
+            mode = "year"
+        _, label, xtype = AGG_MODES[mode]
+        s = self._slice(d1, d2)
+        day = self.day[s]
+        if not len(day):
+            return pd.DataFrame(columns=[label, "Chi_tieu"]), label, xtype
+        spent = np.where(self.kind[s] == KIND_EXPENSE, self.amount[s], 0)
+        if mode == "week":
+            key = day - (day + 3) % 7            # 1970-01-01 là thứ Năm -> key = thứ Hai đầu tuần
+        elif mode == "day":
+            key = day
+        else:
+            key = day.astype("datetime64[D]").astype("datetime64[M]" if mode == "month" else "datetime64[Y]")
+        keys, inv = np.unique(key, return_inverse=True)
+        # bincount cộng bằng float64: số nguyên < 2**53 (~9e15 đồng) vẫn cộng chính xác
+        sums = np.bincount(inv, weights=spent, minlength=len(keys)).astype(np.int64)
+        if mode == "week":
+            labels = [bucket_key(_EPOCH + dt.timedelta(days=int(k)), "week") for k in keys]
+        elif mode == "day":
+            labels = keys.astype("datetime64[D]").astype(str)
+        else:
+            labels = keys.astype(str)
+        return pd.DataFrame({label: labels, "Chi_tieu": sums}), label, xtype
+
+    def category_expense(self, d1, d2, group_parent=True, limit=None, level=None):
+        """= aggregates.category_expense_df: Danh_mục | Chi_tiêu, giảm dần, chỉ mục > 0."""
+        import numpy as np, pandas as pd
+        if level is None and group_parent:
+            level = 0
+        s = self._slice(d1, d2)
+        mask = self.kind[s] == KIND_EXPENSE
+        ids, inv = np.unique(self.category[s][mask], return_inverse=True)
+        sums = np.bincount(inv, weights=self.amount[s][mask], minlength=len(ids)).astype(np.int64)
+        totals = {}
+        for cid, v in zip(ids.tolist(), sums.tolist()):
+            chain = self.ancestors.get(cid)
+            if chain and level is not None:
+                cid = chain[max(len(chain) - 1 - level, 0)]    # tổ tiên ở cấp `level`
+            name = self.categories.get(cid, (None, None))[0] or "(Không danh mục)"
+            totals[name] = totals.get(name, 0) + v
+        rows = sorted(((k, v) for k, v in totals.items() if v > 0), key=lambda kv: -kv[1])[:limit or None]
+        return pd.DataFrame(rows, columns=["Danh_mục", "Chi_tiêu"])
+
+    def budget_progress(self, d1, d2):
+        """= aggregates.budget_progress_df: hạn mức giao [d1, d2], cộng chi cả cây con trên phần giao."""
+        import numpy as np, pandas as pd
+        d1, d2 = str(d1)[:10], str(d2)[:10]
+        names, used, limits = [], [], []
+        for name, cid, b1, b2, lim in self.budgets:
+            if b2 < d1 or b1 > d2:
+                continue
+            s = self._slice(max(b1, d1), min(b2, d2))
+            subtree = [d for d, chain in self.ancestors.items() if cid in chain]
+            mask = (self.kind[s] == KIND_EXPENSE) & np.isin(self.category[s], subtree)
+            names.append(name); used.append(int(self.amount[s][mask].sum())); limits.append(lim)
+        if not names:
+            return pd.DataFrame(columns=["category", "lim", "used"])
+        return budget_frame(names, used, limits)
+
+@cached_query
+def load_dashboard_snapshot(uid, w1: str, w2: str) -> DashboardSnapshot:
+    """1 connection, 4 câu SELECT theo index: daily_totals trong cửa sổ + danh mục + closure + hạn mức."""
+    with get_pool().connection() as c:
+        # chưa có tỷ giá -> 0 (như SUM bỏ qua NULL ở aggregates)
+        rows = c.execute(f"""
+            SELECT CAST(julianday(d.day) - 2440587.5 AS INTEGER), d.kind, d.category_id,
+                   COALESCE({fx_amount_sql("d.amount_sum", "d.currency", "d.day")}, 0)
+            FROM daily_totals d
+            WHERE d.user_id=? AND d.day>=? AND d.day<=?
+            ORDER BY d.day""", (uid, w1, w2)).fetchall()
+        categories = {r[0]: (r[1], r[2]) for r in
+                      c.execute("SELECT id, name, parent_id FROM categories WHERE user_id=?", (uid,))}
+        ancestors = {}
+        for des, anc in c.execute("""
+                SELECT cc.descendant_id, cc.ancestor_id
+                FROM categories c JOIN category_closure cc ON cc.descendant_id=c.id
+                WHERE c.user_id=? ORDER BY cc.descendant_id, cc.depth""", (uid,)):
+            ancestors[des] = ancestors.get(des, ()) + (anc,)
+        budgets = [tuple(r) for r in c.execute("""
+            SELECT c.name, b.category_id, b.start_date, b.end_date, b.amount
+            FROM budgets b JOIN categories c ON c.id=b.category_id
+            WHERE b.user_id=? AND b.end_date>=? AND b.start_date<=?
+            ORDER BY b.start_date DESC""", (uid, w1, w2))]
+    cols = list(zip(*rows)) or [(), (), (), ()]
+    return DashboardSnapshot(w1, w2, *cols, categories, ancestors, budgets)
+
+def dashboard_snapshot(uid, d1: dt.date, d2: dt.date) -> DashboardSnapshot:
+    """Snapshot đủ cho mọi widget Trang chủ với bộ lọc [d1, d2] (đổi chế độ hiển thị không đọc lại DB)."""
+    return load_dashboard_snapshot(uid, *dashboard_window(d1, d2))
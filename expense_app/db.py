@@ -0,0 +1,478 @@
+# ==========================================
+# Truy cập SQLite: pool connection dùng chung cả process + helper get_df/execute/fetchone.
+# Lệnh ghi nhỏ (execute/write) đi qua 1 thread ghi duy nhất / DB, gom commit theo nhóm;
+# widget nặng có thể tính trước trên thread pool đọc (connection read-only riêng), huỷ được.
+# Không phụ thuộc Streamlit; pandas chỉ import khi gọi get_df.
+# ==========================================
+import atexit, hashlib, os, queue, sqlite3, threading, time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from urllib.parse import quote
+from contextlib import contextmanager
+
+from . import profiling
+
+# Đổi được lúc chạy (CLI --db, benchmark) trước khi gọi get_pool()
+DB_PATH = os.environ.get("EXPENSE_DB", "expense.db")
+
+# ---------- DB ----------
+# Chạy 1 lần khi mở connection (WAL chỉ cần đặt 1 lần/DB nhưng lặp lại cũng không tốn gì)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA cache_size=-20000",      # ~20MB page cache mỗi connection
+    "PRAGMA mmap_size=268435456",    # 256MB
+    "PRAGMA temp_store=MEMORY",
+)
+# Connection của thread pool đọc: mở mode=ro, không đổi journal/synchronous, chặn ghi bằng query_only
+SQLITE_RO_PRAGMAS = (
+    "PRAGMA query_only=ON",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+class ConnectionPool:
+    """
+    Pool connection SQLite sống lâu, dùng chung cho mọi rerun/session của process.
+    - PRAGMA chạy 1 lần khi mở connection; sqlite3 tự cache prepared statement (cached_statements)
+    - transaction(): gom nhiều lệnh ghi vào 1 transaction; execute()/get_df() gọi bên trong
+      sẽ dùng chung connection của transaction đó (theo thread)
+    - Đếm connection mở & statement đã chạy theo từng thread (= từng rerun của Streamlit)
+    """
+    def __init__(self, path: str, max_idle: int = 4, cached_statements: int = 256):
+        self.path = path
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._idle = []                  # connection rảnh (LIFO)
+        self._lock = threading.Lock()
+        self._tls = threading.local()    # transaction đang mở + bộ đếm của thread hiện tại
+        self._writer = None              # WriteQueue, tạo khi có lệnh ghi đầu tiên
+        self._reader = None              # ReadExecutor, tạo khi có job đọc nền đầu tiên
+
+    # -- bộ đếm --
+    def stats(self) -> dict:
+        s = getattr(self._tls, "stats", None)
+        if s is None:
+            s = self._tls.stats = {"connections": 0, "statements": 0}
+        return s
+
+    def reset_stats(self):
+        self._tls.stats = {"connections": 0, "statements": 0}
+
+    def _on_statement(self, sql):
+        self.stats()["statements"] += 1
+        captured = getattr(self._tls, "captured", None)
+        if captured is not None:
+            captured.append(sql)
+
+    @contextmanager
+    def untraced(self, c):
+        """Tắt trace callback (đếm statement) trên c, cho các lệnh ghi hàng loạt qua executemany."""
+        c.set_trace_callback(None)
+        try:
+            yield c
+        finally:
+            c.set_trace_callback(self._on_statement)
+
+    @contextmanager
+    def capture(self):
+        """Ghi lại SQL (đã gắn tham số) chạy trong thread hiện tại, dùng cho EXPLAIN QUERY PLAN."""
+        self._tls.captured = out = []
+        try:
+            yield out
+        finally:
+            self._tls.captured = None
+
+    # -- connection --
+    def _open(self, readonly: bool = False):
+        target = f"file:{quote(os.path.abspath(self.path))}?mode=ro" if readonly else self.path
+        c = sqlite3.connect(target, check_same_thread=False, isolation_level=None, uri=readonly,
+                            cached_statements=self.cached_statements, timeout=5.0)
+        c.row_factory = sqlite3.Row
+        for pragma in SQLITE_RO_PRAGMAS if readonly else SQLITE_PRAGMAS:
+            c.execute(pragma)
+        c.set_trace_callback(self._on_statement)
+        self.stats()["connections"] += 1
+        return c
+
+    @contextmanager
+    def connection(self):
+        tx = getattr(self._tls, "tx", None) or getattr(self._tls, "reader", None)
+        if tx is not None:
+            if tx is getattr(self._tls, "reader", None) and self._tls.reader_cancelled():
+                raise CancelledError()     # job đọc đã bị huỷ giữa 2 câu SQL: dừng ở câu kế tiếp
+            yield tx
+            return
+        with self._lock:
+            c = self._idle.pop() if self._idle else None
+        if c is None:
+            c = self._open()
+        try:
+            yield c
+        finally:
+            if c.in_transaction:
+                c.rollback()
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(c); c = None
+            if c is not None:
+                c.close()
+
+    @contextmanager
+    def transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT (ROLLBACK nếu lỗi). Lồng nhau thì dùng chung transaction ngoài."""
+        if getattr(self._tls, "tx", None) is not None:
+            yield self._tls.tx
+            return
+        with self.connection() as c:
+            c.execute("BEGIN IMMEDIATE")
+            self._tls.tx = c
+            try:
+                yield c
+                c.execute("COMMIT")
+            except BaseException:
+                c.rollback()
+                raise
+            finally:
+                self._tls.tx = None
+
+    def current_tx(self):
+        """Connection của transaction đang mở trên thread hiện tại (None nếu không có)."""
+        return getattr(self._tls, "tx", None)
+
+    def writer(self) -> "WriteQueue":
+        with self._lock:
+            if self._writer is None:
+                self._writer = WriteQueue(self)
+            return self._writer
+
+    def reader(self) -> "ReadExecutor":
+        with self._lock:
+            if self._reader is None:
+                self._reader = ReadExecutor(self)
+            return self._reader
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            w, self._writer = self._writer, None
+            r, self._reader = self._reader, None
+        if r is not None:
+            r.close()
+        if w is not None:
+            w.close()
+        for c in idle:
+            c.close()
+
+# ---------- Thread ghi ----------
+class WriteQueue:
+    """
+    1 thread ghi duy nhất cho 1 file DB: mọi lệnh ghi nhỏ xếp hàng ở đây thay vì tranh khoá ghi
+    của SQLite từ nhiều session (lỗi "database is locked").
+    - Gom nhóm: lệnh đầu tiên mở BEGIN IMMEDIATE, các lệnh đã xếp hàng (và khi đang có tải, các lệnh
+      đến trong max_delay, mặc định 2ms; tối đa max_batch) đi chung 1 COMMIT -> 1 lần fsync cho cả nhóm
+    - Mỗi lệnh chạy trong SAVEPOINT riêng: lệnh lỗi chỉ rollback phần của nó, lỗi trả về đúng người gọi
+    - Connection ghi dùng synchronous=FULL: Future chỉ xong sau khi COMMIT đã xuống đĩa (ack bền vững)
+    - busy_timeout dài hơn connection đọc: chờ được các transaction lớn chạy trực tiếp (import, rebuild)
+    """
+    _STOP = object()
+
+    def __init__(self, pool: ConnectionPool, max_delay: float = 0.002, max_batch: int = 256,
+                 busy_timeout_ms: int = 30_000):
+        self.pool = pool
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.busy_timeout_ms = busy_timeout_ms
+        self._q = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.submitted = self.committed = self.failed = self.groups = 0
+        self._commit_ms = deque(maxlen=1024)    # BEGIN -> COMMIT của từng nhóm
+        self._latency_ms = deque(maxlen=1024)   # xếp hàng -> ack của từng lệnh
+        self._batch = deque(maxlen=1024)
+
+    def submit(self, fn, *args) -> Future:
+        """Xếp fn(c, *args) vào hàng ghi; Future nhận kết quả (hoặc lỗi) sau khi COMMIT."""
+        fut = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"sqlite-writer:{self.pool.path}",
+                                                daemon=True)
+                self._thread.start()
+            self.submitted += 1
+        self._q.put((fn, args, fut, time.perf_counter()))
+        return fut
+
+    def write(self, fn, *args, timeout=None):
+        return self.submit(fn, *args).result(timeout)
+
+    def _run(self):
+        c = self.pool._open()
+        c.execute("PRAGMA synchronous=FULL")
+        c.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        stopping, last_batch = False, 0
+        try:
+            while not stopping:
+                job = self._q.get()
+                if job is self._STOP:
+                    break
+                # Chỉ chờ gom thêm khi đang có tải (nhóm trước > 1 lệnh); 1 người ghi thì commit ngay
+                wait = self.max_delay if last_batch > 1 else 0.0
+                batch, deadline = [job], time.perf_counter() + wait
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    try:
+                        job = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(job)
+                self._commit(c, batch)
+                last_batch = len(batch)
+        finally:
+            c.close()
+
+    def _commit(self, c, batch):
+        with self._lock:
+            self._inflight = len(batch)
+        t0, results = time.perf_counter(), []
+        self.pool._tls.tx = c          # execute()/transaction() gọi bên trong fn dùng luôn c
+        try:
+            c.execute("BEGIN IMMEDIATE")
+            for fn, args, fut, _ in batch:
+                c.execute("SAVEPOINT w")
+                try:
+                    res = fn(c, *args)
+                except Exception as e:
+                    c.execute("ROLLBACK TO w")
+                    c.execute("RELEASE w")
+                    results.append((fut, None, e))
+                else:
+                    c.execute("RELEASE w")
+                    results.append((fut, res, None))
+            c.execute("COMMIT")
+        except Exception as e:         # BEGIN/COMMIT lỗi (vd. khoá ghi quá busy_timeout): cả nhóm thất bại
+            if c.in_transaction:
+                c.rollback()
+            results = [(fut, None, e) for _, _, fut, _ in batch]
+        finally:
+            self.pool._tls.tx = None
+        done = time.perf_counter()
+        with self._lock:
+            self._inflight = 0
+            self.groups += 1
+            self._batch.append(len(batch))
+            self._commit_ms.append((done - t0) * 1000)
+            for (_, _, _, t_in), (_, _, err) in zip(batch, results):
+                self._latency_ms.append((done - t_in) * 1000)
+                if err is None:
+                    self.committed += 1
+                else:
+                    self.failed += 1
+        for fut, res, err in results:
+            if err is None:
+                fut.set_result(res)
+            else:
+                fut.set_exception(err)
+
+    def stats(self) -> dict:
+        def pct(xs, q):
+            xs = sorted(xs)
+            return round(xs[min(len(xs) - 1, int(q * len(xs)))], 3) if xs else None
+        with self._lock:
+            return {"queue_depth": self._q.qsize() + self._inflight, "submitted": self.submitted,
+                    "committed": self.committed, "failed": self.failed, "groups": self.groups,
+                    "avg_batch": round(sum(self._batch) / len(self._batch), 2) if self._batch else None,
+                    "commit_ms_p50": pct(self._commit_ms, 0.5), "commit_ms_p95": pct(self._commit_ms, 0.95),
+                    "latency_ms_p50": pct(self._latency_ms, 0.5), "latency_ms_p95": pct(self._latency_ms, 0.95)}
+
+    def close(self, timeout: float = 10.0):
+        """Ghi nốt hàng đợi rồi dừng thread."""
+        with self._lock:
+            t = self._thread
+        if t is not None:
+            self._q.put(self._STOP)
+            t.join(timeout)
+
+# ---------- Thread pool đọc ----------
+class ReadExecutor:
+    """
+    Thread pool tính trước các widget nặng song song với script Streamlit.
+    - Mỗi worker 1 connection read-only riêng (mode=ro + query_only); get_df/fetchone/hàm có cache
+      gọi trong job tự dùng connection đó. WAL: các job đọc song song với nhau và với thread ghi
+    - submit() trả về Future; cancel(fut): job chưa chạy thì bỏ, đang chạy câu SQL thì interrupt(),
+      đang ở giữa 2 câu thì câu kế tiếp ném CancelledError (pool.connection() kiểm tra cờ huỷ);
+      job huỷ muộn mà vẫn chạy xong cũng kết thúc bằng CancelledError, không trả kết quả
+    - Sự kiện profiling của job gắn vào run của thread đã submit
+    """
+    def __init__(self, pool: ConnectionPool, workers: int = 4):
+        self.pool = pool
+        self._ex = ThreadPoolExecutor(workers, thread_name_prefix="sqlite-reader")
+        self._tls = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []                 # mọi connection của worker, đóng khi close()
+        self._running = {}               # Future -> connection đang chạy job đó
+        self._cancelling = set()
+        self.submitted = self.completed = self.cancelled = self.failed = 0
+
+    def _conn(self):
+        c = getattr(self._tls, "c", None)
+        if c is None:
+            c = self._tls.c = self.pool._open(readonly=True)
+            with self._lock:
+                self._conns.append(c)
+        return c
+
+    def submit(self, fn, *args) -> Future:
+        fut = Future()
+        with self._lock:
+            self.submitted += 1
+        self._ex.submit(self._run, fut, fn, args, profiling.current_run())
+        return fut
+
+    def _run(self, fut, fn, args, run):
+        if not fut.set_running_or_notify_cancel():   # đã huỷ khi còn trong hàng đợi
+            with self._lock:
+                self.cancelled += 1
+            return
+        c = self._conn()
+        with self._lock:
+            self._running[fut] = c
+        self.pool._tls.reader = c
+        self.pool._tls.reader_cancelled = lambda: fut in self._cancelling
+        try:
+            with profiling.attach(run):
+                res = fn(*args)
+        except BaseException as e:
+            with self._lock:
+                self._running.pop(fut, None)
+                cancelled = fut in self._cancelling
+                self._cancelling.discard(fut)
+                if cancelled:
+                    self.cancelled += 1
+                else:
+                    self.failed += 1
+            fut.set_exception(CancelledError() if cancelled else e)
+        else:
+            with self._lock:
+                self._running.pop(fut, None)
+                cancelled = fut in self._cancelling
+                self._cancelling.discard(fut)
+                if cancelled:
+                    self.cancelled += 1
+                else:
+                    self.completed += 1
+            if cancelled:
+                fut.set_exception(CancelledError())
+            else:
+                fut.set_result(res)
+        finally:
+            self.pool._tls.reader = self.pool._tls.reader_cancelled = None
+
+    def cancel(self, fut: Future) -> bool:
+        """Huỷ job; False nếu job đã xong."""
+        if fut.cancel():
+            return True
+        with self._lock:       # giữ khoá: worker không thể nhận job khác trên c trước khi interrupt xong
+            c = self._running.get(fut)
+            if c is None:
+                return False
+            self._cancelling.add(fut)
+            c.interrupt()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"running": len(self._running), "submitted": self.submitted, "completed": self.completed,
+                    "cancelled": self.cancelled, "failed": self.failed}
+
+    def close(self):
+        with self._lock:
+            running = list(self._running.values())
+        for c in running:
+            c.interrupt()
+        self._ex.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for c in conns:
+            c.close()
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+def get_pool(db_path: str | None = None) -> ConnectionPool:
+    """1 pool / file DB cho cả process (module sống qua các rerun của Streamlit). Mặc định DB_PATH hiện tại."""
+    path = db_path or DB_PATH
+    with _POOLS_LOCK:
+        pool = _POOLS.get(path)
+        if pool is None:
+            pool = _POOLS[path] = ConnectionPool(path)
+        return pool
+
+@atexit.register
+def _close_writers():
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+    for pool in pools:
+        if pool._reader is not None:
+            pool._reader.close()
+        if pool._writer is not None:
+            pool._writer.close()
+
+def hash_password(pw): return hashlib.sha256(pw.encode("utf-8")).hexdigest()
+
+def get_df(q, p=()):
+    import pandas as pd
+    with profiling.sql_span(q) as sp, get_pool().connection() as c:
+        df = pd.read_sql_query(q, c, params=p)
+        sp.set_rows(len(df))
+        return df
+
+def write(fn, *args):
+    """
+    Chạy fn(c, *args) trên thread ghi (nhiều lệnh trong fn là 1 đơn vị nguyên tử), trả về kết quả
+    sau khi COMMIT đã bền vững; lỗi của fn được ném lại ở đây. Đang ở trong transaction() của
+    thread này (hoặc chính thread ghi) thì chạy luôn trên transaction đó.
+    """
+    pool = get_pool()
+    tx = pool.current_tx()
+    if tx is not None:
+        return fn(tx, *args)
+    return pool.writer().write(fn, *args)
+
+def _execute(c, q, p):
+    return c.execute(q, p).rowcount
+
+def execute(q, p=()):
+    with profiling.sql_span(q) as sp:
+        n = write(_execute, q, p)
+        sp.set_rows(n)
+        return n
+
+def fetchone(q, p=()):
+    with profiling.sql_span(q) as sp, get_pool().connection() as c:
+        r = c.execute(q, p).fetchone()
+        sp.set_rows(0 if r is None else 1)
+        return r
+
+def transaction():
+    return get_pool().transaction()
+
+def db_stats() -> dict:
+    """Số connection mở & statement đã chạy trong rerun hiện tại."""
+    return dict(get_pool().stats())
+
+def writer_stats() -> dict:
+    """Độ sâu hàng ghi, số lệnh/nhóm đã commit, độ trễ commit & xếp hàng -> ack (p50/p95, ms)."""
+    return get_pool().writer().stats()
+
+def reader_stats() -> dict:
+    """Số job đọc nền đang chạy / đã xong / đã huỷ / lỗi."""
+    return get_pool().reader().stats()
+
+def exec_script(c, s): c.executescript(s); c.commit()
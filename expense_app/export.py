@@ -0,0 +1,102 @@
+# ==========================================
+# Xuất giao dịch CSV/XLSX theo luồng: đọc cursor từng lô, ghi thẳng ra file.
+# ==========================================
+import csv, io, sys
+
+from .db import fetchone, get_pool
+from .fx import major_amount_sql
+from .helpers import day_range
+
+# ---------- Export (streaming) ----------
+EXPORT_MAX_ROWS = 1_000_000      # XLSX tối đa 1.048.576 dòng/sheet
+EXPORT_CHUNK = 5_000
+# (tên cột, độ rộng cột XLSX, kiểu căn)
+EXPORT_COLUMNS = [
+    ("Ngày giao dịch", 18, "center"), ("Ví / Tài khoản", 22, "center"), ("Danh mục", 20, "center"),
+    ("Số tiền", 16, "money"), ("Tiền tệ", 10, "center"), ("Ghi chú", 30, "left"),
+    ("Thẻ", 20, "left"), ("Nơi chi tiêu", 20, "left"),
+]
+
+def count_export_rows(uid, d1, d2) -> int:
+    r = fetchone("SELECT COUNT(*) n FROM transactions WHERE user_id=? AND occurred_at>=? AND occurred_at<?",
+                 (uid, *day_range(d1, d2)))
+    return int(r["n"] or 0)
+
+def iter_export_rows(uid, d1, d2, max_rows=None, chunk_size=EXPORT_CHUNK):
+    """
+    Sinh từng lô tuple (theo EXPORT_COLUMNS) đọc thẳng từ cursor, không dựng DataFrame cho cả khoảng.
+    Số tiền theo đơn vị chính của tiền tệ giao dịch (VND nguyên, USD 12.34), không quy đổi.
+    """
+    q = f"""SELECT t.occurred_at, a.name, c.name, {major_amount_sql("t.amount", "t.currency")},
+                  t.currency, t.notes, t.tags, m.name
+           FROM transactions t JOIN accounts a ON a.id=t.account_id
+           LEFT JOIN categories c ON c.id=t.category_id
+           LEFT JOIN merchants m ON m.id=t.merchant_id
+           WHERE t.user_id=? AND t.occurred_at>=? AND t.occurred_at<?
+           ORDER BY t.occurred_at DESC, t.id DESC"""
+    p = [uid, *day_range(d1, d2)]
+    if max_rows:
+        q += " LIMIT ?"; p.append(int(max_rows))
+    with get_pool().connection() as c:
+        cur = c.execute(q, p)
+        try:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [tuple(r) for r in rows]
+        finally:
+            cur.close()
+
+def export_csv(uid, d1, d2, fh, max_rows=EXPORT_MAX_ROWS, progress=None) -> int:
+    """Ghi CSV từng lô vào file nhị phân fh (UTF-8 có BOM cho Excel). progress(done, total) nếu có."""
+    total = min(count_export_rows(uid, d1, d2), max_rows or sys.maxsize)
+    out = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    try:
+        w = csv.writer(out)
+        w.writerow([name for name, _, _ in EXPORT_COLUMNS])
+        done = 0
+        for rows in iter_export_rows(uid, d1, d2, max_rows):
+            w.writerows(rows)
+            done += len(rows)
+            if progress: progress(done, total)
+    finally:
+        out.flush(); out.detach()   # trả fh lại cho người gọi, không đóng
+    return done
+
+def export_xlsx(uid, d1, d2, fh, max_rows=EXPORT_MAX_ROWS, progress=None) -> int:
+    """Ghi XLSX bằng xlsxwriter constant_memory (ghi tuần tự từng dòng, bộ nhớ không tăng theo số dòng)."""
+    import xlsxwriter
+    total = min(count_export_rows(uid, d1, d2), max_rows or sys.maxsize)
+    wb = xlsxwriter.Workbook(fh, {"constant_memory": True, "in_memory": False})
+    ws = wb.add_worksheet("transactions")
+    fmt_header = wb.add_format({
+        "bold": True, "align": "center", "valign": "vcenter",
+        "bg_color": "#EEEEEE", "border": 1
+    })
+    fmts = {
+        "center": wb.add_format({"align": "center", "valign": "vcenter"}),
+        "left":   wb.add_format({"align": "left", "valign": "vcenter"}),
+        "money":  wb.add_format({"num_format": "#,##0", "align": "center", "valign": "vcenter"}),
+    }
+    fmt_cents = wb.add_format({"num_format": "#,##0.00", "align": "center", "valign": "vcenter"})
+    for i, (name, width, kind) in enumerate(EXPORT_COLUMNS):
+        ws.set_column(i, i, width, fmts[kind])
+        ws.write(0, i, name, fmt_header)
+    ws.freeze_panes(1, 0)
+    done = 0
+    for rows in iter_export_rows(uid, d1, d2, max_rows):
+        for r in rows:
+            done += 1
+            if type(r[3]) is float:     # tiền có phần lẻ (USD...) -> hiện 2 chữ số thập phân
+                ws.write_row(done, 0, r[:3]); ws.write_number(done, 3, r[3], fmt_cents); ws.write_row(done, 4, r[4:])
+            else:
+                ws.write_row(done, 0, r)
+        if progress: progress(done, total)
+    wb.close()
+    return done
+
+EXPORT_FORMATS = {
+    "CSV":  (export_csv, "transactions.csv", "text/csv"),
+    "XLSX": (export_xlsx, "transactions.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
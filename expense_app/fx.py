@@ -0,0 +1,94 @@
+# ==========================================
+# Tỷ giá: bảng fx_rates (ngày, từ, sang, tỷ giá) nạp offline từ CSV; quy đổi về tiền tệ báo cáo theo
+# tỷ giá "tính đến ngày" (dòng mới nhất có day <= ngày giao dịch; trước dòng đầu tiên thì dùng dòng đầu).
+# Quy đổi chạy trong SQL trên từng dòng tổng theo ngày (daily_totals): dòng đã là tiền tệ báo cáo không
+# tra bảng tỷ giá, dòng ngoại tệ tra 1 lần theo khoá chính (from_ccy, to_ccy, day) — không lặp Python.
+# ==========================================
+import csv, datetime as dt, io, re
+
+from .cache import bump_data_version, cached_query
+from .db import get_df, transaction
+from .helpers import BASE_CURRENCY, CURRENCY_EXPONENTS, DEFAULT_CURRENCY_EXPONENT, strip_accents_lower
+
+# Tên cột chấp nhận trong file tỷ giá (so sau khi bỏ dấu)
+FX_COLUMN_ALIASES = {
+    "day": ("date", "day", "ngay"),
+    "from_ccy": ("from", "from_ccy", "tu"),
+    "to_ccy": ("to", "to_ccy", "sang"),
+    "rate": ("rate", "ty gia"),
+}
+_CCY_RE = re.compile(r"^[A-Z]{3}$")
+
+# ---------- Biểu thức SQL ----------
+def _exp_case(currency: str, value) -> str:
+    """CASE theo số chữ số lẻ của tiền tệ: value(e) là biểu thức SQL cho tiền tệ có e chữ số lẻ."""
+    whens = " ".join(f"WHEN '{c}' THEN {value(e)}" for c, e in CURRENCY_EXPONENTS.items())
+    return f"CASE {currency} {whens} ELSE {value(DEFAULT_CURRENCY_EXPONENT)} END"
+
+def fx_amount_sql(amount: str, currency: str, day: str, target: str = BASE_CURRENCY) -> str:
+    """
+    Biểu thức SQL: số tiền (đơn vị nhỏ nhất của `currency`) -> INTEGER đơn vị nhỏ nhất của `target`,
+    theo tỷ giá tính đến ngày `day`. Chưa có tỷ giá nào cho cặp tiền -> NULL (SUM bỏ qua, xem missing_rates).
+    """
+    if not _CCY_RE.match(target):
+        raise ValueError(f"Mã tiền tệ không hợp lệ: {target!r}")
+    et = CURRENCY_EXPONENTS.get(target, DEFAULT_CURRENCY_EXPONENT)
+    scale = _exp_case(currency, lambda e: repr(10.0 ** (et - e)))
+    pair = f"FROM fx_rates f WHERE f.from_ccy={currency} AND f.to_ccy='{target}'"
+    return f"""CASE WHEN {currency}='{target}' THEN {amount}
+       ELSE CAST(ROUND({amount} * {scale} * COALESCE(
+              (SELECT f.rate {pair} AND f.day<={day} ORDER BY f.day DESC LIMIT 1),
+              (SELECT f.rate {pair} ORDER BY f.day LIMIT 1))) AS INTEGER) END"""
+
+def major_amount_sql(amount: str, currency: str) -> str:
+    """Biểu thức SQL: đơn vị nhỏ nhất -> đơn vị chính (VND giữ số nguyên, USD chia 100)."""
+    return _exp_case(currency, lambda e: amount if e == 0 else f"{amount} / {10 ** e}.0")
+
+# ---------- Nạp / đọc tỷ giá ----------
+def load_rates_csv(fh) -> dict:
+    """
+    Nạp file CSV nhị phân fh (cột date, from, to, rate — hoặc ngay, tu, sang, ty gia) vào fx_rates.
+    Dòng trùng (ngày, cặp tiền) ghi đè; tự thêm chiều ngược 1/rate (dòng ghi rõ trong file luôn thắng).
+    Trả về {"rows", "loaded", "pairs", "errors": [(dòng, lỗi)]}.
+    """
+    reader = csv.reader(io.TextIOWrapper(fh, encoding="utf-8-sig", newline=""))
+    header = [strip_accents_lower(h).strip() for h in next(reader, [])]
+    cols = {f: header.index(a) for f, aliases in FX_COLUMN_ALIASES.items() for a in aliases if a in header}
+    if len(cols) < len(FX_COLUMN_ALIASES):
+        raise ValueError("File tỷ giá cần các cột date, from, to, rate.")
+    rows, errors, n = [], [], 0
+    for line, r in enumerate(reader, start=2):
+        if not r or all(not v.strip() for v in r):
+            continue
+        n += 1
+        try:
+            day = dt.date.fromisoformat(r[cols["day"]].strip()).isoformat()
+            a, b = r[cols["from_ccy"]].strip().upper(), r[cols["to_ccy"]].strip().upper()
+            rate = float(r[cols["rate"]].strip())
+        except (ValueError, IndexError):
+            errors.append((line, f"Dòng không hợp lệ: {','.join(r)!r}")); continue
+        if not (_CCY_RE.match(a) and _CCY_RE.match(b)) or a == b or not rate > 0:
+            errors.append((line, f"Cặp tiền / tỷ giá không hợp lệ: {a}/{b} = {rate}")); continue
+        rows.append((day, a, b, rate))
+    if rows:
+        q = "INSERT OR REPLACE INTO fx_rates(day, from_ccy, to_ccy, rate) VALUES(?,?,?,?)"
+        with transaction() as c:
+            c.executemany(q, [(d, b, a, 1.0 / r) for d, a, b, r in rows])
+            c.executemany(q, rows)
+        bump_data_version()
+    return {"rows": n, "loaded": len(rows), "pairs": sorted({f"{a}/{b}" for _, a, b, _ in rows}),
+            "errors": errors}
+
+def latest_rates():
+    """Tỷ giá mới nhất của từng cặp tiền: from_ccy | to_ccy | day | rate."""
+    return get_df("""SELECT from_ccy, to_ccy, MAX(day) AS day, rate FROM fx_rates
+                     GROUP BY from_ccy, to_ccy ORDER BY from_ccy, to_ccy""")
+
+@cached_query
+def missing_rates(uid, target: str = BASE_CURRENCY) -> list[str]:
+    """Tiền tệ của các ví chưa có tỷ giá nào sang `target` (số liệu quy đổi sẽ thiếu các ví này)."""
+    df = get_df("""SELECT DISTINCT a.currency FROM accounts a
+                   WHERE a.user_id=? AND a.currency<>?
+                     AND NOT EXISTS (SELECT 1 FROM fx_rates f WHERE f.from_ccy=a.currency AND f.to_ccy=?)
+                   ORDER BY 1""", (uid, target, target))
+    return df["currency"].tolist()
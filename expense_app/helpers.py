@@ -0,0 +1,380 @@
+# ==========================================
+# Helpers thuần (không đụng DB/Streamlit): tiền tệ, thời gian, bỏ dấu, bảng hiển thị.
+# pandas/numpy chỉ import khi hàm thật sự nhận/trả DataFrame, Series.
+# ==========================================
+from __future__ import annotations
+
+import datetime as dt, functools, re, sys, unicodedata
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# ---------- Helpers tiền tệ / thời gian ----------
+def _is_vector(x) -> bool:
+    # pandas/numpy chưa được import thì x chắc chắn không phải Series/ndarray
+    pd, np = sys.modules.get("pandas"), sys.modules.get("numpy")
+    return ((pd is not None and isinstance(x, (pd.Series, pd.Index)))
+            or (np is not None and isinstance(x, np.ndarray)))
+
+def _like(values, out):
+    """Trả out (ndarray object) về cùng kiểu với values: Series giữ index/name, Index -> Index."""
+    import pandas as pd
+    if isinstance(values, pd.Series):
+        return pd.Series(out, index=values.index, name=values.name)
+    if isinstance(values, pd.Index):
+        return pd.Index(out, name=values.name)
+    return out
+
+def _map_unique(values, fn):
+    """
+    Áp fn cho từng giá trị *khác nhau* rồi phát lại theo mã factorize.
+    Series -> Series (giữ index/name), Index -> Index, ndarray -> ndarray object.
+    """
+    import numpy as np, pandas as pd
+    codes, uniq = pd.factorize(values, use_na_sentinel=False)
+    return _like(values, np.array([fn(u) for u in np.asarray(uniq, dtype=object)], dtype=object)[codes])
+
+@functools.lru_cache(maxsize=None)
+def _group_table():
+    """Bảng tra nhóm 3 chữ số: [0,1000) '.007' (nhóm sau, có dấu chấm, đệm 0), [1000,2000) '7' (nhóm đầu), 2000 ''."""
+    import numpy as np
+    return np.array([f".{i:03d}" for i in range(1000)] + [str(i) for i in range(1000)] + [""])
+
+def _group_thousands(v, neg):
+    """
+    v: ndarray int64 >= 0, neg: mask dấu trừ -> ndarray chuỗi '-1.234.567'.
+    Tách nhóm 3 chữ số bằng chia nguyên rồi tra bảng, nối bằng np.char: không gọi hàm Python theo từng số.
+    """
+    import numpy as np
+    table = _group_table()
+    top = np.zeros(len(v), dtype=np.int64)          # chỉ số nhóm cao nhất (int64: tối đa 7 nhóm)
+    for k in range(1, 7):
+        top += v >= 10 ** (3 * k)
+    out = np.where(neg, "-", "")
+    for k in range(int(top.max(initial=0)), -1, -1):
+        g = (v // 10 ** (3 * k)) % 1000
+        out = np.char.add(out, table[np.where(top > k, g, np.where(top == k, g + 1000, 2000))])
+    return out
+
+def _format_grouped(values, exp: int = 0):
+    """
+    Vector của _format_vnd_scalar (exp=0) / _format_money_scalar (số nguyên đơn vị nhỏ nhất, exp>0).
+    Cột số: làm tròn (rint = làm tròn nửa chẵn như f-string) rồi _group_thousands; cột lặp nhiều (đoán
+    từ ~4096 giá trị lấy mẫu) thì factorize trước. Cột object/NA,
+    số thực ở tiền exp>0, nan/inf/số quá lớn: về hàm scalar.
+    """
+    import numpy as np, pandas as pd
+    a = np.asarray(values)
+    scalar = _format_vnd_scalar if exp == 0 else (lambda x: _format_money_scalar(x, exp))
+    if a.dtype.kind not in "iufb" or (exp and a.dtype.kind == "f"):
+        return _map_unique(values, scalar)
+    sample = a[::max(1, len(a) // 4096)]
+    k, u = len(sample), len(np.unique(sample))
+    if u < k and k * k < (k - u) * len(a):
+        # ước lượng số giá trị khác nhau ~ k²/2(k-u) < n/2 (lặp nhiều, vd số tiền tròn nghìn):
+        # định dạng mỗi giá trị khác nhau 1 lần rồi phát lại theo mã factorize
+        codes, uniq = pd.factorize(a, use_na_sentinel=False)
+        return _like(values, _format_grouped(uniq, exp)[codes])
+    if a.dtype.kind == "f":
+        r = np.rint(a)
+        ok = np.abs(r) < 2.0 ** 63
+        neg = np.signbit(r) & ok                     # -0.4 -> '-0' như f-string
+    else:                                            # số nguyên từ 2^53: scalar đi qua float, giữ y hệt
+        ok = a < 2 ** 53 if a.dtype.kind == "u" else np.abs(a.astype(np.float64)) < 2 ** 53
+        r = np.where(ok, a, 0).astype(np.int64)
+        neg = r < 0
+    v = np.abs(np.where(ok, r, 0)).astype(np.int64)
+    if exp:
+        v, frac = np.divmod(v, 10 ** exp)
+        out = np.char.add(np.char.add(_group_thousands(v, neg), ","), np.char.zfill(frac.astype(str), exp))
+    else:
+        out = _group_thousands(v, neg)
+    out = out.astype(object)
+    if not ok.all():
+        out[~ok] = [scalar(x) for x in a[~ok]]
+    return _like(values, out)
+
+def _format_vnd_scalar(n):
+    try:
+        return f"{float(n):,.0f}".replace(",", ".")
+    except Exception:
+        return str(n)
+
+def format_vnd(n):
+    """1234567 -> '1.234.567'. Nhận cả Series/Index/ndarray (cột số định dạng vector, không lặp theo dòng)."""
+    if _is_vector(n):
+        return _format_grouped(n)
+    return _format_vnd_scalar(n)
+
+def parse_vnd_str(s):
+    """
+    Cho phép nhập có dấu chấm/phẩy/khoảng trắng.
+    Ví dụ: '5.000.000' -> 5000000.0
+    """
+    if s is None:
+        return 0.0
+    digits = re.sub(r"[^\d]", "", str(s))
+    try:
+        return float(digits) if digits else 0.0
+    except Exception:
+        return 0.0
+
+# Số tiền lưu INTEGER theo đơn vị nhỏ nhất của tiền tệ (VND không có hào/xu: 1 = 1 đồng; USD: 1 = 1 cent).
+# Tổng bằng SQL là cộng số nguyên: chính xác, không trôi số như REAL.
+CURRENCY_EXPONENTS = {"VND": 0, "JPY": 0, "KRW": 0}
+DEFAULT_CURRENCY_EXPONENT = 2
+
+def minor_exponent(currency: str = "VND") -> int:
+    return CURRENCY_EXPONENTS.get(str(currency or "VND").upper(), DEFAULT_CURRENCY_EXPONENT)
+
+def to_minor(amount, currency: str = "VND") -> int:
+    """Số tiền (đơn vị chính) -> số nguyên đơn vị nhỏ nhất, làm tròn nửa lên: 12.345 USD -> 1235."""
+    from decimal import ROUND_HALF_UP, Decimal
+    return int(Decimal(str(amount or 0)).scaleb(minor_exponent(currency)).quantize(Decimal(1), ROUND_HALF_UP))
+
+def from_minor(value, currency: str = "VND"):
+    """Ngược của to_minor: VND giữ số nguyên, tiền có phần lẻ -> float."""
+    exp = minor_exponent(currency)
+    return int(value or 0) if exp == 0 else (value or 0) / 10 ** exp
+
+# Tiền tệ báo cáo (KPI/biểu đồ/hạn mức quy đổi về đây) + danh sách chọn khi tạo ví
+BASE_CURRENCY = "VND"
+CURRENCIES = ("VND", "USD", "EUR", "JPY", "KRW", "CNY", "THB", "SGD")
+
+def _format_money_scalar(v, exp: int):
+    try:
+        return f"{float(v) / 10 ** exp:,.{exp}f}".translate(str.maketrans(",.", ".,"))
+    except Exception:
+        return str(v)
+
+def format_money(amount, currency="VND"):
+    """
+    Số tiền (đơn vị nhỏ nhất) -> chuỗi kiểu VN theo tiền tệ: (1234567, 'VND') -> '1.234.567',
+    (123456, 'USD') -> '1.234,56'. amount là Series thì currency có thể là Series cùng index.
+    """
+    if not _is_vector(amount):
+        exp = minor_exponent(currency)
+        return _format_vnd_scalar(amount) if exp == 0 else _format_money_scalar(amount, exp)
+    import pandas as pd
+    amount = amount if isinstance(amount, pd.Series) else pd.Series(amount)
+    cur = currency if isinstance(currency, pd.Series) else pd.Series(currency, index=amount.index)
+    out = format_vnd(amount)
+    for code in cur.dropna().unique():
+        exp = minor_exponent(code)
+        if exp:
+            m = (cur == code).to_numpy()
+            out[m] = _format_grouped(amount[m], exp)
+    return out
+
+def parse_money_str(s, currency="VND") -> float:
+    """
+    Chuỗi nhập -> số tiền (đơn vị chính). Tiền không có phần lẻ (VND): như parse_vnd_str.
+    Còn lại: dấu . hoặc , cuối cùng mà theo sau tối đa `số chữ số lẻ` chữ số là dấu thập phân
+    ('1.234,56' = '1,234.56' = 1234.56; '1.234' = 1234).
+    """
+    exp = minor_exponent(currency)
+    if exp == 0:
+        return parse_vnd_str(s)
+    txt = re.sub(r"[^\d.,]", "", str(s or ""))
+    m = re.search(rf"[.,](\d{{1,{exp}}})$", txt)
+    whole, frac = (txt[:m.start()], m.group(1)) if m else (txt, "")
+    return float(f"{re.sub(r'[^0-9]', '', whole) or 0}.{frac or 0}")
+
+# Thời điểm lưu dạng chuỗi ISO độ dài cố định (so sánh chuỗi = so sánh thời gian, CHECK trong schema)
+OCCURRED_FMT = "%Y-%m-%d %H:%M"        # transactions.occurred_at, 16 ký tự (độ chính xác nhập liệu: phút)
+CREATED_FMT = "%Y-%m-%d %H:%M:%S"      # created_at, 19 ký tự
+
+def norm_occurred(v) -> str:
+    """datetime / date / chuỗi ISO bất kỳ ('2024-05-01', '2024-05-01T10:30:15.5') -> 'YYYY-MM-DD HH:MM'."""
+    if not isinstance(v, dt.datetime):
+        v = (dt.datetime.combine(v, dt.time()) if isinstance(v, dt.date)
+             else dt.datetime.fromisoformat(str(v).strip()))
+    return v.strftime(OCCURRED_FMT)
+
+def now_created() -> str:
+    return dt.datetime.now().strftime(CREATED_FMT)
+
+def join_date_time(d: dt.date, t: dt.time) -> str:
+    return dt.datetime.combine(d, t.replace(second=0, microsecond=0)).strftime(OCCURRED_FMT)
+
+def _strip_accents_nfd(s: str) -> str:
+    s = unicodedata.normalize("NFD", s)
+    return "".join(ch for ch in s if unicodedata.category(ch) != "Mn").lower()
+
+# Bảng translate cho Latin + Latin mở rộng (đủ tiếng Việt) + dấu tổ hợp rời, dựng ở lần dùng đầu;
+# ký tự ngoài các dải này mới phải đi đường NFD chậm.
+@functools.lru_cache(maxsize=1)
+def _fold_table() -> dict:
+    return {cp: _strip_accents_nfd(chr(cp))
+            for rng in (range(0x41, 0x250), range(0x300, 0x370), range(0x1E00, 0x1F00))
+            for cp in rng if _strip_accents_nfd(chr(cp)) != chr(cp)}
+
+_FOLD_SLOW = re.compile(r"[^\x00-\u024f\u0300-\u036f\u1e00-\u1eff]")
+
+@functools.lru_cache(maxsize=65536)
+def _strip_accents_str(s: str) -> str:
+    if s.isascii():
+        return s.lower()
+    if _FOLD_SLOW.search(s):
+        return _strip_accents_nfd(s)
+    return s.translate(_fold_table())
+
+def strip_accents_lower(s):
+    """'Ăn uống' -> 'an uong'. Nhận cả Series/Index/ndarray."""
+    if _is_vector(s):
+        return _map_unique(s, strip_accents_lower)
+    if s is None:
+        return ""
+    return _strip_accents_str(str(s))
+
+# ---------- Thẻ (tags) ----------
+def normalize_tag(name) -> str:
+    """Khoá so khớp thẻ: bỏ '#', dấu, hoa thường, khoảng trắng thừa ('#Đà  Lạt' -> 'da lat')."""
+    return " ".join(strip_accents_lower(str(name or "").strip().lstrip("#")).replace("đ", "d").split())
+
+def parse_tags(text) -> list[str]:
+    """
+    Chuỗi ('du lịch, #Đà Lạt; du lich') hoặc danh sách -> tên thẻ hiển thị, bỏ trùng theo normalize_tag
+    (giữ cách viết gặp đầu tiên): ['du lịch', 'Đà Lạt'].
+    """
+    items = text if isinstance(text, (list, tuple)) else re.split(r"[,;\n]", str(text or ""))
+    out = {}
+    for raw in items:
+        name = " ".join(str(raw).strip().lstrip("#").split())
+        key = normalize_tag(name)
+        if key and key not in out:
+            out[key] = name
+    return list(out.values())
+
+# ---------- Nơi chi tiêu (merchants) ----------
+# Từ bỏ qua khi so khớp tên nơi chi tiêu: loại hình pháp lý (đầu hoặc cuối tên) và số cửa hàng/chi nhánh
+MERCHANT_NOISE = {"cty", "tnhh", "jsc", "ltd", "corp", "inc", "pte", "llc"}
+_MERCHANT_FORM_RE = re.compile(r"^(cong ty|cty)( co phan| cp| tnhh)*\b")
+
+def normalize_merchant(name) -> str:
+    """
+    Khoá so khớp nơi chi tiêu: bỏ dấu, hoa thường, ký tự đặc biệt, số cửa hàng và loại hình pháp lý
+    ('GRAB*Food #123', 'Grab Food') -> 'grab food'; 'Công ty TNHH Phúc Long' -> 'phuc long'.
+    """
+    text = " ".join(re.sub(r"[^0-9a-z]+", " ", strip_accents_lower(str(name or "")).replace("đ", "d")).split())
+    words = [w for w in _MERCHANT_FORM_RE.sub("", text).split() if w not in MERCHANT_NOISE and not w.isdigit()]
+    if len(words) > 1 and words[-1] == "co":      # 'ABC Co., Ltd' (giữ 'Co.op Mart')
+        words.pop()
+    return " ".join(words)
+
+# Khoảng hiển thị cho Tháng/Năm/Tuần
+def start_months_back(end_date: dt.date, months: int) -> dt.date:
+    idx = end_date.year * 12 + (end_date.month - 1) - (months - 1)
+    y0 = idx // 12
+    m0 = idx % 12 + 1
+    return dt.date(y0, m0, 1)
+
+def year_window(end_date: dt.date, years: int):
+    y2 = end_date.year
+    y1 = y2 - (years - 1)
+    return dt.date(y1, 1, 1), dt.date(y2, 12, 31)
+
+def start_weeks_back(end_date: dt.date, weeks: int) -> dt.date:
+    """Thứ Hai đầu tuần ISO, lùi (weeks-1) tuần từ tuần chứa end_date: cột đầu biểu đồ là tuần đủ 7 ngày."""
+    return end_date - dt.timedelta(days=end_date.weekday() + 7*(weeks-1))
+
+def bucket_key(d, mode: str) -> str:
+    """Khoá nhóm của ngày d, cùng định dạng với cột sinh trong daily_totals: '2024-05-31' / '2024-W22' / '2024-05' / '2024'."""
+    d = dt.date.fromisoformat(str(d)[:10])
+    if mode == "week":
+        y, w, _ = d.isocalendar()
+        return f"{y}-W{w:02d}"
+    return {"day": str(d), "month": str(d)[:7], "year": str(d)[:4]}[mode]
+
+def day_range(d1, d2) -> Tuple[str, str]:
+    """
+    [d1, d2] (tính theo ngày) -> khoảng nửa mở [d1, d2+1) để so sánh trực tiếp với chuỗi
+    occurred_at 'YYYY-MM-DD HH:MM' (SQLite dùng được index, không phải gọi date() từng dòng).
+    """
+    d2 = dt.date.fromisoformat(str(d2)[:10])
+    return str(d1)[:10], str(d2 + dt.timedelta(days=1))
+
+# ---------- Data utils ----------
+# Loại giao dịch lưu dạng số nhỏ (transactions.kind, daily_totals.kind); ngoài DB vẫn dùng tên
+TX_KINDS = {"expense": 0, "income": 1, "other": 2}
+
+def kind_name_sql(col: str) -> str:
+    """Biểu thức SQL đổi cột kind -> 'expense'/'income'/'other' (cho kết quả hiển thị/xuất)."""
+    return f"CASE {col} WHEN 0 THEN 'expense' WHEN 1 THEN 'income' ELSE 'other' END"
+
+TYPE_LABELS_VN = {"expense":"Chi tiêu", "income":"Thu nhập"}
+TYPE_LABELS_EMOJI = {"Chi tiêu":"🔴 Chi tiêu", "Thu nhập":"🟢 Thu nhập"}
+
+def type_labels_vi(s: pd.Series, emoji: bool = False) -> pd.Series:
+    """
+    'expense'/'income' -> nhãn tiếng Việt dạng Categorical (thứ tự Chi tiêu → Thu nhập);
+    chỉ dịch danh sách category, không chạm từng dòng. Giá trị lạ giữ nguyên.
+    """
+    import numpy as np, pandas as pd
+    def label(v):
+        v = TYPE_LABELS_VN.get(v, v)
+        return TYPE_LABELS_EMOJI.get(v, v) if emoji else v
+    codes, uniq = pd.factorize(s)
+    new = [label(u) for u in uniq]
+    known = [label(v) for v in TYPE_LABELS_VN.values()]
+    cats = known + sorted({str(v) for v in new} - set(known))
+    remap = np.array([cats.index(str(v)) for v in new] + [-1], dtype=np.int64)
+    out = pd.Categorical.from_codes(remap[codes], categories=cats, ordered=True)
+    return pd.Series(out, index=s.index, name=s.name)
+
+def df_tx_vi(df):
+    if df is None or df.empty: return df
+    m={"id":"ID","occurred_at":"Thời điểm","type":"Loại","amount":"Số tiền","currency":"Tiền tệ",
+       "account":"Ví / Tài khoản","category":"Danh mục","notes":"Ghi chú","tags":"Thẻ","merchant":"Nơi chi tiêu"}
+    df=df.rename(columns={k:v for k,v in m.items() if k in df.columns}).copy()
+    if "Loại" in df.columns:
+        df["Loại"]=type_labels_vi(df["Loại"])
+    if "Số tiền" in df.columns:
+        df["Số tiền"]=(format_money(df["Số tiền"], df["Tiền tệ"]) if "Tiền tệ" in df.columns
+                       else format_vnd(df["Số tiền"]))
+    return df
+
+# ---------- Table helpers (ẩn ID + sort đúng + STT đánh sau sort) ----------
+META_DROP = {"id","user_id","parent_id","ID","user_id","parent_id","sort_key"}
+
+def _detect_sort_kind(df: pd.DataFrame, col: str) -> str:
+    if col == "Loại":
+        return "type"
+    if col in ("Thời điểm","Ngày giao dịch","Từ ngày","Đến ngày"):
+        return "time"
+    norm = strip_accents_lower(col)
+    if any(k in norm for k in ["tien","dư","du","muc","hạn","han","so"]):
+        return "number"
+    return "text"
+
+def _type_key_series(s: pd.Series) -> pd.Series:
+    def to_key(x) -> int:
+        x = str(x)
+        x = x.replace("🟢","").replace("🔴","").strip()
+        x_no = strip_accents_lower(x)
+        if "chi tieu" in x_no:
+            return 0
+        if "thu nhap" in x_no:
+            return 1
+        return 2
+    return _map_unique(s, to_key).astype("int64")
+
+def sort_df_for_display(df: pd.DataFrame, sort_col: str, ascending: bool):
+    if df is None or df.empty or sort_col not in df.columns:
+        return df
+    import pandas as pd
+    kind = _detect_sort_kind(df, sort_col)
+    if kind == "type":
+        key_func = _type_key_series
+        ascending = True
+    elif kind == "time":
+        key_func = lambda s: pd.to_datetime(s, errors="coerce")
+    elif kind == "number":
+        key_func = lambda s: pd.to_numeric(
+            s.astype(str).str.replace(".","",regex=False).str.replace(",","",regex=False).str.strip(),
+            errors="coerce"
+        ).fillna(0.0)
+    else:
+        key_func = lambda s: strip_accents_lower(s.astype(str))
+    return df.sort_values(by=sort_col, ascending=ascending, key=key_func, kind="mergesort")
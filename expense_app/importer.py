@@ -0,0 +1,388 @@
+# ==========================================
+# Nhập giao dịch hàng loạt từ CSV / XLSX / OFX: đọc + tra cứu cả file ngoài khoá ghi, chống trùng theo mã băm,
+# rồi executemany theo lô trong 1 transaction ngắn.
+# ==========================================
+import csv, datetime as dt, functools, hashlib, io, re, time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from .cache import bump_data_version
+from .db import get_pool, transaction
+from .helpers import (BASE_CURRENCY, TX_KINDS, format_money, minor_exponent, normalize_merchant, normalize_tag,
+                      now_created, parse_money_str, parse_vnd_str, strip_accents_lower, to_minor)
+from .queries import _get_merchant, _get_tags, _merchant_keys, _tag_keys
+from .schema import BULK_SEARCH_INSERT
+
+# ---------- Bulk import (CSV / XLSX / OFX) ----------
+IMPORT_DATE_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d",
+                       "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d-%m-%Y", "%Y%m%d%H%M%S", "%Y%m%d")
+# Tên cột chấp nhận (so sau khi bỏ dấu) -> trường chuẩn; trùng tên cột với file xuất ở trên
+IMPORT_COLUMN_ALIASES = {
+    "occurred_at": ("ngay giao dich", "thoi diem", "ngay", "date", "occurred_at", "time"),
+    "account": ("vi / tai khoan", "vi", "tai khoan", "account"),
+    "category": ("danh muc", "category"),
+    "type": ("loai", "type"),
+    "amount": ("so tien (vnd)", "so tien", "amount"),
+    "notes": ("ghi chu", "notes", "note", "memo", "description"),
+    "currency": ("tien te", "currency", "ccy"),
+    "tags": ("the", "tags", "tag"),
+    "merchant": ("noi chi tieu", "merchant", "payee", "cua hang"),
+}
+IMPORT_TYPES = {"chi tieu": "expense", "expense": "expense", "thu nhap": "income", "income": "income"}
+IMPORT_BATCH = 5_000
+
+# Đường nhanh (regex) cho các định dạng hay gặp: (pattern, vị trí nhóm Y, m, d, H, M)
+_IMPORT_DATE_FAST = (
+    (re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::\d{2})?)?$"), (1, 2, 3, 4, 5)),
+    (re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})(?: (\d{1,2}):(\d{2})(?::\d{2})?)?$"), (3, 2, 1, 4, 5)),
+    (re.compile(r"(\d{4})(\d{2})(\d{2})(?:(\d{2})(\d{2})(?:\d{2})?)?$"), (1, 2, 3, 4, 5)),
+)
+
+@functools.lru_cache(maxsize=4096)
+def _fold(s) -> str:
+    return strip_accents_lower(s).replace("đ", "d").strip()
+
+def _date_parser():
+    """Parser ngày: regex cho định dạng quen thuộc, còn lại thử IMPORT_DATE_FORMATS (nhớ định dạng khớp gần nhất)."""
+    order = list(IMPORT_DATE_FORMATS)
+    def parse(v):
+        if isinstance(v, dt.datetime):
+            return v.strftime("%Y-%m-%d %H:%M")
+        if isinstance(v, dt.date):
+            return v.strftime("%Y-%m-%d 00:00")
+        s = str(v or "").strip()
+        for rx, (iy, im, id_, ih, imin) in _IMPORT_DATE_FAST:
+            m = rx.match(s)
+            if m:
+                g = m.groups()
+                try:
+                    d = dt.datetime(int(g[iy-1]), int(g[im-1]), int(g[id_-1]),
+                                    int(g[ih-1] or 0), int(g[imin-1] or 0))
+                except ValueError:
+                    return None
+                return f"{d.year:04d}-{d.month:02d}-{d.day:02d} {d.hour:02d}:{d.minute:02d}"
+        for i, f in enumerate(order):
+            try:
+                out = dt.datetime.strptime(s, f).strftime("%Y-%m-%d %H:%M")
+            except ValueError:
+                continue
+            if i:
+                order.insert(0, order.pop(i))
+            return out
+        return None
+    return parse
+
+@functools.lru_cache(maxsize=8192)
+def _parse_import_amount(v, currency=BASE_CURRENCY):
+    """
+    -> (số tiền dương theo đơn vị nhỏ nhất, có dấu âm?). Tiền không có phần lẻ (VND): bỏ phần thập phân
+    1–2 chữ số rồi dùng parse_vnd_str; còn lại dùng parse_money_str (nhận cả '1.234,56' và '1,234.56').
+    Cache theo chuỗi gốc: sao kê lặp lại nhiều số tiền giống nhau.
+    """
+    if isinstance(v, (int, float)):
+        return to_minor(abs(float(v)), currency), v < 0
+    s = str(v or "").strip()
+    neg = s.startswith(("-", "("))
+    if minor_exponent(currency):
+        return to_minor(parse_money_str(s, currency), currency), neg
+    s = re.sub(r"[.,]\d{1,2}\s*\)?$", "", s)
+    return to_minor(parse_vnd_str(s), currency), neg
+
+def _iter_table_rows(header, rows):
+    cols = {}
+    for i, h in enumerate(header):
+        key = _fold(h)
+        for field, aliases in IMPORT_COLUMN_ALIASES.items():
+            if key in aliases and field not in cols.values():
+                cols[i] = field
+                break
+    if not {"occurred_at", "amount"} <= set(cols.values()):
+        raise ValueError("File thiếu cột ngày hoặc số tiền.")
+    for line, row in enumerate(rows, start=2):
+        if not row or all(v in (None, "") for v in row):
+            continue
+        yield line, {f: (row[i] if i < len(row) else None) for i, f in cols.items()}
+
+def _read_csv(fh):
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    yield from _iter_table_rows(next(reader, []), reader)
+
+def _read_xlsx(fh):
+    import openpyxl
+    wb = openpyxl.load_workbook(fh, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        yield from _iter_table_rows(next(rows, ()), rows)
+    finally:
+        wb.close()
+
+def _read_ofx(fh):
+    """OFX/QFX (SGML hoặc XML): mỗi khối <STMTTRN> là 1 giao dịch; TRNAMT âm = chi."""
+    text = io.TextIOWrapper(fh, encoding="utf-8", errors="replace")
+    cur, start = None, 0
+    for line_no, line in enumerate(text, 1):
+        for tag, val in re.findall(r"<(/?[A-Za-z0-9.]+)>([^<\r\n]*)", line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                cur, start = {}, line_no
+            elif tag == "/STMTTRN" and cur is not None:
+                yield start, {
+                    "occurred_at": cur.get("DTPOSTED", "").split("[")[0].split(".")[0],
+                    "amount": cur.get("TRNAMT"),
+                    "notes": " - ".join(x for x in (cur.get("NAME"), cur.get("MEMO")) if x),
+                    "merchant": cur.get("NAME"),
+                }
+                cur = None
+            elif cur is not None and not tag.startswith("/"):
+                cur[tag] = val.strip()
+
+IMPORT_READERS = {"csv": _read_csv, "xlsx": _read_xlsx, "ofx": _read_ofx, "qfx": _read_ofx}
+
+def _apply_bulk_insert(c, uid, after_id):
+    """
+    Cộng daily_totals, daily_tag_totals, monthly_merchant_totals + số dư và chèn tx_search (FTS) cho các dòng
+    vừa nhập (id > after_id), thay cho trigger từng dòng. Gọi sau khi đã chèn transaction_tags của các dòng đó.
+    '+' trước cột: buộc quét theo khoảng rowid (chỉ các dòng mới, theo thứ tự id) thay vì index theo user.
+    """
+    c.execute("""INSERT INTO daily_totals(user_id,day,category_id,account_id,kind,currency,amount_sum,tx_count)
+                 SELECT user_id, substr(occurred_at,1,10), IFNULL(category_id,0), account_id, kind, currency,
+                        SUM(amount), COUNT(*)
+                 FROM transactions WHERE +user_id=? AND id>? AND +import_hash IS NOT NULL
+                 GROUP BY 1,2,3,4,5,6
+                 ON CONFLICT(user_id,day,kind,category_id,account_id,currency)
+                 DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+excluded.tx_count""",
+              (uid, after_id))
+    c.execute("""INSERT INTO daily_tag_totals(user_id,kind,day,tag_id,currency,amount_sum,tx_count)
+                 SELECT t.user_id, t.kind, substr(t.occurred_at,1,10), tt.tag_id, t.currency, SUM(t.amount), COUNT(*)
+                 FROM transaction_tags tt JOIN transactions t ON t.id=tt.transaction_id
+                 WHERE tt.transaction_id>? AND +t.user_id=? AND +t.import_hash IS NOT NULL
+                 GROUP BY 1,2,3,4,5
+                 ON CONFLICT(user_id,kind,day,tag_id,currency)
+                 DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+excluded.tx_count""",
+              (after_id, uid))
+    c.execute("""INSERT INTO monthly_merchant_totals(user_id,kind,month,merchant_id,currency,amount_sum,tx_count)
+                 SELECT user_id, kind, substr(occurred_at,1,7), merchant_id, currency, SUM(amount), COUNT(*)
+                 FROM transactions WHERE +user_id=? AND id>? AND +import_hash IS NOT NULL AND +merchant_id IS NOT NULL
+                 GROUP BY 1,2,3,4,5
+                 ON CONFLICT(user_id,kind,month,merchant_id,currency)
+                 DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+excluded.tx_count""",
+              (uid, after_id))
+    c.execute("""UPDATE accounts SET balance=balance+x.delta
+                 FROM (SELECT account_id,
+                              SUM(CASE kind WHEN 1 THEN amount WHEN 0 THEN -amount ELSE 0 END) AS delta
+                       FROM transactions WHERE +user_id=? AND id>? AND +import_hash IS NOT NULL
+                       GROUP BY account_id) AS x
+                 WHERE accounts.id=x.account_id AND accounts.user_id=?""", (uid, after_id, uid))
+    c.execute(BULK_SEARCH_INSERT, (uid, after_id))
+
+@contextmanager
+def _deferred_indexes(c, table: str = "transactions"):
+    """
+    Bỏ các index phụ (không UNIQUE: INSERT OR IGNORE chống trùng cần index import_hash) của table, tạo lại sau khối
+    lệnh trong cùng transaction — dựng index 1 lần (sắp xếp) rẻ hơn cập nhật từng dòng khi lô nhập lớn hơn cả bảng.
+    Lỗi giữa chừng: không tạo lại, ROLLBACK của transaction trả index về như cũ.
+    """
+    idx = c.execute("""SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL
+                       AND sql NOT LIKE 'CREATE UNIQUE%'""", (table,)).fetchall()
+    had_stats = (c.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone()
+                 and c.execute("SELECT 1 FROM sqlite_stat1 WHERE tbl=?", (table,)).fetchone())
+    for name, _ in idx:
+        c.execute(f'DROP INDEX "{name}"')
+    yield
+    for _, sql in idx:
+        c.execute(sql)
+    if had_stats:      # DROP INDEX xoá luôn thống kê của index: đo lại để planner không lệch sang index còn số liệu
+        c.execute(f'ANALYZE "{table}"')
+
+def _create_pending(c, uid, pending: dict) -> dict:
+    """
+    id tạm (âm) -> id thật cho danh mục / thẻ / nơi chi tiêu mới gặp lúc đọc file. Tạo trong transaction ghi;
+    thẻ / nơi chi tiêu có thể vừa được tạo ở chỗ khác sau lúc đọc -> lấy lại id theo norm_name.
+    """
+    ids = {}
+    for pid, (table, name, key) in pending.items():
+        if table == "categories":
+            r = c.execute("SELECT id FROM categories WHERE user_id=? AND name=? AND type=?", (uid, name, key)).fetchone()
+            ids[pid] = r[0] if r else c.execute("INSERT INTO categories(user_id,name,type) VALUES(?,?,?)",
+                                                (uid, name, key)).lastrowid
+        else:
+            c.execute(f"INSERT OR IGNORE INTO {table}(user_id,name,norm_name) VALUES(?,?,?)", (uid, name, key))
+            ids[pid] = c.execute(f"SELECT id FROM {table} WHERE user_id=? AND norm_name=?", (uid, key)).fetchone()[0]
+    return ids
+
+def import_transactions(uid, fh, fmt: str, default_account_id=None, dry_run: bool = False,
+                        create_categories: bool = False, batch_size: int = IMPORT_BATCH,
+                        max_errors: int = 50) -> dict:
+    """
+    Nhập giao dịch hàng loạt từ file nhị phân fh (định dạng fmt: csv/xlsx/ofx).
+    - Đọc + tra ví/danh mục/thẻ/nơi chi tiêu bằng dict trong bộ nhớ trên connection đọc, chưa giữ khoá ghi;
+      danh mục/thẻ/nơi chi tiêu mới mang id tạm (âm), chỉ tạo khi ghi
+    - Chống trùng bằng mã băm nội dung (import_hash); nhập lại cùng file không sinh bản sao
+    - Ghi trong 1 transaction ngắn: tạo mục mới, executemany theo lô (sắp theo thời gian), bảng nối thẻ,
+      _apply_bulk_insert; dry_run=True chỉ trả báo cáo, không ghi
+    - tiền tệ của giao dịch = tiền tệ của ví; cột tiền tệ (nếu có) phải khớp ví, không quy đổi khi nhập
+    - cột thẻ (nếu có): tách theo dấu phẩy, tra thẻ 1 lần cho cả file; bảng nối chèn 1 lần sau cùng,
+      daily_tag_totals cộng theo nhóm trong _apply_bulk_insert (bỏ qua trigger từng dòng)
+    - cột nơi chi tiêu (OFX: NAME): khớp nơi chi tiêu đã có theo tên chuẩn hoá, chưa có thì tạo
+    """
+    uid, t0 = int(uid), time.perf_counter()
+    parse_date = _date_parser()
+    default_positive = "income" if fmt in ("ofx", "qfx") else "expense"
+    report = {"rows": 0, "valid": 0, "duplicates": 0, "inserted": 0, "error_count": 0, "errors": [],
+              "unknown_categories": Counter(), "new_categories": [], "new_merchants": [],
+              "income": Counter(), "expense": Counter(),
+              "first": None, "last": None, "dry_run": dry_run, "write_seconds": 0.0}
+
+    def error(line, msg):
+        report["error_count"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append((line, msg))
+
+    pending = {}   # id tạm -> (bảng, tên, khoá): tạo trong transaction ghi
+
+    def placeholder(table, name, key):
+        pid = -1 - len(pending)
+        pending[pid] = (table, name, key)
+        return pid
+
+    pool = get_pool()
+    with pool.connection() as c:
+        acc_rows = c.execute("SELECT id,name,currency FROM accounts WHERE user_id=?", (uid,)).fetchall()
+        cats = {(r["type"], _fold(r["name"])): r["id"] for r in
+                c.execute("SELECT id,name,type FROM categories WHERE user_id=?", (uid,)).fetchall()}
+        merchants, tag_keys = _merchant_keys(c, uid), _tag_keys(c, uid)
+        known = {r[0] for r in c.execute(
+            "SELECT import_hash FROM transactions WHERE user_id=? AND import_hash IS NOT NULL", (uid,)).fetchall()}
+    accounts = {_fold(r["name"]): r["id"] for r in acc_rows}
+    acc_currency = {r["id"]: r["currency"] for r in acc_rows}
+    cat_types = {name: t for t, name in sorted(cats, reverse=True)}   # trùng tên -> ưu tiên "expense"
+    seen, rows, tx_tags, now = Counter(), [], {}, now_created()
+    tag_cache, merchant_cache = {}, {}   # chuỗi gốc -> kết quả tra (file thường lặp lại cùng thẻ / nơi chi tiêu)
+
+    for line, raw in IMPORT_READERS[fmt](fh):
+        report["rows"] += 1
+        occurred = parse_date(raw.get("occurred_at"))
+        if not occurred:
+            error(line, f"Ngày không hợp lệ: {raw.get('occurred_at')!r}"); continue
+        acc_name = _fold(raw.get("account") or "")
+        acc_id = accounts.get(acc_name) if acc_name else default_account_id
+        if acc_id is None:
+            error(line, f"Không tìm thấy ví: {raw.get('account')!r}"); continue
+        currency = acc_currency.get(acc_id, BASE_CURRENCY)
+        row_ccy = str(raw.get("currency") or "").strip().upper()
+        if row_ccy and row_ccy != currency:
+            error(line, f"Tiền tệ {row_ccy} khác tiền tệ của ví ({currency})"); continue
+        minor, neg = _parse_import_amount(raw.get("amount"), currency)
+        if minor <= 0:
+            error(line, f"Số tiền không hợp lệ: {raw.get('amount')!r}"); continue
+        ttype = IMPORT_TYPES.get(_fold(raw.get("type") or ""))
+        if ttype is None:
+            # File không có cột loại (vd. file xuất từ app) -> đoán theo danh mục đã có
+            ttype = "expense" if neg else cat_types.get(_fold(str(raw.get("category") or "").strip()), default_positive)
+        cat_id, cat_name = None, str(raw.get("category") or "").strip()
+        if cat_name:
+            cat_id = cats.get((ttype, _fold(cat_name)))
+            if cat_id is None and create_categories:
+                cat_id = cats[(ttype, _fold(cat_name))] = placeholder("categories", cat_name, ttype)
+                cat_types.setdefault(_fold(cat_name), ttype)
+                report["new_categories"].append(cat_name)
+            elif cat_id is None:
+                report["unknown_categories"][cat_name] += 1
+        notes = str(raw.get("notes") or "").strip() or None
+
+        # Cùng nội dung xuất hiện n lần trong file -> n giao dịch khác nhau (#1, #2, ...)
+        base = f"{acc_id}|{occurred}|{ttype}|{minor}|{notes or ''}"
+        seen[base] += 1
+        h = hashlib.sha1(f"{base}#{seen[base]}".encode("utf-8")).hexdigest()[:24]
+        report["valid"] += 1
+        if h in known:
+            report["duplicates"] += 1; continue
+        known.add(h)
+        report[ttype][currency] += minor
+        report["first"] = min(report["first"] or occurred, occurred)
+        report["last"] = max(report["last"] or occurred, occurred)
+        tags, tag_ids = tag_cache.get(raw.get("tags")) or (None, None)
+        if tag_ids is None and raw.get("tags"):
+            tag_list = _get_tags(None, uid, raw["tags"], tag_keys, create=False)
+            for i, (tag_id, name) in enumerate(tag_list):
+                if tag_id is None:
+                    key = normalize_tag(name)
+                    tag_list[i] = tag_keys[key] = (placeholder("tags", name, key), name)
+            tags, tag_ids = tag_cache[raw["tags"]] = (", ".join(name for _, name in tag_list) or None,
+                                                      [tag_id for tag_id, _ in tag_list])
+        if tags:
+            tx_tags[h] = tag_ids
+        merchant = str(raw.get("merchant") or "").strip()
+        merchant_id = merchant_cache.get(merchant)
+        if merchant and merchant not in merchant_cache:
+            n_merchants = len(merchants)
+            merchant_id = _get_merchant(None, uid, merchant, merchants, create=False)
+            if len(merchants) > n_merchants:
+                key = normalize_merchant(merchant)
+                merchant_id = merchants[key] = placeholder("merchants", merchant, key)
+                report["new_merchants"].append(merchant)
+            merchant_cache[merchant] = merchant_id
+        rows.append((uid, acc_id, TX_KINDS[ttype], cat_id, minor, currency, notes, occurred, now, h, tags,
+                     merchant_id))
+    report["inserted"] = len(rows)
+
+    if rows and not dry_run:
+        rows.sort(key=lambda r: r[7])   # chèn theo thời gian -> cập nhật index tuần tự hơn
+        t1 = time.perf_counter()
+        with transaction() as c, pool.untraced(c):
+            if pending:
+                ids = _create_pending(c, uid, pending)
+                rows = [r if (r[3] or 0) >= 0 and (r[11] or 0) >= 0 else
+                        r[:3] + (ids.get(r[3], r[3]),) + r[4:11] + (ids.get(r[11], r[11]),) for r in rows]
+                tx_tags = {h: [ids.get(t, t) for t in tag_ids] for h, tag_ids in tx_tags.items()}
+            after_id = c.execute("SELECT COALESCE(MAX(id),0) FROM transactions").fetchone()[0]
+            inserted = 0
+            # after_id >= số dòng hiện có: lô lớn hơn cả bảng -> dựng lại index sau khi chèn
+            with _deferred_indexes(c) if len(rows) >= after_id else nullcontext():
+                for i in range(0, len(rows), batch_size):
+                    # OR IGNORE: import khác cùng file có thể đã ghi sau lúc đọc `known`
+                    inserted += c.executemany("""INSERT OR IGNORE INTO transactions(user_id,account_id,kind,
+                                                 category_id,amount,currency,notes,occurred_at,created_at,import_hash,
+                                                 tags,merchant_id)
+                                                 VALUES(?,?,?,?,?,?,?,?,?,?,?,?)""", rows[i:i + batch_size]).rowcount
+            report["duplicates"] += len(rows) - inserted
+            report["inserted"] = inserted
+            if tx_tags:
+                links = [(tx_id, tag_id) for tx_id, h in c.execute(
+                            """SELECT id, import_hash FROM transactions
+                               WHERE +user_id=? AND id>? AND +import_hash IS NOT NULL AND tags IS NOT NULL""",
+                            (uid, after_id)) for tag_id in tx_tags.get(h, ())]
+                # cờ bulk: trigger trg_ttag_rollup_ins bỏ qua, _apply_bulk_insert cộng daily_tag_totals theo nhóm
+                c.execute("INSERT INTO _bulk_state(key) VALUES('tags')")
+                c.executemany("INSERT OR IGNORE INTO transaction_tags(transaction_id, tag_id) VALUES(?,?)", links)
+                c.execute("DELETE FROM _bulk_state WHERE key='tags'")
+            _apply_bulk_insert(c, uid, after_id)
+        report["write_seconds"] = time.perf_counter() - t1
+
+    if report["inserted"] and not dry_run:
+        bump_data_version(uid)
+    report["seconds"] = time.perf_counter() - t0
+    report["rows_per_sec"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+    return report
+
+def format_import_report(r: dict) -> list[str]:
+    verb = "Sẽ nhập" if r["dry_run"] else "Đã nhập"
+    lines = [
+        f"Đọc {r['rows']} dòng · hợp lệ {r['valid']} · trùng {r['duplicates']} · lỗi {r['error_count']}",
+        f"{verb} {r['inserted']} giao dịch"
+        + (f" ({r['first']} → {r['last']})" if r["first"] else ""),
+        " · ".join(f"Thu {format_money(r['income'][cur], cur)} {cur} · Chi {format_money(r['expense'][cur], cur)} {cur}"
+                   for cur in sorted(set(r["income"]) | set(r["expense"]) or {BASE_CURRENCY})),
+        f"{r['seconds']:.2f}s · {r['rows_per_sec']:,.0f} dòng/s"
+        + (f" · giữ khoá ghi {r['write_seconds']:.2f}s" if r.get("write_seconds") else ""),
+    ]
+    if r["new_categories"]:
+        lines.append(f"Danh mục mới: {', '.join(dict.fromkeys(r['new_categories']))}")
+    if r["new_merchants"]:
+        lines.append(f"Nơi chi tiêu mới: {', '.join(r['new_merchants'][:20])}"
+                     + (f" (+{len(r['new_merchants']) - 20})" if len(r["new_merchants"]) > 20 else ""))
+    if r["unknown_categories"]:
+        lines.append("Danh mục không có (để trống): "
+                     + ", ".join(f"{k} ×{v}" for k, v in r["unknown_categories"].most_common(10)))
+    return lines
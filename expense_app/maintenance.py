@@ -0,0 +1,164 @@
+# ==========================================
+# Bảo trì: dựng lại bảng dẫn xuất (daily_totals, daily_tag_totals, monthly_merchant_totals, số dư,
+# category_closure), đối chiếu và kiểm tra query plan.
+# ==========================================
+import re
+
+from .aggregates import (budget_progress_df, category_expense_df, category_subtree_totals, period_sum,
+                         query_agg_expense, tag_expense_df, top_merchants_df)
+from .cache import bump_data_version
+from .dashboard import dashboard_window, load_dashboard_snapshot
+from .db import get_df, get_pool, transaction
+from .queries import count_transactions, list_transactions, list_transactions_page
+from .search import search_transactions
+
+# Tổng theo thẻ tính lại từ transactions + transaction_tags (cùng cột với daily_tag_totals)
+_TAG_TOTALS_FRESH = """
+    SELECT t.user_id, t.kind, substr(t.occurred_at,1,10) AS day, tt.tag_id, t.currency,
+           SUM(t.amount) AS amount_sum, COUNT(*) AS tx_count
+    FROM transaction_tags tt JOIN transactions t ON t.id=tt.transaction_id {where}
+    GROUP BY 1,2,3,4,5"""
+# Tổng theo nơi chi tiêu / tháng tính lại từ transactions (cùng cột với monthly_merchant_totals)
+_MERCHANT_TOTALS_FRESH = """
+    SELECT user_id, kind, substr(occurred_at,1,7) AS month, merchant_id, currency,
+           SUM(amount) AS amount_sum, COUNT(*) AS tx_count
+    FROM transactions WHERE merchant_id IS NOT NULL {where}
+    GROUP BY 1,2,3,4,5"""
+
+def rebuild_daily_totals(uid=None):
+    """
+    Tính lại daily_totals + daily_tag_totals + monthly_merchant_totals từ transactions
+    (toàn bộ hoặc 1 user) để sửa sai lệch.
+    """
+    where, p = ("WHERE user_id=?", (int(uid),)) if uid is not None else ("", ())
+    with transaction() as c:
+        c.execute(f"DELETE FROM monthly_merchant_totals {where}", p)
+        c.execute("INSERT INTO monthly_merchant_totals(user_id,kind,month,merchant_id,currency,amount_sum,tx_count)"
+                  + _MERCHANT_TOTALS_FRESH.format(where=where.replace("WHERE", "AND")), p)
+        c.execute(f"DELETE FROM daily_tag_totals {where}", p)
+        c.execute("INSERT INTO daily_tag_totals(user_id,kind,day,tag_id,currency,amount_sum,tx_count)"
+                  + _TAG_TOTALS_FRESH.format(where=where.replace("user_id", "t.user_id")), p)
+        c.execute(f"DELETE FROM daily_totals {where}", p)
+        c.execute(f"""INSERT INTO daily_totals(user_id,day,category_id,account_id,kind,currency,amount_sum,tx_count)
+                      SELECT user_id, substr(occurred_at,1,10), IFNULL(category_id,0), account_id, kind, currency,
+                             SUM(amount), COUNT(*)
+                      FROM transactions {where} GROUP BY 1,2,3,4,5,6""", p)
+    bump_data_version(uid)
+
+def check_daily_totals(uid=None) -> int:
+    """Số dòng daily_totals + daily_tag_totals + monthly_merchant_totals lệch so với tổng tính lại (0 = khớp)."""
+    where, p = ("WHERE user_id=?", (int(uid),)) if uid is not None else ("", ())
+    q = f"""
+        WITH fresh AS (
+          SELECT user_id, substr(occurred_at,1,10) AS day, IFNULL(category_id,0) AS category_id, account_id, kind,
+                 currency, SUM(amount) AS amount_sum, COUNT(*) AS tx_count
+          FROM transactions {where} GROUP BY 1,2,3,4,5,6),
+        cur AS (SELECT user_id, day, category_id, account_id, kind, currency, amount_sum, tx_count
+                FROM daily_totals {where})
+        SELECT (SELECT COUNT(*) FROM (SELECT * FROM fresh EXCEPT SELECT * FROM cur))
+             + (SELECT COUNT(*) FROM (SELECT * FROM cur EXCEPT SELECT * FROM fresh))"""
+    qt = f"""
+        WITH fresh AS ({_TAG_TOTALS_FRESH.format(where=where.replace("user_id", "t.user_id"))}),
+        cur AS (SELECT user_id, kind, day, tag_id, currency, amount_sum, tx_count FROM daily_tag_totals {where})
+        SELECT (SELECT COUNT(*) FROM (SELECT * FROM fresh EXCEPT SELECT * FROM cur))
+             + (SELECT COUNT(*) FROM (SELECT * FROM cur EXCEPT SELECT * FROM fresh))"""
+    qm = f"""
+        WITH fresh AS ({_MERCHANT_TOTALS_FRESH.format(where=where.replace("WHERE", "AND"))}),
+        cur AS (SELECT user_id, kind, month, merchant_id, currency, amount_sum, tx_count
+                FROM monthly_merchant_totals {where})
+        SELECT (SELECT COUNT(*) FROM (SELECT * FROM fresh EXCEPT SELECT * FROM cur))
+             + (SELECT COUNT(*) FROM (SELECT * FROM cur EXCEPT SELECT * FROM fresh))"""
+    with get_pool().connection() as c:
+        return sum(int(c.execute(x, p + p).fetchone()[0]) for x in (q, qt, qm))
+
+# Số dư tính lại từ lịch sử (chỉ dùng để kiểm tra/sửa, không dùng khi hiển thị)
+_BALANCE_FROM_HISTORY = """
+    SELECT a.id, a.user_id, a.name, a.balance,
+           a.opening_balance + COALESCE((
+             SELECT SUM(CASE t.kind WHEN 1 THEN t.amount WHEN 0 THEN -t.amount ELSE 0 END)
+             FROM transactions t WHERE t.user_id=a.user_id AND t.account_id=a.id), 0) AS expected
+    FROM accounts a"""
+
+def check_balances(uid=None, tolerance: int = 0):
+    """So accounts.balance với số dư tính lại từ lịch sử; trả về các ví bị lệch (cột drift = balance - expected).
+    Số tiền là số nguyên nên mặc định không chấp nhận lệch."""
+    q, p = _BALANCE_FROM_HISTORY, ()
+    if uid is not None:
+        q += " WHERE a.user_id=?"; p = (int(uid),)
+    df = get_df(q, p)
+    df["drift"] = df["balance"] - df["expected"]
+    return df[df["drift"].abs() > tolerance].reset_index(drop=True)
+
+def rebuild_balances(uid=None):
+    """Ghi đè accounts.balance bằng số dư tính lại từ lịch sử."""
+    where, p = ("WHERE a.user_id=?", (int(uid),)) if uid is not None else ("", ())
+    with transaction() as c:
+        c.execute(f"""UPDATE accounts SET balance=x.expected
+                      FROM ({_BALANCE_FROM_HISTORY} {where}) AS x WHERE accounts.id=x.id""", p)
+    bump_data_version(uid)
+
+# Closure tính lại từ parent_id (đệ quy; chỉ dùng để kiểm tra/sửa — lúc chạy trigger giữ bảng khớp)
+_CLOSURE_FROM_PARENTS = """
+    WITH RECURSIVE t(ancestor_id, descendant_id, depth) AS (
+      SELECT id, id, 0 FROM categories
+      UNION ALL
+      SELECT t.ancestor_id, c.id, t.depth + 1 FROM t JOIN categories c ON c.parent_id=t.descendant_id
+    ) SELECT ancestor_id, descendant_id, depth FROM t"""
+
+def check_category_closure() -> int:
+    """Số dòng category_closure lệch so với cây parent_id (0 = khớp)."""
+    q = f"""
+        WITH fresh AS ({_CLOSURE_FROM_PARENTS}),
+             cur AS (SELECT ancestor_id, descendant_id, depth FROM category_closure)
+        SELECT (SELECT COUNT(*) FROM (SELECT * FROM fresh EXCEPT SELECT * FROM cur))
+             + (SELECT COUNT(*) FROM (SELECT * FROM cur EXCEPT SELECT * FROM fresh))"""
+    with get_pool().connection() as c:
+        return int(c.execute(q).fetchone()[0])
+
+def rebuild_category_closure():
+    """Dựng lại category_closure + categories.level từ parent_id (mọi user)."""
+    with transaction() as c:
+        c.execute("DELETE FROM category_closure")
+        c.execute(f"INSERT INTO category_closure(ancestor_id, descendant_id, depth) {_CLOSURE_FROM_PARENTS}")
+        c.execute("""UPDATE categories SET level=(SELECT MAX(depth) FROM category_closure
+                                                 WHERE descendant_id=categories.id)""")
+    bump_data_version()
+
+# ---------- Query plan check ----------
+TX_SCAN_RE = re.compile(r"^SCAN (transactions|t|daily_totals|d|monthly_merchant_totals)\b")
+
+def explain_plan(sql: str) -> list[str]:
+    with get_pool().connection() as c:
+        return [r["detail"] for r in c.execute("EXPLAIN QUERY PLAN " + sql).fetchall()]
+
+def check_query_plans(uid, d1, d2) -> list[tuple[str, str]]:
+    """
+    Chạy các truy vấn nóng rồi EXPLAIN QUERY PLAN từng câu SELECT đụng tới transactions/bảng tổng.
+    Trả về [(sql, detail)] của các câu còn full-scan các bảng đó (rỗng = đạt).
+    """
+    with get_pool().capture() as stmts:   # gọi bản không cache để chắc chắn chạy SQL
+        list_transactions.__wrapped__(uid, d1, d2)
+        list_transactions_page.__wrapped__(uid, d1, d2, "expense", after=(str(d2), 1 << 60))
+        list_transactions_page.__wrapped__(uid, d1, d2, sort="amount", after=(1 << 60, 1 << 60))
+        count_transactions.__wrapped__(uid, d1, d2)
+        period_sum.__wrapped__(uid, d1, d2)
+        for mode in ("day", "week", "month", "year"):
+            query_agg_expense.__wrapped__(uid, d1, d2, mode)
+        category_expense_df.__wrapped__(uid, d1, d2, True)
+        category_expense_df.__wrapped__(uid, d1, d2, False)
+        category_expense_df.__wrapped__(uid, d1, d2, level=1)
+        tag_expense_df.__wrapped__(uid, d1, d2)
+        top_merchants_df.__wrapped__(uid, d1, d2)
+        top_merchants_df.__wrapped__(uid, d1, d2, by="count")
+        category_subtree_totals.__wrapped__(uid, d1, d2)
+        budget_progress_df.__wrapped__(uid, d1, d2)
+        load_dashboard_snapshot.__wrapped__(uid, *dashboard_window(d1, d2))
+        search_transactions.__wrapped__(uid, "a", d1, d2)
+        search_transactions.__wrapped__(uid, "zzzz", d1, d2)
+    bad = []
+    for sql in stmts:
+        if not re.search(r"transactions|daily_totals|merchant_totals", sql) or \
+                not sql.lstrip().upper().startswith("SELECT"):
+            continue
+        bad += [(sql, d) for d in explain_plan(sql) if TX_SCAN_RE.match(d)]
+    return bad
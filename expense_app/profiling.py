@@ -0,0 +1,151 @@
+# ==========================================
+# Đo thời gian từng rerun (bật khi cần): mỗi câu SQL qua get_df/execute/fetchone (thời gian, số dòng,
+# câu SQL), mỗi hàm truy vấn có cache khi phải chạy thật, mỗi trang page_* và mỗi biểu đồ.
+#   EXPENSE_PROFILE=1                 bật, hiện bảng "⏱ Profiling" ở sidebar
+#   EXPENSE_PROFILE_LOG=profile.jsonl bật + ghi mỗi sự kiện thành 1 dòng JSON để phân tích sau
+# Tắt (mặc định): span()/profiled() chỉ tốn 1 lần đọc biến toàn cục, không gọi perf_counter.
+# Tham số SQL không bao giờ được ghi (có thể chứa email/mật khẩu băm).
+# ==========================================
+import contextlib, functools, itertools, json, os, threading, time
+
+LOG_PATH = os.environ.get("EXPENSE_PROFILE_LOG") or None
+ENABLED = os.environ.get("EXPENSE_PROFILE") == "1" or LOG_PATH is not None
+
+_tls = threading.local()             # run đang mở của thread hiện tại (= 1 rerun Streamlit)
+_log_lock = threading.Lock()
+_run_ids = itertools.count(1)
+
+def enable(log_path: str | None = None):
+    global ENABLED, LOG_PATH
+    ENABLED = True
+    LOG_PATH = log_path or LOG_PATH
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+def _write(events):
+    if not LOG_PATH or not events:
+        return
+    lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+    with _log_lock, open(LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(lines)
+
+def _record(event: dict):
+    run = getattr(_tls, "run", None)
+    if run is not None:
+        event["run"] = run["run"]
+        run["events"].append(event)
+    else:                           # ngoài rerun (CLI, thread nền): ghi thẳng
+        _write([event])
+
+# ---------- Span ----------
+class _Span:
+    __slots__ = ("kind", "name", "sql", "rows", "t0")
+
+    def __init__(self, kind, name, sql=None):
+        self.kind, self.name, self.sql, self.rows = kind, name, sql, None
+
+    def set_rows(self, n):
+        self.rows = n
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, et, ev, tb):
+        e = {"ts": time.time(), "kind": self.kind, "name": self.name,
+             "ms": round((time.perf_counter() - self.t0) * 1000, 3)}
+        if self.rows is not None:
+            e["rows"] = self.rows
+        if self.sql is not None:
+            e["sql"] = self.sql
+        if et is not None:
+            e["error"] = et.__name__
+        _record(e)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+    def set_rows(self, n): pass
+    def __enter__(self): return self
+    def __exit__(self, et, ev, tb): return False
+
+_NO_SPAN = _NoSpan()
+
+def span(kind: str, name: str):
+    """with span("page", "page_home"): ...  (không làm gì khi tắt)."""
+    return _Span(kind, name) if ENABLED else _NO_SPAN
+
+def sql_span(q: str):
+    """Span cho 1 câu SQL; tên = từ khoá đầu + bảng đầu tiên sau FROM/INTO/UPDATE (để gom nhóm)."""
+    if not ENABLED:
+        return _NO_SPAN
+    text = " ".join(q.split())
+    return _Span("sql", _sql_name(text), text)
+
+def _sql_name(text: str) -> str:
+    words = text.split(" ")
+    verb = words[0].upper() if words else ""
+    for i, w in enumerate(words[:-1]):
+        if w.upper() in ("FROM", "INTO", "UPDATE"):
+            return f"{verb} {words[i + 1]}"
+    return verb
+
+def profiled(kind: str, name: str | None = None):
+    """Decorator: đo mỗi lần gọi hàm khi bật profiling."""
+    def deco(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(kind, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+# ---------- Rerun ----------
+def current_run():
+    """Run đang mở của thread hiện tại (để gắn sự kiện của job chạy ở thread khác vào cùng run)."""
+    return getattr(_tls, "run", None)
+
+@contextlib.contextmanager
+def attach(run):
+    """Trong khối with, sự kiện của thread hiện tại ghi vào run (của thread khác); run=None: không đổi gì."""
+    if run is None:
+        yield
+        return
+    prev, _tls.run = getattr(_tls, "run", None), run
+    try:
+        yield
+    finally:
+        _tls.run = prev
+
+
+def begin_run(label: str = ""):
+    """Mở 1 run cho thread hiện tại (đầu mỗi rerun / mỗi lệnh CLI)."""
+    if ENABLED:
+        _tls.run = {"run": next(_run_ids), "label": label, "t0": time.perf_counter(), "events": []}
+
+def end_run() -> dict | None:
+    """Đóng run, ghi log; trả về {"run","label","ms","events"} (None nếu không bật / chưa mở run)."""
+    run = getattr(_tls, "run", None)
+    _tls.run = None
+    if run is None:
+        return None
+    t0 = run.pop("t0")
+    run["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+    _write(run["events"] + [{"ts": time.time(), "kind": "run", "name": run["label"],
+                             "ms": run["ms"], "run": run["run"]}])
+    return run
+
+def summarize(run: dict, top: int = 10) -> dict:
+    """Tổng thời gian/số lần theo loại sự kiện + top câu SQL chậm nhất của run."""
+    by_kind = {}
+    for e in run["events"]:
+        k = by_kind.setdefault(e["kind"], {"count": 0, "ms": 0.0})
+        k["count"] += 1; k["ms"] += e["ms"]
+    slow = sorted((e for e in run["events"] if e["kind"] == "sql"), key=lambda e: -e["ms"])[:top]
+    return {"ms": run["ms"], "by_kind": by_kind, "slowest_sql": slow,
+            "spans": [e for e in run["events"] if e["kind"] in ("page", "chart")]}
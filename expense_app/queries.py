@@ -0,0 +1,300 @@
+# ==========================================
+# Truy vấn & lệnh ghi theo user: tài khoản đăng nhập, giao dịch, ví, danh mục, hạn mức.
+# Mọi hàm ghi gọi bump_data_version(uid) sau khi commit để cache không trả kết quả cũ.
+# ==========================================
+import sqlite3
+
+from .cache import bump_data_version, cached_query
+from .db import execute, fetchone, get_df, hash_password, write
+from .fx import fx_amount_sql
+from .helpers import (BASE_CURRENCY, TX_KINDS, day_range, kind_name_sql, norm_occurred, normalize_merchant,
+                      normalize_tag, now_created, parse_tags, strip_accents_lower, to_minor)
+
+# ---------- Auth ----------
+def _create_user(c, email, pw_hash):
+    now = now_created()
+    uid = c.execute("INSERT INTO users(email,password_hash,created_at,onboarded) VALUES(?,?,?,0)",
+                    (email, pw_hash, now)).lastrowid
+    c.execute("INSERT INTO accounts(user_id,name,type,currency,opening_balance,created_at) VALUES(?,?,?,?,?,?)",
+              (uid, "Tiền mặt", "cash", BASE_CURRENCY, 0, now))
+    c.execute("INSERT INTO accounts(user_id,name,type,currency,opening_balance,created_at) VALUES(?,?,?,?,?,?)",
+              (uid, "Tài khoản ngân hàng", "bank", BASE_CURRENCY, 0, now))
+    return uid
+
+def create_user(email, pw):
+    try:
+        write(_create_user, email.lower(), hash_password(pw))
+        ok, msg = True, "Tạo tài khoản thành công!"
+    except sqlite3.IntegrityError:
+        ok, msg = False, "Email đã tồn tại."
+    return ok, msg
+
+def login_user(email, pw):
+    r = fetchone("SELECT id,password_hash FROM users WHERE email=?", (email.lower(),))
+    return (r["id"] if r and r["password_hash"] == hash_password(pw) else None)
+
+def get_user(uid): return fetchone("SELECT * FROM users WHERE id=?", (uid,))
+def set_user_profile(uid, name): execute("UPDATE users SET display_name=? WHERE id=?", (name.strip(), uid))
+def finish_onboarding(uid): execute("UPDATE users SET onboarded=1 WHERE id=?", (uid,))
+
+_TX_COLUMNS = f"""t.id, t.occurred_at, {kind_name_sql("t.kind")} AS type, t.amount, t.currency,
+                  a.name AS account, c.name AS category, t.notes, t.tags, m.name AS merchant"""
+_TX_FROM = """
+           FROM transactions t JOIN accounts a ON a.id=t.account_id
+           LEFT JOIN categories c ON c.id=t.category_id
+           LEFT JOIN merchants m ON m.id=t.merchant_id
+           WHERE t.user_id=?"""
+_TX_SELECT = f"SELECT {_TX_COLUMNS}{_TX_FROM}"
+
+@cached_query
+def list_transactions(uid, d1=None, d2=None):
+    q = _TX_SELECT
+    p=[uid]
+    if d1: q+=" AND t.occurred_at>=?"; p.append(str(d1)[:10])
+    if d2: q+=" AND t.occurred_at<?"; p.append(day_range(d2, d2)[1])
+    q += " ORDER BY t.occurred_at DESC, t.id DESC"
+    return get_df(q, tuple(p))
+
+# Cột được phép sắp xếp ở bảng giao dịch phân trang. Số tiền sắp theo giá trị quy đổi về BASE_CURRENCY
+# (t.amount là đơn vị nhỏ nhất của từng tiền tệ, so thẳng 100 USD = 10000 < 50.000 VND); chưa có tỷ giá -> -1 (dưới mọi số tiền).
+TX_SORT_COLUMNS = {
+    "occurred_at": "t.occurred_at",
+    "amount": f"COALESCE({fx_amount_sql('t.amount', 't.currency', 'substr(t.occurred_at,1,10)')}, -1)",
+}
+
+@cached_query
+def list_transactions_page(uid, d1, d2, ttype=None, sort="occurred_at", ascending=False,
+                           after=None, limit=50):
+    """
+    1 trang giao dịch, phân trang keyset trên (cột sắp xếp, id): after = (sort_key, id) của dòng
+    cuối trang trước. Lọc loại + ORDER BY chạy trong SQL nên chỉ đọc/định dạng đúng 1 trang.
+    """
+    col = TX_SORT_COLUMNS[sort]
+    q = f"SELECT {_TX_COLUMNS}, {col} AS sort_key{_TX_FROM} AND t.occurred_at>=? AND t.occurred_at<?"
+    p = [uid, *day_range(d1, d2)]
+    if ttype:
+        q += " AND t.kind=?"; p.append(TX_KINDS[ttype])
+    if after is not None:
+        q += f" AND ({col}, t.id) {'>' if ascending else '<'} (?, ?)"; p.extend(after)
+    direction = "ASC" if ascending else "DESC"
+    q += f" ORDER BY {col} {direction}, t.id {direction} LIMIT ?"; p.append(int(limit))
+    return get_df(q, tuple(p))
+
+@cached_query
+def count_transactions(uid, d1, d2, ttype=None) -> int:
+    q = "SELECT COUNT(*) n FROM transactions WHERE user_id=? AND occurred_at>=? AND occurred_at<?"
+    p = [uid, *day_range(d1, d2)]
+    if ttype:
+        q += " AND kind=?"; p.append(TX_KINDS[ttype])
+    return int(fetchone(q, tuple(p))["n"] or 0)
+
+def get_accounts(uid): return get_df("SELECT * FROM accounts WHERE user_id=?", (uid,))
+def get_categories(uid, t=None):
+    q="SELECT * FROM categories WHERE user_id=?"; p=[uid]
+    if t: q+=" AND type=?"; p.append(t)
+    q+=" ORDER BY name"; return get_df(q, tuple(p))
+
+def account_currency(uid, account_id) -> str:
+    r = fetchone("SELECT currency FROM accounts WHERE id=? AND user_id=?", (int(account_id), uid))
+    return r["currency"] if r else BASE_CURRENCY
+
+def _add_transaction(c, uid, account_id, kind, cat_id, amount, notes, occurred, created, tags, merchant=None):
+    # tiền tệ của giao dịch = tiền tệ của ví, đọc trong cùng transaction ghi
+    cur = c.execute("SELECT currency FROM accounts WHERE id=? AND user_id=?", (account_id, uid)).fetchone()[0]
+    merchant_id = _get_merchant(c, uid, merchant, _merchant_keys(c, uid)) if merchant else None
+    tx_id = c.execute("""INSERT INTO transactions(user_id,account_id,kind,category_id,amount,currency,notes,
+                                                  occurred_at,created_at,merchant_id)
+                         VALUES(?,?,?,?,?,?,?,?,?,?)""",
+                      (uid, account_id, kind, cat_id, to_minor(amount, cur), cur, notes, occurred, created,
+                       merchant_id)).lastrowid
+    if tags:
+        _set_tags(c, uid, tx_id, tags)
+
+def add_transaction(uid, account_id, ttype, cat_id, amount, notes, occurred_dt, tags=None, merchant=None):
+    write(_add_transaction, uid, int(account_id), TX_KINDS[ttype], cat_id, amount,
+          (notes or "").strip() or None, norm_occurred(occurred_dt), now_created(), parse_tags(tags),
+          str(merchant or "").strip() or None)
+    bump_data_version(uid)
+
+# ---------- Tags ----------
+def _set_tags(c, uid, tx_id, tags):
+    """
+    Gắn đúng các thẻ `tags` (chuỗi hoặc danh sách, xem parse_tags) cho giao dịch tx_id: tạo thẻ chưa có,
+    gỡ thẻ thừa, ghi lại chuỗi transactions.tags. Trigger cập nhật daily_tag_totals.
+    """
+    if c.execute("SELECT 1 FROM transactions WHERE id=? AND user_id=?", (tx_id, uid)).fetchone() is None:
+        return
+    ids, names = [], []
+    for name in parse_tags(tags):
+        key = normalize_tag(name)
+        c.execute("INSERT INTO tags(user_id,name,norm_name) VALUES(?,?,?) ON CONFLICT(user_id,norm_name) DO NOTHING",
+                  (uid, name, key))
+        tag_id, tag_name = c.execute("SELECT id, name FROM tags WHERE user_id=? AND norm_name=?", (uid, key)).fetchone()
+        ids.append(tag_id); names.append(tag_name)
+    c.execute(f"DELETE FROM transaction_tags WHERE transaction_id=? AND tag_id NOT IN ({','.join('?' * len(ids))})",
+              (tx_id, *ids))
+    c.executemany("INSERT OR IGNORE INTO transaction_tags(transaction_id, tag_id) VALUES(?,?)",
+                  [(tx_id, t) for t in ids])
+    c.execute("UPDATE transactions SET tags=? WHERE id=?", (", ".join(names) or None, tx_id))
+
+def _tag_keys(c, uid) -> dict:
+    """{norm_name: (id, name)} thẻ của user — nhập hàng loạt tra 1 lần rồi so khớp trong bộ nhớ."""
+    return {r[0]: (r[1], r[2]) for r in c.execute("SELECT norm_name, id, name FROM tags WHERE user_id=?", (uid,))}
+
+def _get_tags(c, uid, tags, known: dict, create: bool = True) -> list:
+    """
+    [(id, tên)] cho các thẻ `tags` (xem parse_tags) theo known, thẻ chưa có thì tạo và thêm vào known.
+    create=False (xem thử khi nhập): thẻ mới có id None.
+    """
+    out = []
+    for name in parse_tags(tags):
+        key = normalize_tag(name)
+        if key not in known:
+            known[key] = (c.execute("INSERT INTO tags(user_id,name,norm_name) VALUES(?,?,?)",
+                                    (uid, name, key)).lastrowid if create else None, name)
+        out.append(known[key])
+    return out
+
+def set_transaction_tags(uid, tx_id: int, tags):
+    write(_set_tags, uid, int(tx_id), tags)
+    bump_data_version(uid)
+
+@cached_query
+def list_tags(uid):
+    """Thẻ của user kèm số giao dịch: id | name | n (nhiều giao dịch trước)."""
+    return get_df("""SELECT g.id, g.name, COUNT(tt.transaction_id) AS n
+                     FROM tags g LEFT JOIN transaction_tags tt ON tt.tag_id=g.id
+                     WHERE g.user_id=? GROUP BY g.id ORDER BY n DESC, g.norm_name""", (uid,))
+
+# ---------- Nơi chi tiêu ----------
+MERCHANT_PREFIX_MIN = 4   # khoá ngắn hơn chỉ khớp khi trùng hẳn (tránh 'bun' nuốt 'bun cha huong lien')
+
+def _merchant_keys(c, uid) -> dict:
+    """{norm_name: id} nơi chi tiêu của user — so khớp trong bộ nhớ (nhập hàng loạt tra 1 lần)."""
+    return dict(c.execute("SELECT norm_name, id FROM merchants WHERE user_id=?", (uid,)).fetchall())
+
+def match_merchant(known: dict, name):
+    """
+    id nơi chi tiêu khớp `name` trong known ({norm_name: id}): trùng khoá chuẩn hoá, không thì khoá đã có
+    dài nhất là tiền tố theo từ ('highlands coffee cn le loi' -> 'highlands coffee'). None nếu không khớp.
+    """
+    words = normalize_merchant(name).split()
+    for n in range(len(words), 0, -1):
+        key = " ".join(words[:n])
+        if key in known and (n == len(words) or len(key) >= MERCHANT_PREFIX_MIN):
+            return known[key]
+    return None
+
+def _get_merchant(c, uid, name, known: dict, create: bool = True):
+    """
+    id nơi chi tiêu cho `name` (match_merchant trên known), chưa có thì tạo và thêm vào known.
+    create=False (xem thử khi nhập): chỉ ghi nhận khoá mới vào known với id None. Tên không có chữ -> None.
+    """
+    key = normalize_merchant(name)
+    if not key:
+        return None
+    mid = match_merchant(known, name)
+    if mid is None and key not in known:
+        known[key] = c.execute("INSERT INTO merchants(user_id,name,norm_name) VALUES(?,?,?)",
+                               (uid, str(name).strip(), key)).lastrowid if create else None
+        mid = known[key]
+    return mid
+
+@cached_query
+def list_merchants(uid):
+    """Nơi chi tiêu của user kèm số giao dịch: id | name | n (nhiều giao dịch trước, đếm từ tổng theo tháng)."""
+    return get_df("""SELECT m.id, m.name, COALESCE(x.n, 0) AS n
+                     FROM merchants m LEFT JOIN (SELECT merchant_id, SUM(tx_count) AS n FROM monthly_merchant_totals
+                                                 WHERE user_id=? GROUP BY merchant_id) x ON x.merchant_id=m.id
+                     WHERE m.user_id=? ORDER BY n DESC, m.norm_name""", (uid, uid))
+
+def add_category(uid,name,t,parent_id=None):
+    execute("INSERT INTO categories(user_id,name,type,parent_id) VALUES(?,?,?,?)",(uid,name.strip(),t,parent_id))
+    bump_data_version(uid)
+
+def add_account(uid,name,t,balance,currency=BASE_CURRENCY):
+    execute("INSERT INTO accounts(user_id,name,type,currency,opening_balance,created_at) VALUES(?,?,?,?,?,?)",
+            (uid,name.strip(),t,currency,to_minor(balance,currency),now_created()))
+    bump_data_version(uid)
+
+def set_opening_balance(uid, account_id: int, amount):
+    cur = account_currency(uid, account_id)
+    execute("UPDATE accounts SET opening_balance=? WHERE user_id=? AND id=?",
+            (to_minor(amount, cur), uid, int(account_id)))
+    bump_data_version(uid)
+
+def add_budget(uid, cat_id: int, amount, start, end):
+    execute("""INSERT INTO budgets(user_id,category_id,amount,start_date,end_date)
+               VALUES(?,?,?,?,?)""", (uid, int(cat_id), to_minor(amount), str(start)[:10], str(end)[:10]))
+    bump_data_version(uid)
+
+def delete_transaction(uid, tx_id: int):
+    execute("DELETE FROM transactions WHERE user_id=? AND id=?", (uid, int(tx_id)))
+    bump_data_version(uid)
+
+def delete_budget(uid, bid: int):
+    execute("DELETE FROM budgets WHERE user_id=? AND id=?", (uid, int(bid)))
+    bump_data_version(uid)
+
+def move_category(uid, cid: int, parent_id=None):
+    """Đổi cha (None = thành gốc); trigger cập nhật closure + level của cả cây con, chặn vòng lặp."""
+    execute("UPDATE categories SET parent_id=? WHERE user_id=? AND id=?",
+            (None if parent_id is None else int(parent_id), uid, int(cid)))
+    bump_data_version(uid)
+
+def _delete_category(c, uid, cid):
+    c.execute("DELETE FROM budgets WHERE user_id=? AND category_id=?", (uid, cid))
+    c.execute("UPDATE transactions SET category_id=NULL WHERE user_id=? AND category_id=?", (uid, cid))
+    c.execute("""UPDATE categories SET parent_id=(SELECT parent_id FROM categories WHERE id=?)
+                 WHERE user_id=? AND parent_id=?""", (cid, uid, cid))
+    c.execute("DELETE FROM categories WHERE user_id=? AND id=?", (uid, cid))
+
+def delete_category(uid, cid: int):
+    # Xoá budgets liên quan, set NULL category_id cho transactions, con lên thay chỗ (nối vào cha của nó)
+    write(_delete_category, uid, int(cid))
+    bump_data_version(uid)
+
+# ---------- Category tree helpers ----------
+@cached_query
+def category_paths(uid, ctype: str):
+    """
+    Danh mục theo thứ tự cây (duyệt trước, anh em xếp theo tên bỏ dấu), mọi độ sâu:
+    id | name | parent_id | level | path ('Ăn uống › Ăn trưa').
+    1 câu JOIN qua category_closure (mỗi danh mục kèm cả chuỗi tổ tiên), ghép đường dẫn bằng groupby.
+    """
+    df = get_df("""
+        SELECT c.id, c.name, c.parent_id, c.level, a.name AS anc
+        FROM categories c
+        JOIN category_closure cc ON cc.descendant_id=c.id
+        JOIN categories a        ON a.id=cc.ancestor_id
+        WHERE c.user_id=? AND c.type=?
+        ORDER BY c.id, cc.depth DESC""", (uid, ctype))
+    df["key"] = strip_accents_lower(df["anc"])
+    g = df.groupby("id", sort=False)
+    out = g[["name", "parent_id", "level"]].first()
+    out["path"] = g["anc"].agg(" › ".join)
+    out["key"] = g["key"].agg("\x01".join)     # tổ tiên trước con, \x01 < mọi ký tự -> cha đứng ngay trước cây con
+    return out.sort_values("key", kind="stable").drop(columns="key").reset_index()
+
+def build_category_tree(uid:int, ctype:str):
+    """
+    (roots, orphans): roots = [{"id","name","level","children":[...]}] lồng nhau tới mọi độ sâu;
+    orphans = danh mục có cha không thuộc loại ctype (dữ liệu cũ), kèm cây con của chúng.
+    Duyệt 1 lượt theo thứ tự của category_paths: cha luôn có trước con nên chỉ cần gắn vào cha.
+    """
+    df = category_paths(uid, ctype)
+    parent = df["parent_id"].astype("Int64").where(df["parent_id"].isin(df["id"]))
+    lost = set(df.loc[parent.isna() & df["parent_id"].notna(), "id"].tolist())
+    nodes, roots, orphans = {}, [], []
+    for cid, name, level, pid in zip(df["id"].tolist(), df["name"].tolist(), df["level"].tolist(),
+                                     parent.astype(object).where(parent.notna(), None).tolist()):
+        node = nodes[cid] = {"id": cid, "name": name, "level": level, "children": []}
+        if pid is not None:
+            nodes[pid]["children"].append(node)
+        else:
+            (orphans if cid in lost else roots).append(node)
+    return roots, orphans
+
+def current_balance(uid, account_id):
+    r = fetchone("SELECT balance FROM accounts WHERE id=? AND user_id=?", (account_id, uid))
+    return int(r["balance"] or 0) if r else 0
@@ -0,0 +1,875 @@
+# ==========================================
+# Schema: SQL tạo bảng, migration theo PRAGMA user_version, khởi tạo DB 1 lần / process.
+# ==========================================
+import functools, sqlite3, time
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import db
+from .db import exec_script, get_pool
+from .helpers import CURRENCY_EXPONENTS, DEFAULT_CURRENCY_EXPONENT
+from .seed import seed_demo_user_once
+
+ENABLE_DEMO = True
+
+INIT_SQL = """
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS users(
+ id INTEGER PRIMARY KEY AUTOINCREMENT,
+ email TEXT UNIQUE NOT NULL,
+ password_hash TEXT NOT NULL,
+ created_at TEXT NOT NULL,
+ display_name TEXT,
+ onboarded INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS accounts(
+ id INTEGER PRIMARY KEY AUTOINCREMENT,
+ user_id INTEGER NOT NULL,
+ name TEXT NOT NULL,
+ type TEXT NOT NULL,
+ currency TEXT NOT NULL DEFAULT 'VND',
+ opening_balance REAL NOT NULL DEFAULT 0,
+ created_at TEXT NOT NULL,
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS categories(
+ id INTEGER PRIMARY KEY AUTOINCREMENT,
+ user_id INTEGER NOT NULL,
+ name TEXT NOT NULL,
+ type TEXT NOT NULL,
+ parent_id INTEGER,
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS transactions(
+ id INTEGER PRIMARY KEY AUTOINCREMENT,
+ user_id INTEGER NOT NULL,
+ account_id INTEGER NOT NULL,
+ type TEXT NOT NULL,
+ category_id INTEGER,
+ amount REAL NOT NULL,
+ currency TEXT NOT NULL DEFAULT 'VND',
+ fx_rate REAL,
+ merchant_id INTEGER,
+ notes TEXT,
+ tags TEXT,
+ occurred_at TEXT NOT NULL,
+ created_at TEXT NOT NULL,
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+ FOREIGN KEY(account_id) REFERENCES accounts(id) ON DELETE CASCADE,
+ FOREIGN KEY(category_id) REFERENCES categories(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS budgets(
+ id INTEGER PRIMARY KEY AUTOINCREMENT,
+ user_id INTEGER NOT NULL,
+ category_id INTEGER NOT NULL,
+ amount REAL NOT NULL,
+ start_date TEXT NOT NULL,
+ end_date TEXT NOT NULL,
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+"""
+
+# Bảng tổng theo ngày (rollup) cho KPI/biểu đồ/báo cáo: 1 dòng / (user, ngày, loại, danh mục, ví).
+# Trigger trên transactions giữ bảng luôn khớp (thêm/xoá/sửa); rebuild_daily_totals() để sửa lệch.
+# category_id = 0 nghĩa là giao dịch không có danh mục (NULL không dùng được trong khoá chính).
+DAILY_TOTALS_SQL = """
+CREATE TABLE IF NOT EXISTS daily_totals(
+ user_id INTEGER NOT NULL,
+ day TEXT NOT NULL,
+ category_id INTEGER NOT NULL DEFAULT 0,
+ account_id INTEGER NOT NULL,
+ type TEXT NOT NULL,
+ amount_sum REAL NOT NULL DEFAULT 0,
+ tx_count INTEGER NOT NULL DEFAULT 0,
+ PRIMARY KEY(user_id, day, type, category_id, account_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_daily_user_type_day ON daily_totals(user_id, type, day, category_id, amount_sum);
+
+CREATE TRIGGER IF NOT EXISTS trg_tx_rollup_ins AFTER INSERT ON transactions BEGIN
+  INSERT INTO daily_totals(user_id,day,category_id,account_id,type,amount_sum,tx_count)
+  VALUES(NEW.user_id, substr(NEW.occurred_at,1,10), IFNULL(NEW.category_id,0), NEW.account_id, NEW.type, NEW.amount, 1)
+  ON CONFLICT(user_id,day,type,category_id,account_id)
+  DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tx_rollup_del AFTER DELETE ON transactions BEGIN
+  UPDATE daily_totals SET amount_sum=amount_sum-OLD.amount, tx_count=tx_count-1
+   WHERE user_id=OLD.user_id AND day=substr(OLD.occurred_at,1,10) AND type=OLD.type
+     AND category_id=IFNULL(OLD.category_id,0) AND account_id=OLD.account_id;
+  DELETE FROM daily_totals
+   WHERE user_id=OLD.user_id AND day=substr(OLD.occurred_at,1,10) AND type=OLD.type
+     AND category_id=IFNULL(OLD.category_id,0) AND account_id=OLD.account_id AND tx_count<=0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tx_rollup_upd
+AFTER UPDATE OF user_id, occurred_at, category_id, account_id, type, amount ON transactions BEGIN
+  UPDATE daily_totals SET amount_sum=amount_sum-OLD.amount, tx_count=tx_count-1
+   WHERE user_id=OLD.user_id AND day=substr(OLD.occurred_at,1,10) AND type=OLD.type
+     AND category_id=IFNULL(OLD.category_id,0) AND account_id=OLD.account_id;
+  DELETE FROM daily_totals
+   WHERE user_id=OLD.user_id AND day=substr(OLD.occurred_at,1,10) AND type=OLD.type
+     AND category_id=IFNULL(OLD.category_id,0) AND account_id=OLD.account_id AND tx_count<=0;
+  INSERT INTO daily_totals(user_id,day,category_id,account_id,type,amount_sum,tx_count)
+  VALUES(NEW.user_id, substr(NEW.occurred_at,1,10), IFNULL(NEW.category_id,0), NEW.account_id, NEW.type, NEW.amount, 1)
+  ON CONFLICT(user_id,day,type,category_id,account_id)
+  DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+1;
+END;
+""" + """
+INSERT INTO daily_totals(user_id,day,category_id,account_id,type,amount_sum,tx_count)
+SELECT user_id, substr(occurred_at,1,10), IFNULL(category_id,0), account_id, type, SUM(amount), COUNT(*)
+FROM transactions GROUP BY 1,2,3,4,5;
+"""
+
+# Số dư hiện tại lưu sẵn ở accounts.balance = opening_balance + thu - chi, trigger cập nhật
+# cùng lúc với lệnh ghi giao dịch (cùng transaction). check_balances() đối chiếu lại với lịch sử.
+ACCOUNT_BALANCE_SQL = """
+ALTER TABLE accounts ADD COLUMN balance REAL NOT NULL DEFAULT 0;
+
+UPDATE accounts SET balance = opening_balance + COALESCE((
+  SELECT SUM(CASE t.type WHEN 'income' THEN t.amount WHEN 'expense' THEN -t.amount ELSE 0 END)
+  FROM transactions t WHERE t.user_id=accounts.user_id AND t.account_id=accounts.id), 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_acc_balance_new AFTER INSERT ON accounts BEGIN
+  UPDATE accounts SET balance=NEW.opening_balance WHERE id=NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_acc_balance_opening AFTER UPDATE OF opening_balance ON accounts BEGIN
+  UPDATE accounts SET balance=balance + NEW.opening_balance - OLD.opening_balance WHERE id=NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tx_balance_ins AFTER INSERT ON transactions BEGIN
+  UPDATE accounts SET balance=balance + CASE NEW.type WHEN 'income' THEN NEW.amount WHEN 'expense' THEN -NEW.amount ELSE 0 END
+   WHERE id=NEW.account_id AND user_id=NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tx_balance_del AFTER DELETE ON transactions BEGIN
+  UPDATE accounts SET balance=balance - CASE OLD.type WHEN 'income' THEN OLD.amount WHEN 'expense' THEN -OLD.amount ELSE 0 END
+   WHERE id=OLD.account_id AND user_id=OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tx_balance_upd AFTER UPDATE OF user_id, account_id, type, amount ON transactions BEGIN
+  UPDATE accounts SET balance=balance - CASE OLD.type WHEN 'income' THEN OLD.amount WHEN 'expense' THEN -OLD.amount ELSE 0 END
+   WHERE id=OLD.account_id AND user_id=OLD.user_id;
+  UPDATE accounts SET balance=balance + CASE NEW.type WHEN 'income' THEN NEW.amount WHEN 'expense' THEN -NEW.amount ELSE 0 END
+   WHERE id=NEW.account_id AND user_id=NEW.user_id;
+END;
+"""
+
+# Nhập hàng loạt: import_hash = mã băm nội dung (nhập lại cùng file không bị trùng).
+# Dòng có import_hash bỏ qua trigger INSERT từng dòng; import_transactions cộng daily_totals
+# và số dư 1 lần bằng SQL tập hợp (_apply_bulk_insert). Trigger DELETE/UPDATE giữ nguyên.
+BULK_IMPORT_SQL = """
+ALTER TABLE transactions ADD COLUMN import_hash TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tx_user_import_hash ON transactions(user_id, import_hash)
+ WHERE import_hash IS NOT NULL;
+
+DROP TRIGGER IF EXISTS trg_tx_rollup_ins;
+CREATE TRIGGER trg_tx_rollup_ins AFTER INSERT ON transactions WHEN NEW.import_hash IS NULL BEGIN
+  INSERT INTO daily_totals(user_id,day,category_id,account_id,type,amount_sum,tx_count)
+  VALUES(NEW.user_id, substr(NEW.occurred_at,1,10), IFNULL(NEW.category_id,0), NEW.account_id, NEW.type, NEW.amount, 1)
+  ON CONFLICT(user_id,day,type,category_id,account_id)
+  DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+1;
+END;
+
+DROP TRIGGER IF EXISTS trg_tx_balance_ins;
+CREATE TRIGGER trg_tx_balance_ins AFTER INSERT ON transactions WHEN NEW.import_hash IS NULL BEGIN
+  UPDATE accounts SET balance=balance + CASE NEW.type WHEN 'income' THEN NEW.amount WHEN 'expense' THEN -NEW.amount ELSE 0 END
+   WHERE id=NEW.account_id AND user_id=NEW.user_id;
+END;
+"""
+
+# Khoá nhóm thời gian cho biểu đồ Tuần/Tháng/Năm (Ngày dùng thẳng cột day = khoá chính).
+# Cột sinh VIRTUAL: không tốn chỗ trong bảng, giá trị được lưu sẵn trong index (user_id, khoá, ...)
+# nên GROUP BY đọc theo thứ tự index, không phải gọi strftime() từng dòng mỗi lần vẽ.
+# Tuần theo ISO 8601 (tuần bắt đầu thứ Hai, năm ISO = năm của thứ Năm trong tuần), khớp với
+# helpers.bucket_key / start_weeks_back; %W của SQLite coi tuần trước thứ Hai đầu năm là tuần 00.
+WEEK_KEY_EXPR = """strftime('%Y', day, '-3 days', 'weekday 4') || '-W' ||
+  printf('%02d', (CAST(strftime('%j', day, '-3 days', 'weekday 4') AS INTEGER) + 6) / 7)"""
+
+BUCKET_KEYS_SQL = f"""
+ALTER TABLE daily_totals ADD COLUMN week_key TEXT GENERATED ALWAYS AS (
+  {WEEK_KEY_EXPR}) VIRTUAL;
+ALTER TABLE daily_totals ADD COLUMN month_key TEXT GENERATED ALWAYS AS (substr(day,1,7)) VIRTUAL;
+ALTER TABLE daily_totals ADD COLUMN year_key  TEXT GENERATED ALWAYS AS (substr(day,1,4)) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_daily_user_week  ON daily_totals(user_id, week_key,  day, type, amount_sum);
+CREATE INDEX IF NOT EXISTS idx_daily_user_month ON daily_totals(user_id, month_key, day, type, amount_sum);
+CREATE INDEX IF NOT EXISTS idx_daily_user_year  ON daily_totals(user_id, year_key,  day, type, amount_sum);
+"""
+
+# Danh mục nhiều cấp: bảng đóng (closure) lưu mọi cặp (tổ tiên, hậu duệ, khoảng cách), kể cả (x, x, 0);
+# categories.level = độ sâu tính từ gốc (gốc = 0). Trigger giữ cả hai khớp khi thêm / đổi cha / xoá,
+# nên gộp theo cấp bất kỳ hay tổng cả cây con chỉ là 1 phép JOIN theo index, không cần truy vấn đệ quy.
+CATEGORY_CLOSURE_SQL = """
+UPDATE categories SET parent_id=NULL
+ WHERE parent_id IS NOT NULL AND parent_id NOT IN (SELECT id FROM categories);
+ALTER TABLE categories ADD COLUMN level INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS category_closure(
+ ancestor_id INTEGER NOT NULL,
+ descendant_id INTEGER NOT NULL,
+ depth INTEGER NOT NULL,
+ PRIMARY KEY(ancestor_id, descendant_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_closure_desc_depth ON category_closure(descendant_id, depth, ancestor_id);
+
+INSERT INTO category_closure(ancestor_id, descendant_id, depth)
+WITH RECURSIVE t(anc, des, depth) AS (
+  SELECT id, id, 0 FROM categories
+  UNION ALL
+  SELECT t.anc, c.id, t.depth + 1 FROM t JOIN categories c ON c.parent_id=t.des
+)
+SELECT anc, des, depth FROM t;
+UPDATE categories SET level=(SELECT MAX(depth) FROM category_closure WHERE descendant_id=categories.id);
+
+CREATE TRIGGER IF NOT EXISTS trg_cat_closure_ins AFTER INSERT ON categories BEGIN
+  INSERT INTO category_closure(ancestor_id, descendant_id, depth)
+    SELECT NEW.id, NEW.id, 0
+    UNION ALL
+    SELECT ancestor_id, NEW.id, depth + 1 FROM category_closure WHERE descendant_id=NEW.parent_id;
+  UPDATE categories SET level=COALESCE((SELECT level + 1 FROM categories WHERE id=NEW.parent_id), 0)
+   WHERE id=NEW.id;
+END;
+
+-- Không cho gắn danh mục vào chính nó hoặc vào cây con của nó
+CREATE TRIGGER IF NOT EXISTS trg_cat_closure_cycle BEFORE UPDATE OF parent_id ON categories
+WHEN NEW.parent_id IS NOT NULL BEGIN
+  SELECT RAISE(ABORT, 'category cycle')
+   WHERE EXISTS (SELECT 1 FROM category_closure WHERE ancestor_id=OLD.id AND descendant_id=NEW.parent_id);
+END;
+
+-- Đổi cha: tách cả cây con khỏi tổ tiên cũ, nối vào tổ tiên mới, dời level của cả cây con
+CREATE TRIGGER IF NOT EXISTS trg_cat_closure_move AFTER UPDATE OF parent_id ON categories
+WHEN OLD.parent_id IS NOT NEW.parent_id BEGIN
+  DELETE FROM category_closure
+   WHERE descendant_id IN (SELECT descendant_id FROM category_closure WHERE ancestor_id=NEW.id)
+     AND ancestor_id NOT IN (SELECT descendant_id FROM category_closure WHERE ancestor_id=NEW.id);
+  INSERT INTO category_closure(ancestor_id, descendant_id, depth)
+    SELECT a.ancestor_id, s.descendant_id, a.depth + s.depth + 1
+      FROM category_closure a, category_closure s
+     WHERE a.descendant_id=NEW.parent_id AND s.ancestor_id=NEW.id;
+  UPDATE categories
+     SET level=level + COALESCE((SELECT level + 1 FROM categories WHERE id=NEW.parent_id), 0) - OLD.level
+   WHERE id IN (SELECT descendant_id FROM category_closure WHERE ancestor_id=NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cat_closure_del AFTER DELETE ON categories BEGIN
+  DELETE FROM category_closure WHERE descendant_id=OLD.id OR ancestor_id=OLD.id;
+END;
+"""
+
+# ---------- Migration 9: kiểu cột chặt (chạy online theo lô) ----------
+# - số tiền INTEGER theo đơn vị nhỏ nhất của tiền tệ (helpers.to_minor; VND: đồng) -> tổng cộng số nguyên, chính xác
+# - transactions.type / daily_totals.type (TEXT) -> kind INTEGER (helpers.TX_KINDS: 0 chi, 1 thu, 2 khác)
+# - occurred_at 'YYYY-MM-DD HH:MM', created_at 'YYYY-MM-DD HH:MM:SS': chuỗi ISO độ dài cố định, CHECK giữ định dạng
+# SQLite không đổi kiểu cột tại chỗ: dựng bảng mới transactions__v9 / daily_totals__v9, trigger "soi gương"
+# trên bảng cũ chép mọi lệnh ghi đang diễn ra sang, chép dần dữ liệu cũ theo lô id (mỗi lô 1 transaction ngắn,
+# nghỉ giữa các lô để app vẫn ghi được), cuối cùng đổi bảng trong 1 transaction ngắn. Tiến độ lưu ở
+# _migration_state nên dừng giữa chừng thì lần chạy sau làm tiếp.
+_TS_OCCURRED_GLOB = "'[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9] [0-2][0-9]:[0-5][0-9]'"
+_TS_CREATED_GLOB = "'[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9] [0-2][0-9]:[0-5][0-9]:[0-5][0-9]'"
+_DATE_GLOB = "'[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]'"
+
+def _minor_sql(amount: str, currency: str) -> str:
+    """Biểu thức SQL: số tiền REAL (đơn vị chính) -> INTEGER đơn vị nhỏ nhất, theo helpers.CURRENCY_EXPONENTS."""
+    whens = " ".join(f"WHEN '{cur}' THEN {10 ** e}" for cur, e in CURRENCY_EXPONENTS.items())
+    return (f"CAST(ROUND({amount} * CASE upper({currency}) {whens} "
+            f"ELSE {10 ** DEFAULT_CURRENCY_EXPONENT} END) AS INTEGER)")
+
+def _typed_tx_values(r: str) -> str:
+    """Giá trị 1 dòng transactions cũ (alias r) ở dạng mới, đúng thứ tự _TYPED_TX_COLS."""
+    occurred = (f"COALESCE(strftime('%Y-%m-%d %H:%M', {r}.occurred_at), "
+                f"strftime('%Y-%m-%d %H:%M', {r}.created_at), '1970-01-01 00:00')")
+    return f"""{r}.id, {r}.user_id, {r}.account_id,
+           CASE {r}.type WHEN 'expense' THEN 0 WHEN 'income' THEN 1 ELSE 2 END AS kind,
+           {r}.category_id, {_minor_sql(f"{r}.amount", f"{r}.currency")} AS amount, {r}.currency, {r}.fx_rate,
+           {r}.merchant_id, {r}.notes, {r}.tags, {occurred} AS occurred_at,
+           COALESCE(strftime('%Y-%m-%d %H:%M:%S', {r}.created_at), {occurred} || ':00') AS created_at,
+           {r}.import_hash"""
+
+_TYPED_TX_COLS = ("id,user_id,account_id,kind,category_id,amount,currency,fx_rate,merchant_id,notes,tags,"
+                  "occurred_at,created_at,import_hash")
+
+def _typed_tx_table(name: str) -> str:
+    return f"""CREATE TABLE IF NOT EXISTS {name}(
+ id INTEGER PRIMARY KEY AUTOINCREMENT,
+ user_id INTEGER NOT NULL,
+ account_id INTEGER NOT NULL,
+ kind INTEGER NOT NULL CHECK(kind IN (0,1,2)),
+ category_id INTEGER,
+ amount INTEGER NOT NULL CHECK(typeof(amount)='integer'),
+ currency TEXT NOT NULL DEFAULT 'VND',
+ fx_rate REAL,
+ merchant_id INTEGER,
+ notes TEXT,
+ tags TEXT,
+ occurred_at TEXT NOT NULL CHECK(occurred_at GLOB {_TS_OCCURRED_GLOB}),
+ created_at TEXT NOT NULL CHECK(created_at GLOB {_TS_CREATED_GLOB}),
+ import_hash TEXT,
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE,
+ FOREIGN KEY(account_id) REFERENCES accounts(id) ON DELETE CASCADE,
+ FOREIGN KEY(category_id) REFERENCES categories(id) ON DELETE SET NULL
+)"""
+
+def _typed_totals_table(name: str, currency: bool = False) -> str:
+    cur = "\n currency TEXT NOT NULL DEFAULT 'VND'," if currency else ""
+    return f"""CREATE TABLE IF NOT EXISTS {name}(
+ user_id INTEGER NOT NULL,
+ day TEXT NOT NULL,
+ category_id INTEGER NOT NULL DEFAULT 0,
+ account_id INTEGER NOT NULL,
+ kind INTEGER NOT NULL,{cur}
+ amount_sum INTEGER NOT NULL DEFAULT 0,
+ tx_count INTEGER NOT NULL DEFAULT 0,
+ week_key TEXT GENERATED ALWAYS AS (
+  {WEEK_KEY_EXPR}) VIRTUAL,
+ month_key TEXT GENERATED ALWAYS AS (substr(day,1,7)) VIRTUAL,
+ year_key  TEXT GENERATED ALWAYS AS (substr(day,1,4)) VIRTUAL,
+ PRIMARY KEY(user_id, day, kind, category_id, account_id{", currency" if currency else ""})
+) WITHOUT ROWID"""
+
+def _typed_indexes(tx: str, totals: str) -> list[str]:
+    # Tên index mới (txk/dtk) vì index cũ cùng tên còn sống trên bảng cũ tới lúc đổi bảng
+    return [
+        f"CREATE INDEX IF NOT EXISTS idx_txk_user_time      ON {tx}(user_id, occurred_at, kind, amount)",
+        f"CREATE INDEX IF NOT EXISTS idx_txk_user_kind_time ON {tx}(user_id, kind, occurred_at, amount)",
+        f"CREATE INDEX IF NOT EXISTS idx_txk_user_cat_time  ON {tx}(user_id, category_id, occurred_at, kind, amount)",
+        f"CREATE INDEX IF NOT EXISTS idx_txk_user_acc_kind  ON {tx}(user_id, account_id, kind, amount)",
+        f"""CREATE UNIQUE INDEX IF NOT EXISTS idx_txk_user_import_hash ON {tx}(user_id, import_hash)
+            WHERE import_hash IS NOT NULL""",
+        *_totals_indexes(totals),
+    ]
+
+def _totals_indexes(totals: str) -> list[str]:
+    return [
+        f"CREATE INDEX IF NOT EXISTS idx_dtk_user_kind_day     ON {totals}(user_id, kind, day, category_id, amount_sum)",
+        f"CREATE INDEX IF NOT EXISTS idx_dtk_user_kind_cat_day ON {totals}(user_id, kind, category_id, day, amount_sum)",
+        f"CREATE INDEX IF NOT EXISTS idx_dtk_user_week  ON {totals}(user_id, week_key,  day, kind, amount_sum)",
+        f"CREATE INDEX IF NOT EXISTS idx_dtk_user_month ON {totals}(user_id, month_key, day, kind, amount_sum)",
+        f"CREATE INDEX IF NOT EXISTS idx_dtk_user_year  ON {totals}(user_id, year_key,  day, kind, amount_sum)",
+    ]
+
+def _rollup_triggers(tx: str, totals: str, prefix: str, when_ins: str, currency: bool = False) -> list[str]:
+    """Trigger giữ daily_totals khớp transactions (bản kind/INTEGER của DAILY_TOTALS_SQL; currency: từ v10)."""
+    cur, key = (",currency", "user_id,day,kind,category_id,account_id,currency") if currency else \
+               ("", "user_id,day,kind,category_id,account_id")
+    add = f"""INSERT INTO {totals}(user_id,day,category_id,account_id,kind{cur},amount_sum,tx_count)
+  VALUES(NEW.user_id, substr(NEW.occurred_at,1,10), IFNULL(NEW.category_id,0), NEW.account_id, NEW.kind{cur.replace(",", ", NEW.")}, NEW.amount, 1)
+  ON CONFLICT({key}) DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+1;"""
+    match = """user_id=OLD.user_id AND day=substr(OLD.occurred_at,1,10) AND kind=OLD.kind
+     AND category_id=IFNULL(OLD.category_id,0) AND account_id=OLD.account_id""" + \
+        (" AND currency=OLD.currency" if currency else "")
+    sub = f"""UPDATE {totals} SET amount_sum=amount_sum-OLD.amount, tx_count=tx_count-1 WHERE {match};
+  DELETE FROM {totals} WHERE {match} AND tx_count<=0;"""
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_ins AFTER INSERT ON {tx} WHEN {when_ins} BEGIN\n  {add}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_del AFTER DELETE ON {tx} BEGIN\n  {sub}\nEND",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefix}_upd
+AFTER UPDATE OF user_id, occurred_at, category_id, account_id, kind, amount{cur.replace(",", ", ")} ON {tx} BEGIN
+  {sub}
+  {add}
+END""",
+    ]
+
+_KIND_DELTA = "CASE {0}.kind WHEN 1 THEN {0}.amount WHEN 0 THEN -{0}.amount ELSE 0 END"
+
+# Bảng/trigger cuối cùng sau khi đổi bảng (bản kind/INTEGER của ACCOUNT_BALANCE_SQL + BULK_IMPORT_SQL)
+TYPED_FINAL_SQL = [
+    *_rollup_triggers("transactions", "daily_totals", "trg_tx_rollup", "NEW.import_hash IS NULL"),
+    f"""CREATE TRIGGER trg_tx_balance_ins AFTER INSERT ON transactions WHEN NEW.import_hash IS NULL BEGIN
+  UPDATE accounts SET balance=balance + {_KIND_DELTA.format("NEW")} WHERE id=NEW.account_id AND user_id=NEW.user_id;
+END""",
+    f"""CREATE TRIGGER trg_tx_balance_del AFTER DELETE ON transactions BEGIN
+  UPDATE accounts SET balance=balance - {_KIND_DELTA.format("OLD")} WHERE id=OLD.account_id AND user_id=OLD.user_id;
+END""",
+    f"""CREATE TRIGGER trg_tx_balance_upd AFTER UPDATE OF user_id, account_id, kind, amount ON transactions BEGIN
+  UPDATE accounts SET balance=balance - {_KIND_DELTA.format("OLD")} WHERE id=OLD.account_id AND user_id=OLD.user_id;
+  UPDATE accounts SET balance=balance + {_KIND_DELTA.format("NEW")} WHERE id=NEW.account_id AND user_id=NEW.user_id;
+END""",
+    """CREATE TRIGGER trg_acc_balance_new AFTER INSERT ON accounts BEGIN
+  UPDATE accounts SET balance=NEW.opening_balance WHERE id=NEW.id;
+END""",
+    """CREATE TRIGGER trg_acc_balance_opening AFTER UPDATE OF opening_balance ON accounts BEGIN
+  UPDATE accounts SET balance=balance + NEW.opening_balance - OLD.opening_balance WHERE id=NEW.id;
+END""",
+    "CREATE INDEX idx_budgets_user_dates ON budgets(user_id, end_date, start_date)",
+    "CREATE INDEX idx_accounts_user ON accounts(user_id)",
+    f"""UPDATE accounts SET balance = opening_balance + COALESCE((
+  SELECT SUM({_KIND_DELTA.format("t")}) FROM transactions t
+   WHERE t.user_id=accounts.user_id AND t.account_id=accounts.id), 0)""",
+]
+
+# Bước chuẩn bị (1 transaction, chạy lại được): bảng mới + index + trigger soi gương trên bảng cũ.
+# Trigger rollup tạm trên bảng mới bỏ qua khi lô chép đang chạy (cờ 'bulk'), lô chép tự cộng daily_totals.
+_V9_BULK = "NOT EXISTS (SELECT 1 FROM _migration_state WHERE key='bulk')"
+TYPED_SETUP_SQL = [
+    "CREATE TABLE IF NOT EXISTS _migration_state(key TEXT PRIMARY KEY, value)",
+    "INSERT OR IGNORE INTO _migration_state(key, value) VALUES('v9_copied_upto', 0)",
+    _typed_tx_table("transactions__v9"),
+    _typed_totals_table("daily_totals__v9"),
+    *_typed_indexes("transactions__v9", "daily_totals__v9"),
+    *_rollup_triggers("transactions__v9", "daily_totals__v9", "trg_v9_rollup", _V9_BULK),
+    f"""CREATE TRIGGER IF NOT EXISTS trg_v9_mirror_ins AFTER INSERT ON transactions BEGIN
+  INSERT OR IGNORE INTO transactions__v9({_TYPED_TX_COLS}) SELECT {_typed_tx_values("NEW")};
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_v9_mirror_upd AFTER UPDATE ON transactions BEGIN
+  DELETE FROM transactions__v9 WHERE id=OLD.id;
+  INSERT OR IGNORE INTO transactions__v9({_TYPED_TX_COLS}) SELECT {_typed_tx_values("NEW")};
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_v9_mirror_del AFTER DELETE ON transactions BEGIN
+  DELETE FROM transactions__v9 WHERE id=OLD.id;
+END""",
+]
+
+def _typed_copy_sql() -> list[str]:
+    """Chép các dòng cũ id trong (?, ?] chưa có ở bảng mới: cộng daily_totals__v9 theo nhóm rồi chèn dòng."""
+    rows = f"""SELECT {_typed_tx_values("t")} FROM transactions t
+     WHERE t.id>? AND t.id<=? AND NOT EXISTS (SELECT 1 FROM transactions__v9 n WHERE n.id=t.id)"""
+    return [
+        f"""INSERT INTO daily_totals__v9(user_id,day,category_id,account_id,kind,amount_sum,tx_count)
+            SELECT user_id, substr(occurred_at,1,10), IFNULL(category_id,0), account_id, kind, SUM(amount), COUNT(*)
+            FROM ({rows})
+            WHERE 1 GROUP BY 1,2,3,4,5
+            ON CONFLICT(user_id,day,kind,category_id,account_id)
+            DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+excluded.tx_count""",
+        f"INSERT INTO transactions__v9({_TYPED_TX_COLS}) {rows}",
+    ]
+
+def _carry_sequence(old: str, new: str) -> list[str]:
+    # AUTOINCREMENT: bảng mới không cấp lại id đã từng dùng ở bảng cũ (kể cả id của dòng đã xoá)
+    seq = f"(SELECT seq FROM sqlite_sequence WHERE name='{old}')"
+    return [f"""INSERT INTO sqlite_sequence(name, seq) SELECT '{new}', 0
+                WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name='{new}')""",
+            f"UPDATE sqlite_sequence SET seq=MAX(seq, COALESCE({seq}, 0)) WHERE name='{new}'"]
+
+# Đổi bảng (chạy trong transaction của lô cuối): ví/hạn mức nhỏ nên chép thẳng, bỏ bảng cũ + trigger của chúng,
+# đổi tên bảng mới, tạo trigger cuối cùng, tính lại số dư từ số nguyên đã chép.
+TYPED_CUTOVER_SQL = [
+    f"""CREATE TABLE accounts__v9(
+ id INTEGER PRIMARY KEY AUTOINCREMENT,
+ user_id INTEGER NOT NULL,
+ name TEXT NOT NULL,
+ type TEXT NOT NULL,
+ currency TEXT NOT NULL DEFAULT 'VND',
+ opening_balance INTEGER NOT NULL DEFAULT 0 CHECK(typeof(opening_balance)='integer'),
+ created_at TEXT NOT NULL CHECK(created_at GLOB {_TS_CREATED_GLOB}),
+ balance INTEGER NOT NULL DEFAULT 0,
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+)""",
+    f"""INSERT INTO accounts__v9(id,user_id,name,type,currency,opening_balance,created_at,balance)
+        SELECT id, user_id, name, type, currency, {_minor_sql("opening_balance", "currency")},
+               COALESCE(strftime('%Y-%m-%d %H:%M:%S', created_at), '1970-01-01 00:00:00'), 0
+        FROM accounts""",
+    f"""CREATE TABLE budgets__v9(
+ id INTEGER PRIMARY KEY AUTOINCREMENT,
+ user_id INTEGER NOT NULL,
+ category_id INTEGER NOT NULL,
+ amount INTEGER NOT NULL CHECK(typeof(amount)='integer'),
+ start_date TEXT NOT NULL CHECK(start_date GLOB {_DATE_GLOB}),
+ end_date TEXT NOT NULL CHECK(end_date GLOB {_DATE_GLOB}),
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+)""",
+    f"""INSERT INTO budgets__v9(id,user_id,category_id,amount,start_date,end_date)
+        SELECT id, user_id, category_id, {_minor_sql("amount", "'VND'")},
+               COALESCE(date(start_date), start_date), COALESCE(date(end_date), end_date)
+        FROM budgets""",
+    *_carry_sequence("transactions", "transactions__v9"),
+    *_carry_sequence("accounts", "accounts__v9"),
+    *_carry_sequence("budgets", "budgets__v9"),
+    "DROP TRIGGER trg_v9_rollup_ins",
+    "DROP TRIGGER trg_v9_rollup_del",
+    "DROP TRIGGER trg_v9_rollup_upd",
+    "DROP TABLE transactions",
+    "DROP TABLE daily_totals",
+    "DROP TABLE accounts",
+    "DROP TABLE budgets",
+    "ALTER TABLE transactions__v9 RENAME TO transactions",
+    "ALTER TABLE daily_totals__v9 RENAME TO daily_totals",
+    "ALTER TABLE accounts__v9 RENAME TO accounts",
+    "ALTER TABLE budgets__v9 RENAME TO budgets",
+    *TYPED_FINAL_SQL,
+    "DROP TABLE _migration_state",
+    "PRAGMA user_version=9",
+]
+
+@contextmanager
+def _immediate(c):
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        yield c
+        c.execute("COMMIT")
+    except BaseException:
+        c.rollback()
+        raise
+
+def _typed_copy_batch(c, batch_rows: int) -> tuple[int, bool]:
+    """Chép 1 lô (transaction đang mở). Trả về (id đã chép tới, hết dữ liệu cũ chưa)."""
+    lo = c.execute("SELECT value FROM _migration_state WHERE key='v9_copied_upto'").fetchone()[0]
+    r = c.execute("SELECT id FROM transactions WHERE id>? ORDER BY id LIMIT 1 OFFSET ?",
+                  (lo, max(int(batch_rows), 1) - 1)).fetchone()
+    last = r is None
+    hi = max(lo, (c.execute("SELECT MAX(id) FROM transactions").fetchone()[0] or 0) if last else r[0])
+    c.execute("INSERT INTO _migration_state(key, value) VALUES('bulk', 1)")
+    for q in _typed_copy_sql():
+        c.execute(q, (lo, hi))
+    c.execute("DELETE FROM _migration_state WHERE key='bulk'")
+    c.execute("UPDATE _migration_state SET value=? WHERE key='v9_copied_upto'", (hi,))
+    return hi, last
+
+def migrate_typed_online(c, batch_rows: int = 5_000, pause: float = 0.05, progress=None) -> int:
+    """
+    Migration 9 theo lô trên connection c (autocommit). Mỗi lô giữ khoá ghi vài chục ms, nghỉ `pause` giây
+    giữa các lô để app (kể cả bản cũ, nhờ trigger soi gương) vẫn ghi được. progress(id đã chép, id lớn nhất).
+    Chạy lại sau khi bị ngắt thì làm tiếp từ lô dở. Trả về user_version sau khi chạy.
+    """
+    def version():
+        return c.execute("PRAGMA user_version").fetchone()[0]
+    fk = c.execute("PRAGMA foreign_keys").fetchone()[0]
+    c.execute("PRAGMA foreign_keys=OFF")   # DROP TABLE accounts lúc đổi bảng không được kéo theo ON DELETE CASCADE
+    try:
+        with _immediate(c):
+            if version() >= 9:
+                return version()
+            for q in TYPED_SETUP_SQL:
+                c.execute(q)
+        total = c.execute("SELECT MAX(id) FROM transactions").fetchone()[0] or 0
+        while True:
+            with _immediate(c):
+                if version() >= 9:        # process khác đã đổi bảng xong
+                    break
+                hi, last = _typed_copy_batch(c, batch_rows)
+                if last:
+                    for q in TYPED_CUTOVER_SQL:
+                        c.execute(q)
+            if progress:
+                progress(hi, max(total, hi))
+            if last:
+                break
+            time.sleep(pause)
+    finally:
+        c.execute(f"PRAGMA foreign_keys={'ON' if fk else 'OFF'}")
+    c.execute("PRAGMA optimize")
+    return version()
+
+# ---------- Migration 10: nhiều tiền tệ ----------
+# Tỷ giá: 1 đơn vị from_ccy = rate đơn vị to_ccy, áp dụng từ ngày `day` tới dòng kế tiếp (tra "tính đến ngày").
+# daily_totals thêm currency vào khoá chính: tổng theo ngày giữ nguyên tiền tệ gốc, quy đổi lúc đọc (fx.py).
+# Index phụ của bảng WITHOUT ROWID mang sẵn cả khoá chính nên vẫn đọc covering như trước.
+MULTI_CURRENCY_SQL = [
+    f"""CREATE TABLE IF NOT EXISTS fx_rates(
+ day TEXT NOT NULL CHECK(day GLOB {_DATE_GLOB}),
+ from_ccy TEXT NOT NULL,
+ to_ccy TEXT NOT NULL,
+ rate REAL NOT NULL CHECK(rate > 0),
+ PRIMARY KEY(from_ccy, to_ccy, day)
+) WITHOUT ROWID""",
+    "DROP TRIGGER trg_tx_rollup_ins",
+    "DROP TRIGGER trg_tx_rollup_del",
+    "DROP TRIGGER trg_tx_rollup_upd",
+    _typed_totals_table("daily_totals__v10", currency=True),
+    """INSERT INTO daily_totals__v10(user_id,day,category_id,account_id,kind,currency,amount_sum,tx_count)
+       SELECT user_id, substr(occurred_at,1,10), IFNULL(category_id,0), account_id, kind, currency, SUM(amount), COUNT(*)
+       FROM transactions GROUP BY 1,2,3,4,5,6""",
+    "DROP TABLE daily_totals",
+    "ALTER TABLE daily_totals__v10 RENAME TO daily_totals",
+    *_totals_indexes("daily_totals"),
+    *_rollup_triggers("transactions", "daily_totals", "trg_tx_rollup", "NEW.import_hash IS NULL", currency=True),
+]
+
+# ---------- Migration 11: tìm kiếm toàn văn (FTS5) ----------
+# tx_search: 1 dòng cho mỗi giao dịch có ghi chú/thẻ, rowid = transactions.id, trigger giữ đồng bộ.
+# unicode61 remove_diacritics 2 bỏ dấu tiếng Việt (kể cả dấu chồng: ộ, ữ) + không phân biệt hoa thường;
+# riêng đ/Đ không phải dấu tổ hợp nên thay trước khi đưa vào index (phía truy vấn: search.fold_query).
+# owner = 'u<user_id>' để MATCH giao luôn với danh sách của 1 user thay vì lọc sau.
+# prefix='2 3': index sẵn tiền tố 2–3 ký tự cho truy vấn gõ dở ("ca"* -> cà phê, cá...).
+def _fts_fold_sql(col: str) -> str:
+    return f"replace(replace({col},'đ','d'),'Đ','D')"
+
+_FTS_VALUES = f"""NEW.id, 'u'||NEW.user_id, {_fts_fold_sql("NEW.notes")}, {_fts_fold_sql("NEW.tags")}, NULL"""
+
+SEARCH_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tx_search USING fts5(
+ owner, notes, tags, merchant,
+ tokenize = 'unicode61 remove_diacritics 2',
+ prefix = '2 3'
+)""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_tx_search_ins AFTER INSERT ON transactions
+WHEN NEW.notes IS NOT NULL OR NEW.tags IS NOT NULL BEGIN
+  INSERT INTO tx_search(rowid, owner, notes, tags, merchant) VALUES({_FTS_VALUES});
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_tx_search_del AFTER DELETE ON transactions BEGIN
+  DELETE FROM tx_search WHERE rowid=OLD.id;
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_tx_search_upd AFTER UPDATE OF user_id, notes, tags ON transactions BEGIN
+  DELETE FROM tx_search WHERE rowid=OLD.id;
+  INSERT INTO tx_search(rowid, owner, notes, tags, merchant)
+    SELECT {_FTS_VALUES} WHERE NEW.notes IS NOT NULL OR NEW.tags IS NOT NULL;
+END""",
+    f"""INSERT INTO tx_search(rowid, owner, notes, tags, merchant)
+  SELECT {_FTS_VALUES.replace("NEW.", "")} FROM transactions WHERE notes IS NOT NULL OR tags IS NOT NULL""",
+    "INSERT INTO tx_search(tx_search) VALUES('optimize')",
+]
+
+# ---------- Migration 12: thẻ chuẩn hoá ----------
+# tags: mỗi user 1 dòng / thẻ, khớp theo norm_name (helpers.normalize_tag); transaction_tags nối n-n.
+# daily_tag_totals: rollup như daily_totals nhưng theo thẻ (giao dịch nhiều thẻ cộng vào mỗi thẻ),
+# khoá (user_id, kind, day, ...) để tổng theo thẻ trong khoảng ngày chỉ đọc đoạn index liên tiếp.
+# transactions.tags giữ chuỗi tên thẻ để hiển thị / tìm FTS, do queries._set_tags ghi cùng lúc với bảng nối.
+# _bulk_state: cờ chỉ sống trong transaction nhập (chèn trước, xoá trước COMMIT nên reader không thấy).
+# Có cờ 'tags' -> trigger gắn thẻ bỏ qua, importer cộng daily_tag_totals theo nhóm (_apply_bulk_insert).
+# Không dựa vào import_hash như daily_totals: sửa thẻ của dòng đã nhập về sau vẫn phải qua trigger.
+_TAG_MATCH = """user_id={u}.user_id AND kind={u}.kind AND day=substr({u}.occurred_at,1,10) AND currency={u}.currency"""
+_TAG_ADD = """INSERT INTO daily_tag_totals(user_id, kind, day, tag_id, currency, amount_sum, tx_count)
+    SELECT {t}.user_id, {t}.kind, substr({t}.occurred_at,1,10), {tag}, {t}.currency, {t}.amount, 1
+    FROM {src} WHERE {where}
+    ON CONFLICT(user_id, kind, day, tag_id, currency)
+    DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+1;"""
+_BULK_TAGS = "NOT EXISTS (SELECT 1 FROM _bulk_state WHERE key='tags')"
+
+TAGS_SQL = [
+    """CREATE TABLE IF NOT EXISTS tags(
+ id INTEGER PRIMARY KEY,
+ user_id INTEGER NOT NULL,
+ name TEXT NOT NULL,
+ norm_name TEXT NOT NULL,
+ UNIQUE(user_id, norm_name),
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+)""",
+    """CREATE TABLE IF NOT EXISTS transaction_tags(
+ transaction_id INTEGER NOT NULL,
+ tag_id INTEGER NOT NULL,
+ PRIMARY KEY(transaction_id, tag_id),
+ FOREIGN KEY(transaction_id) REFERENCES transactions(id) ON DELETE CASCADE,
+ FOREIGN KEY(tag_id) REFERENCES tags(id) ON DELETE CASCADE
+) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_ttag_tag_tx ON transaction_tags(tag_id, transaction_id)",
+    """CREATE TABLE IF NOT EXISTS daily_tag_totals(
+ user_id INTEGER NOT NULL,
+ kind INTEGER NOT NULL,
+ day TEXT NOT NULL,
+ tag_id INTEGER NOT NULL,
+ currency TEXT NOT NULL,
+ amount_sum INTEGER NOT NULL DEFAULT 0,
+ tx_count INTEGER NOT NULL DEFAULT 0,
+ PRIMARY KEY(user_id, kind, day, tag_id, currency)
+) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_dtt_user_tag_day ON daily_tag_totals(user_id, tag_id, day, kind, amount_sum)",
+    "CREATE TABLE IF NOT EXISTS _bulk_state(key TEXT PRIMARY KEY, value)",
+    # gắn / gỡ thẻ: đọc giao dịch theo khoá chính
+    f"""CREATE TRIGGER IF NOT EXISTS trg_ttag_rollup_ins AFTER INSERT ON transaction_tags WHEN {_BULK_TAGS} BEGIN
+  {_TAG_ADD.format(t="t", tag="NEW.tag_id", src="transactions t", where="t.id=NEW.transaction_id")}
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_ttag_rollup_del AFTER DELETE ON transaction_tags BEGIN
+  UPDATE daily_tag_totals SET amount_sum=amount_sum-t.amount, tx_count=tx_count-1
+    FROM transactions t
+    WHERE t.id=OLD.transaction_id AND daily_tag_totals.tag_id=OLD.tag_id
+      AND daily_tag_totals.user_id=t.user_id AND daily_tag_totals.kind=t.kind
+      AND daily_tag_totals.day=substr(t.occurred_at,1,10) AND daily_tag_totals.currency=t.currency;
+  DELETE FROM daily_tag_totals WHERE tag_id=OLD.tag_id AND tx_count<=0
+    AND user_id=(SELECT user_id FROM transactions WHERE id=OLD.transaction_id);
+END""",
+    # xoá giao dịch: gỡ thẻ TRƯỚC khi dòng biến mất (trigger trên cần đọc số tiền / ngày)
+    """CREATE TRIGGER IF NOT EXISTS trg_tx_tags_del BEFORE DELETE ON transactions BEGIN
+  DELETE FROM transaction_tags WHERE transaction_id=OLD.id;
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_tx_tags_upd
+AFTER UPDATE OF user_id, occurred_at, kind, amount, currency ON transactions BEGIN
+  UPDATE daily_tag_totals SET amount_sum=amount_sum-OLD.amount, tx_count=tx_count-1
+    WHERE {_TAG_MATCH.format(u="OLD")}
+      AND tag_id IN (SELECT tag_id FROM transaction_tags WHERE transaction_id=OLD.id);
+  DELETE FROM daily_tag_totals WHERE {_TAG_MATCH.format(u="OLD")} AND tx_count<=0;
+  {_TAG_ADD.format(t="NEW", tag="tt.tag_id", src="transaction_tags tt", where="tt.transaction_id=NEW.id")}
+END""",
+]
+
+def migrate_tags(c, **_) -> int:
+    """Migration 12: tạo bảng thẻ + trigger, tách cột tags (chuỗi tự do) sẵn có thành thẻ chuẩn hoá."""
+    from .queries import _set_tags
+    with _immediate(c):
+        if c.execute("PRAGMA user_version").fetchone()[0] < 12:
+            for q in TAGS_SQL:
+                c.execute(q)
+            rows = c.execute("SELECT id, user_id, tags FROM transactions WHERE tags IS NOT NULL").fetchall()
+            for tx_id, uid, text in rows:
+                _set_tags(c, uid, tx_id, text)
+            c.execute("PRAGMA user_version=12")
+    return c.execute("PRAGMA user_version").fetchone()[0]
+
+# ---------- Migration 13: nơi chi tiêu ----------
+# merchants: mỗi user 1 dòng / nơi chi tiêu, khớp theo norm_name (helpers.normalize_merchant).
+# transactions.merchant_id có từ v9 nhưng chưa có bảng: id lạc (nếu có) thành dòng tên tạm của chủ giao dịch.
+# monthly_merchant_totals: tổng chi/thu theo (user, kind, tháng, nơi chi tiêu, tiền tệ) — top N trong khoảng
+# ngày bất kỳ = gộp các tháng trọn vẹn từ bảng này + 2 tháng dở ở 2 đầu đọc thẳng index phủ
+# idx_txk_user_kind_time_merchant (aggregates.top_merchants_df); dòng nhập hàng loạt do _apply_bulk_insert cộng.
+# tx_search.merchant: tên nơi chi tiêu (trigger v11 tạo lại, thêm merchant_id + đổi tên nơi chi tiêu).
+_MERCHANT_MATCH = """user_id={u}.user_id AND kind={u}.kind AND month=substr({u}.occurred_at,1,7)
+     AND merchant_id={u}.merchant_id AND currency={u}.currency"""
+_MERCHANT_ADD = """INSERT INTO monthly_merchant_totals(user_id, kind, month, merchant_id, currency, amount_sum, tx_count)
+    SELECT NEW.user_id, NEW.kind, substr(NEW.occurred_at,1,7), NEW.merchant_id, NEW.currency, NEW.amount, 1
+    WHERE NEW.merchant_id IS NOT NULL
+    ON CONFLICT(user_id, kind, month, merchant_id, currency)
+    DO UPDATE SET amount_sum=amount_sum+excluded.amount_sum, tx_count=tx_count+1;"""
+_MERCHANT_SUB = f"""UPDATE monthly_merchant_totals SET amount_sum=amount_sum-OLD.amount, tx_count=tx_count-1
+    WHERE {_MERCHANT_MATCH.format(u="OLD")};
+  DELETE FROM monthly_merchant_totals WHERE {_MERCHANT_MATCH.format(u="OLD")} AND tx_count<=0;"""
+_FTS_VALUES_V13 = (_FTS_VALUES[:-len("NULL")]
+                   + _fts_fold_sql("(SELECT m.name FROM merchants m WHERE m.id=NEW.merchant_id)"))
+_FTS_HAS_TEXT = "NEW.notes IS NOT NULL OR NEW.tags IS NOT NULL OR NEW.merchant_id IS NOT NULL"
+
+MERCHANTS_SQL = [
+    """CREATE TABLE IF NOT EXISTS merchants(
+ id INTEGER PRIMARY KEY,
+ user_id INTEGER NOT NULL,
+ name TEXT NOT NULL,
+ norm_name TEXT NOT NULL,
+ UNIQUE(user_id, norm_name),
+ FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+)""",
+    """INSERT OR IGNORE INTO merchants(id, user_id, name, norm_name)
+  SELECT merchant_id, MIN(user_id), 'Nơi chi tiêu #'||merchant_id, 'noi chi tieu #'||merchant_id
+  FROM transactions WHERE merchant_id IS NOT NULL GROUP BY merchant_id""",
+    """UPDATE transactions SET merchant_id=NULL WHERE merchant_id IS NOT NULL
+  AND user_id<>(SELECT m.user_id FROM merchants m WHERE m.id=transactions.merchant_id)""",
+    "CREATE INDEX IF NOT EXISTS idx_txk_merchant ON transactions(merchant_id) WHERE merchant_id IS NOT NULL",
+    """CREATE INDEX IF NOT EXISTS idx_txk_user_kind_time_merchant
+  ON transactions(user_id, kind, occurred_at, merchant_id, currency, amount) WHERE merchant_id IS NOT NULL""",
+    # xoá nơi chi tiêu ~ ON DELETE SET NULL (cột có từ trước nên không thêm khoá ngoại được)
+    """CREATE TRIGGER IF NOT EXISTS trg_merchant_del AFTER DELETE ON merchants BEGIN
+  UPDATE transactions SET merchant_id=NULL WHERE merchant_id=OLD.id;
+END""",
+    """CREATE TABLE IF NOT EXISTS monthly_merchant_totals(
+ user_id INTEGER NOT NULL,
+ kind INTEGER NOT NULL,
+ month TEXT NOT NULL,
+ merchant_id INTEGER NOT NULL,
+ currency TEXT NOT NULL,
+ amount_sum INTEGER NOT NULL DEFAULT 0,
+ tx_count INTEGER NOT NULL DEFAULT 0,
+ PRIMARY KEY(user_id, kind, month, merchant_id, currency)
+) WITHOUT ROWID""",
+    """INSERT INTO monthly_merchant_totals(user_id, kind, month, merchant_id, currency, amount_sum, tx_count)
+  SELECT user_id, kind, substr(occurred_at,1,7), merchant_id, currency, SUM(amount), COUNT(*)
+  FROM transactions WHERE merchant_id IS NOT NULL GROUP BY 1,2,3,4,5""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_tx_merchant_ins AFTER INSERT ON transactions
+WHEN NEW.merchant_id IS NOT NULL AND NEW.import_hash IS NULL BEGIN
+  {_MERCHANT_ADD}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_tx_merchant_del AFTER DELETE ON transactions
+WHEN OLD.merchant_id IS NOT NULL BEGIN
+  {_MERCHANT_SUB}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_tx_merchant_upd
+AFTER UPDATE OF user_id, occurred_at, kind, amount, currency, merchant_id ON transactions BEGIN
+  {_MERCHANT_SUB}
+  {_MERCHANT_ADD}
+END""",
+    "DROP TRIGGER trg_tx_search_ins",
+    "DROP TRIGGER trg_tx_search_upd",
+    f"""CREATE TRIGGER trg_tx_search_ins AFTER INSERT ON transactions WHEN {_FTS_HAS_TEXT} BEGIN
+  INSERT INTO tx_search(rowid, owner, notes, tags, merchant) VALUES({_FTS_VALUES_V13});
+END""",
+    f"""CREATE TRIGGER trg_tx_search_upd AFTER UPDATE OF user_id, notes, tags, merchant_id ON transactions BEGIN
+  DELETE FROM tx_search WHERE rowid=OLD.id;
+  INSERT INTO tx_search(rowid, owner, notes, tags, merchant) SELECT {_FTS_VALUES_V13} WHERE {_FTS_HAS_TEXT};
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_merchant_search_upd AFTER UPDATE OF name ON merchants BEGIN
+  UPDATE tx_search SET merchant={_fts_fold_sql("NEW.name")}
+    WHERE rowid IN (SELECT id FROM transactions WHERE merchant_id=NEW.id);
+END""",
+    "DELETE FROM tx_search WHERE rowid IN (SELECT id FROM transactions WHERE merchant_id IS NOT NULL)",
+    f"""INSERT INTO tx_search(rowid, owner, notes, tags, merchant)
+  SELECT {_FTS_VALUES_V13.replace("NEW.", "")} FROM transactions WHERE merchant_id IS NOT NULL""",
+]
+
+# ---------- Migration 14: FTS cho dòng nhập hàng loạt ----------
+# Trigger FTS từng dòng chiếm phần lớn thời gian executemany khi nhập file lớn: dòng có import_hash
+# bỏ qua như các trigger rollup, importer._apply_bulk_insert chèn tx_search 1 lần cho cả lô.
+BULK_SEARCH_SQL = [
+    "DROP TRIGGER trg_tx_search_ins",
+    f"""CREATE TRIGGER trg_tx_search_ins AFTER INSERT ON transactions
+WHEN NEW.import_hash IS NULL AND ({_FTS_HAS_TEXT}) BEGIN
+  INSERT INTO tx_search(rowid, owner, notes, tags, merchant) VALUES({_FTS_VALUES_V13});
+END""",
+]
+# tham số: (user_id, after_id) — các dòng vừa nhập của user có id > after_id
+BULK_SEARCH_INSERT = f"""INSERT INTO tx_search(rowid, owner, notes, tags, merchant)
+  SELECT {_FTS_VALUES_V13.replace("NEW.", "")} FROM transactions
+  WHERE +user_id=? AND id>? AND +import_hash IS NOT NULL AND ({_FTS_HAS_TEXT.replace("NEW.", "")})"""
+
+# Mỗi phần tử: (version, script). Chỉ chạy các bước có version > PRAGMA user_version của DB.
+MIGRATIONS = [
+    (1, INIT_SQL),
+    # Index cho các truy vấn nóng trên transactions (lọc theo user + khoảng thời gian).
+    # Thêm type/amount vào cuối để SUM đọc thẳng từ index (covering), không phải ra bảng.
+    (2, """
+CREATE INDEX IF NOT EXISTS idx_tx_user_time      ON transactions(user_id, occurred_at, type, amount);
+CREATE INDEX IF NOT EXISTS idx_tx_user_type_time ON transactions(user_id, type, occurred_at, amount);
+CREATE INDEX IF NOT EXISTS idx_tx_user_cat_time  ON transactions(user_id, category_id, occurred_at, type, amount);
+CREATE INDEX IF NOT EXISTS idx_tx_user_acc_type  ON transactions(user_id, account_id, type, amount);
+CREATE INDEX IF NOT EXISTS idx_budgets_user_dates ON budgets(user_id, end_date, start_date);
+CREATE INDEX IF NOT EXISTS idx_categories_user_type ON categories(user_id, type, parent_id);
+CREATE INDEX IF NOT EXISTS idx_accounts_user ON accounts(user_id);
+ANALYZE;
+"""),
+    (3, DAILY_TOTALS_SQL),
+    # Tiến độ hạn mức: tra daily_totals theo (user, expense, danh mục, khoảng ngày)
+    (4, """
+CREATE INDEX IF NOT EXISTS idx_daily_user_type_cat_day ON daily_totals(user_id, type, category_id, day, amount_sum);
+"""),
+    (5, ACCOUNT_BALANCE_SQL),
+    (6, BULK_IMPORT_SQL),
+    (7, BUCKET_KEYS_SQL),
+    (8, CATEGORY_CLOSURE_SQL),
+    (9, migrate_typed_online),     # bước online: hàm tự quản lý transaction theo lô
+    (10, ";\n".join(MULTI_CURRENCY_SQL) + ";"),
+    (11, ";\n".join(SEARCH_SQL) + ";"),
+    (12, migrate_tags),
+    (13, ";\n".join(MERCHANTS_SQL) + ";"),
+    (14, ";\n".join(BULK_SEARCH_SQL) + ";"),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate_schema(c, **online) -> int:
+    """
+    Nâng schema lên SCHEMA_VERSION, mỗi bước một lần duy nhất (ghi vào PRAGMA user_version).
+    Bước dạng hàm (online, theo lô) nhận thêm `online` (batch_rows, pause, progress).
+    """
+    ver = c.execute("PRAGMA user_version").fetchone()[0]
+    for v, script in MIGRATIONS:
+        if v > ver and callable(script):
+            ver = script(c, **online)
+        elif v > ver:
+            # Mỗi bước là 1 transaction: lỗi giữa chừng thì DB vẫn ở version cũ
+            try:
+                exec_script(c, f"BEGIN;\n{script}\nPRAGMA user_version={int(v)};\nCOMMIT;")
+            except sqlite3.Error:
+                if c.in_transaction:
+                    c.rollback()
+                raise
+            ver = v
+    return ver
+
+def init_db(db_path: str | None = None):
+    path = db_path or db.DB_PATH
+    Path(path).touch(exist_ok=True)
+    pool = get_pool(path)
+    with pool.connection() as c:
+        migrate_schema(c)
+    if ENABLE_DEMO:
+        with pool.transaction() as c:
+            seed_demo_user_once(c)
+
+@functools.lru_cache(maxsize=None)
+def bootstrap_db(db_path: str) -> int:
+    """
+    Khởi tạo DB 1 lần cho mỗi process (Streamlit chạy lại script mỗi lần rerun,
+    module này thì không nạp lại nên lru_cache giữ kết quả). Trả về schema version hiện tại.
+    """
+    init_db(db_path)
+    return SCHEMA_VERSION
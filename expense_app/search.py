@@ -0,0 +1,55 @@
+# ==========================================
+# Tìm giao dịch theo ghi chú / thẻ / nơi chi tiêu qua bảng FTS5 tx_search (schema migration 11).
+# Không dấu, không phân biệt hoa thường, mỗi từ khớp theo tiền tố: "ca phe" ~ "cà phê", "tra g" ~ "trả góp".
+# ==========================================
+import re
+
+from .cache import cached_query
+from .db import fetchone, get_df
+from .helpers import day_range, strip_accents_lower
+from .queries import _TX_SELECT
+
+SEARCH_LIMIT = 200
+SEARCH_SPARSE = 2_000     # số dòng khớp tối đa để đi đường tra theo id (xem search_transactions)
+SEARCH_COLUMNS = ("notes", "tags", "merchant")
+
+def fold_query(text) -> list[str]:
+    """Chuỗi tìm -> các từ đã bỏ dấu (cùng cách gấp với index: strip_accents_lower + đ -> d)."""
+    return re.findall(r"\w+", strip_accents_lower(text).replace("đ", "d"))
+
+def fts_match(uid, text, columns=SEARCH_COLUMNS) -> str | None:
+    """Biểu thức MATCH: owner của user AND mọi từ (tiền tố) nằm trong columns. None nếu không có từ nào."""
+    words = fold_query(text)
+    if not words:
+        return None
+    terms = " ".join(f'"{w}"*' for w in words)
+    return f"owner:u{int(uid)} AND {{{' '.join(columns)}}}: ({terms})"
+
+@cached_query
+def search_transactions(uid, text, d1=None, d2=None, account_id=None, category_id=None,
+                        limit=SEARCH_LIMIT):
+    """
+    Giao dịch khớp `text` (cột như list_transactions), mới nhất trước, tối đa `limit` dòng.
+    FTS trả tập id khớp, 2 cách dùng tuỳ số lượng (đếm có giới hạn, dừng sớm):
+    - ít (<= SEARCH_SPARSE): tra từng id theo khoá chính rồi sắp — không phụ thuộc số giao dịch của user
+    - nhiều: duyệt index (user_id, occurred_at) từ mới về cũ, giữ dòng có id trong tập, đủ limit là dừng
+      ("+t.id" chặn SQLite chọn cách tra theo khoá chính rồi sắp hàng chục nghìn dòng)
+    Lọc ngày / ví / danh mục (cả cây con) trên chính các dòng đó.
+    """
+    match = fts_match(uid, text)
+    if match is None:
+        return get_df(_TX_SELECT + " AND 0", (uid,))
+    n = fetchone("SELECT COUNT(*) n FROM (SELECT rowid FROM tx_search WHERE tx_search MATCH ? LIMIT ?)",
+                 (match, SEARCH_SPARSE + 1))["n"]
+    col = "t.id" if n <= SEARCH_SPARSE else "+t.id"
+    q = _TX_SELECT + f" AND {col} IN (SELECT rowid FROM tx_search WHERE tx_search MATCH ?)"
+    p = [uid, match]
+    if d1: q += " AND t.occurred_at>=?"; p.append(str(d1)[:10])
+    if d2: q += " AND t.occurred_at<?"; p.append(day_range(d2, d2)[1])
+    if account_id is not None:
+        q += " AND t.account_id=?"; p.append(int(account_id))
+    if category_id is not None:
+        q += " AND t.category_id IN (SELECT descendant_id FROM category_closure WHERE ancestor_id=?)"
+        p.append(int(category_id))
+    q += " ORDER BY t.occurred_at DESC, t.id DESC LIMIT ?"; p.append(int(limit))
+    return get_df(q, tuple(p))
@@ -0,0 +1,105 @@
+# ==========================================
+# Dữ liệu DEMO cố định (seed), bổ sung phần còn thiếu mỗi lần khởi tạo DB.
+# ==========================================
+import datetime as dt, random
+
+from .db import hash_password
+from .helpers import TX_KINDS, now_created, start_months_back
+
+# ---------- Seed DEMO ----------
+DEMO_EMAIL = "demo@expense.local"
+DEMO_SEED = 20230101  # seed cố định -> dữ liệu DEMO giống nhau giữa các lần chạy
+
+def seed_demo_user_once(c):
+    """
+    Tạo dữ liệu DEMO (chạy trong transaction của init_db), idempotent: chỉ bổ sung phần còn thiếu (tháng chưa có giao dịch,
+    hạn mức chưa có), không xoá/ghi lại dữ liệu cũ. Mỗi tháng dùng RNG riêng theo seed cố định.
+    """
+    if not c.execute("SELECT 1 FROM users WHERE email=?", (DEMO_EMAIL,)).fetchone():
+        now = now_created()
+        c.execute(
+            "INSERT INTO users(email,password_hash,created_at,display_name,onboarded) VALUES(?,?,?,?,1)",
+            (DEMO_EMAIL, hash_password("demo1234"), now, "Tài khoản DEMO")
+        )
+
+    uid = c.execute("SELECT id FROM users WHERE email=?", (DEMO_EMAIL,)).fetchone()["id"]
+    now = now_created()
+
+    if not c.execute("SELECT 1 FROM accounts WHERE user_id=?", (uid,)).fetchone():
+        c.execute("INSERT INTO accounts(user_id,name,type,currency,opening_balance,created_at) VALUES(?,?,?,?,?,?)",
+                  (uid, "Tiền mặt", "cash", "VND", 2_000_000, now))
+        c.execute("INSERT INTO accounts(user_id,name,type,currency,opening_balance,created_at) VALUES(?,?,?,?,?,?)",
+                  (uid, "Tài khoản ngân hàng", "bank", "VND", 8_000_000, now))
+
+    base_cats = [
+        ("Ăn uống","expense"), ("Cà phê","expense"), ("Giải trí","expense"),
+        ("Tiền học","expense"), ("Đi lại","expense"), ("Mua sắm","expense"),
+        ("Lương","income"), ("Thưởng","income"), ("Bán đồ cũ","income")
+    ]
+    for n,t in base_cats:
+        if not c.execute("SELECT 1 FROM categories WHERE user_id=? AND name=? AND type=?",(uid,n,t)).fetchone():
+            c.execute("INSERT INTO categories(user_id,name,type) VALUES(?,?,?)",(uid,n,t))
+
+    acc_ids = [r["id"] for r in c.execute("SELECT id FROM accounts WHERE user_id=? ORDER BY id", (uid,)).fetchall()]
+    exp_ids = [r["id"] for r in c.execute("SELECT id FROM categories WHERE user_id=? AND type='expense' ORDER BY id", (uid,)).fetchall()]
+    inc_ids = [r["id"] for r in c.execute("SELECT id FROM categories WHERE user_id=? AND type='income' ORDER BY id", (uid,)).fetchall()]
+
+    def month_rows(y, m):
+        rng = random.Random(f"{DEMO_SEED}-{y}-{m:02d}")
+        month_mid = dt.date(y, m, 15)
+        rows = []
+        for _ in range(rng.randint(3, 5)):  # incomes
+            cat = rng.choice(inc_ids)
+            amt = rng.choice([rng.randint(6_000_000, 18_000_000),
+                              rng.randint(500_000, 2_000_000)])
+            day_off = rng.randint(-10, 10)
+            hh, mm = rng.randint(8, 21), rng.randint(0, 59)
+            occurred = dt.datetime.combine(month_mid + dt.timedelta(days=day_off),
+                                           dt.time(hh, mm)).strftime("%Y-%m-%d %H:%M")
+            rows.append((uid, rng.choice(acc_ids), TX_KINDS["income"], cat, amt, "VND", occurred, now))
+        for _ in range(rng.randint(14, 22)):  # expenses
+            cat = rng.choice(exp_ids)
+            amt = rng.choice([rng.randint(80_000, 350_000),
+                              rng.randint(300_000, 1_200_000),
+                              rng.randint(1_500_000, 6_000_000)])
+            day_off = rng.randint(-13, 13)
+            hh, mm = rng.randint(8, 22), rng.randint(0, 59)
+            occurred = dt.datetime.combine(month_mid + dt.timedelta(days=day_off),
+                                           dt.time(hh, mm)).strftime("%Y-%m-%d %H:%M")
+            rows.append((uid, rng.choice(acc_ids), TX_KINDS["expense"], cat, amt, "VND", occurred, now))
+        return rows
+
+    # Giao dịch trong tháng luôn nằm trong chính tháng đó (ngày 15 ± 13) -> dùng 'YYYY-MM' làm khoá
+    seeded = {r[0] for r in c.execute(
+        "SELECT DISTINCT substr(occurred_at,1,7) FROM transactions WHERE user_id=?", (uid,)
+    ).fetchall()}
+    today = dt.date.today()
+    months = [(y, m) for y in (2023, 2024) for m in range(1, 12+1)]
+    months += [(today.year, m) for m in range(1, today.month + 1) if today.year > 2024]
+    rows = []
+    for y, m in months:
+        if f"{y}-{m:02d}" not in seeded:
+            rows.extend(month_rows(y, m))
+    if rows:
+        c.executemany("""INSERT INTO transactions(user_id,account_id,kind,category_id,amount,currency,occurred_at,created_at)
+                         VALUES(?,?,?,?,?,?,?,?)""", rows)
+
+    cats_map = {r["name"]: r["id"] for r in c.execute(
+        "SELECT id,name FROM categories WHERE user_id=? AND type='expense'", (uid,)
+    ).fetchall()}
+    budget_templates = {"Ăn uống": 4_500_000, "Cà phê": 1_200_000, "Giải trí": 2_500_000, "Tiền học": 6_000_000}
+
+    existing = {(r["category_id"], r["start_date"]) for r in c.execute(
+        "SELECT category_id,start_date FROM budgets WHERE user_id=?", (uid,)
+    ).fetchall()}
+    anchor = today.replace(day=1)
+    for i in range(12):
+        first = start_months_back(anchor, i + 1)
+        next_month = (first.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+        last = next_month - dt.timedelta(days=1)
+        for name, amt in budget_templates.items():
+            cid = cats_map.get(name)
+            if not cid or (int(cid), str(first)) in existing: continue
+            c.execute("""INSERT INTO budgets(user_id,category_id,amount,start_date,end_date)
+                         VALUES(?,?,?,?,?)""",
+                      (uid, int(cid), int(amt), str(first), str(last)))
@@ -0,0 +1,4 @@
+# Giao diện Streamlit (import package này mới kéo theo streamlit/pandas).
+from .pages import main
+
+__all__ = ["main"]
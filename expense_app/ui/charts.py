@@ -0,0 +1,187 @@
+# ==========================================
+# KPI & biểu đồ. altair chỉ được import khi vẽ biểu đồ đầu tiên (nặng, ~0.4s).
+# ==========================================
+import math
+
+import pandas as pd
+import streamlit as st
+
+from ..aggregates import previous_period
+from ..helpers import format_vnd
+from ..profiling import profiled
+
+COLOR_INCOME = "#2ecc71"
+COLOR_EXPENSE = "#ff6b6b"
+COLOR_NET = "#06b6d4"
+
+@profiled("chart")
+def kpi(snap, d1, d2, mode):
+    """
+    - Tổng thu/chi/chênh lệch CHỈ phụ thuộc [d1, d2]
+    - Chỉ phần 'so với kỳ trước' phụ thuộc 'mode'
+    - snap = dashboard_snapshot(...) (cache theo user, cửa sổ, data version): không nhảy số khi re-run,
+      và tự làm mới ngay khi có giao dịch mới
+    """
+    income, expense, net = snap.period_sum(d1, d2)
+
+    # Kỳ trước để so sánh (phụ thuộc mode, nhưng KHÔNG ảnh hưởng tổng hiện tại)
+    p1, p2 = previous_period(d1, d2, mode)
+    pin, pex, pnet = snap.period_sum(p1, p2)
+
+    def fmt_delta(v, pv):
+        d = v - pv
+        arrow = "↑" if d > 0 else ("↓" if d < 0 else "→")
+        return f"{arrow} {format_vnd(abs(d))} VND so với kỳ trước"
+
+    c1, c2, c3 = st.columns(3)
+    c1.markdown(
+        f"<div style='color:#888'>Tổng thu</div>"
+        f"<div style='color:{COLOR_INCOME};font-weight:700;font-size:2.2rem'>{format_vnd(income)} VND</div>"
+        f"<div style='color:#888;font-size:0.9rem'>{fmt_delta(income, pin)}</div>", unsafe_allow_html=True
+    )
+    c2.markdown(
+        f"<div style='color:#888'>Tổng chi</div>"
+        f"<div style='color:{COLOR_EXPENSE};font-weight:700;font-size:2.2rem'>{format_vnd(expense)} VND</div>"
+        f"<div style='color:#888;font-size:0.9rem'>{fmt_delta(expense, pex)}</div>", unsafe_allow_html=True
+    )
+    c3.markdown(
+        f"<div style='color:#888'>Chênh lệch (thu - chi)</div>"
+        f"<div style='color:{COLOR_NET};font-weight:700;font-size:2.2rem'>{format_vnd(net)} VND</div>"
+        f"<div style='color:#888;font-size:0.9rem'>{fmt_delta(net, pnet)}</div>", unsafe_allow_html=True
+    )
+
+@profiled("chart")
+def spending_chart(snap, d1, d2, mode, chart_type: str):
+    df, label, xtype = snap.agg_expense(d1, d2, mode)
+    if df.empty:
+        st.info("Chưa có dữ liệu."); return
+    import altair as alt
+    if chart_type == "Cột":
+        mark = alt.Chart(df).mark_bar(color=COLOR_EXPENSE)
+    else:
+        mark = alt.Chart(df).mark_line(point=True, color=COLOR_EXPENSE)
+    ch = mark.encode(
+        x=alt.X(f"{label}:{xtype}", title=label),
+        y=alt.Y("Chi_tieu:Q", title="Chi tiêu (VND)"),
+        tooltip=[label, alt.Tooltip("Chi_tieu:Q", format=",.0f", title="Chi tiêu")]
+    ).properties(height=260)
+    st.altair_chart(ch, use_container_width=True)
+
+@profiled("chart")
+def pie_by_category(snap, d1, d2, group_parent=True):
+    df = snap.category_expense(d1, d2, group_parent)
+
+    if df.empty:
+        st.info("Chưa có chi tiêu theo danh mục."); return
+    import altair as alt
+
+    st.altair_chart(
+        alt.Chart(df).mark_arc().encode(
+            theta="Chi_tiêu:Q",
+            color=alt.Color("Danh_mục:N", legend=None, scale=alt.Scale(scheme="tableau10")),
+            tooltip=["Danh_mục", alt.Tooltip("Chi_tiêu:Q", format=",.0f")]
+        ).properties(height=260),
+        use_container_width=True
+    )
+
+@profiled("chart")
+def budget_progress_chart(df, title: str = "Tiến độ hạn mức"):
+    """
+    Vẽ bar ngang với trục X tự co giãn theo % lớn nhất.
+    Màu: <90% xanh, 90–100% vàng, >100% đỏ.
+    """
+    if df is None or df.empty:
+        st.info("Chưa có hạn mức.")
+        return
+
+    import altair as alt
+    d = df.copy()
+    d["%"] = pd.to_numeric(d["%"], errors="coerce").fillna(0.0)
+
+    # domain trục X: làm tròn lên bội 10 để nhìn đẹp
+    max_pct = max(100.0, float(d["%"].max()))
+    domain_right = int(math.ceil(max_pct / 10.0) * 10)
+
+    def pct_to_color(p):
+        p = float(p)
+        if p < 90:
+            return "#22c55e"   # xanh
+        if p <= 100:
+            return "#f59e0b"   # vàng
+        return "#ef4444"       # đỏ
+
+    d["__color"] = [pct_to_color(x) for x in d["%"]]
+
+    base = alt.Chart(d).encode(
+        y=alt.Y("Danh mục:N", sort='-x', title=None)
+    )
+
+    bars = base.mark_bar().encode(
+        x=alt.X("%:Q", title="Đã dùng (%)", scale=alt.Scale(domain=[0, domain_right])),
+        color=alt.Color("__color:N", legend=None, scale=None),
+        tooltip=[
+            alt.Tooltip("Danh mục:N"),
+            alt.Tooltip("%:Q", format=".0f", title="Đã dùng (%)"),
+            alt.Tooltip("Đã dùng:Q", format=",.0f"),
+            alt.Tooltip("Hạn mức:Q", format=",.0f"),
+        ],
+    )
+
+    labels = base.mark_text(align="left", dx=4).encode(
+        x=alt.X("%:Q", scale=alt.Scale(domain=[0, domain_right])),
+        text=alt.Text("%:Q", format=".0f")
+    )
+
+    st.markdown(f"#### {title}")
+    st.altair_chart((bars + labels).properties(height=max(220, 28*len(d))), use_container_width=True)
+
+    # Banner cảnh báo
+    over = d[d["%"] > 100]
+    if not over.empty:
+        items = [
+            f"{r['Danh mục']} ({r['%']:.0f}% | {format_vnd(r['Đã dùng'])}/{format_vnd(r['Hạn mức'])})"
+            for _, r in over.iterrows()
+        ]
+        st.warning("⚠ Danh mục vượt hạn mức: " + " · ".join(items))
+
+@profiled("chart")
+def top_categories_chart(df):
+    import altair as alt
+    st.altair_chart(
+        alt.Chart(df).mark_bar().encode(
+            x=alt.X("Chi_tiêu:Q", title="Chi tiêu (VND)"),
+            y=alt.Y("Danh_mục:N", sort='-x', title="Danh mục"),
+            color=alt.Color("Danh_mục:N", legend=None, scale=alt.Scale(scheme="tableau10")),
+            tooltip=["Danh_mục", alt.Tooltip("Chi_tiêu:Q", format=",.0f")]
+        ).properties(height=320),
+        use_container_width=True
+    )
+
+@profiled("chart")
+def top_tags_chart(df):
+    import altair as alt
+    st.altair_chart(
+        alt.Chart(df).mark_bar().encode(
+            x=alt.X("Chi_tiêu:Q", title="Chi tiêu (VND)"),
+            y=alt.Y("Thẻ:N", sort='-x', title="Thẻ"),
+            color=alt.Color("Thẻ:N", legend=None, scale=alt.Scale(scheme="tableau20")),
+            tooltip=["Thẻ", alt.Tooltip("Chi_tiêu:Q", format=",.0f"), alt.Tooltip("Số_giao_dịch:Q", title="Số giao dịch")]
+        ).properties(height=max(160, 28 * len(df))),
+        use_container_width=True
+    )
+
+@profiled("chart")
+def top_merchants_chart(df, by="amount"):
+    import altair as alt
+    x = alt.X("Chi_tiêu:Q", title="Chi tiêu (VND)") if by == "amount" else \
+        alt.X("Số_giao_dịch:Q", title="Số giao dịch")
+    st.altair_chart(
+        alt.Chart(df).mark_bar().encode(
+            x=x,
+            y=alt.Y("Nơi_chi_tiêu:N", sort='-x', title="Nơi chi tiêu"),
+            color=alt.Color("Nơi_chi_tiêu:N", legend=None, scale=alt.Scale(scheme="tableau20")),
+            tooltip=["Nơi_chi_tiêu", alt.Tooltip("Chi_tiêu:Q", format=",.0f"),
+                     alt.Tooltip("Số_giao_dịch:Q", title="Số giao dịch")]
+        ).properties(height=max(160, 28 * len(df))),
+        use_container_width=True
+    )
@@ -0,0 +1,666 @@
+# ==========================================
+# Các trang Streamlit, onboarding, đăng nhập và main().
+# ==========================================
+import datetime as dt, io, os
+
+import pandas as pd
+import streamlit as st
+
+from .. import db, profiling
+from ..aggregates import (budget_progress_df, category_expense_df, category_subtree_totals, tag_expense_df,
+                          top_merchants_df)
+from ..cache import cache_stats
+from ..dashboard import dashboard_snapshot
+from ..db import db_stats, get_df, get_pool, reader_stats, writer_stats
+from ..fx import latest_rates, load_rates_csv, missing_rates
+from ..helpers import (BASE_CURRENCY, CURRENCIES, META_DROP, df_tx_vi, format_money, format_vnd, join_date_time,
+                       parse_vnd_str,
+                       start_months_back, start_weeks_back, type_labels_vi, year_window)
+from ..importer import IMPORT_READERS, format_import_report, import_transactions
+from ..profiling import profiled
+from ..queries import (add_account, add_budget, add_category, add_transaction, build_category_tree,
+                       category_paths, create_user, delete_budget, delete_category, finish_onboarding,
+                       get_accounts, get_categories, get_user, list_merchants, list_tags, list_transactions_page,
+                       login_user, move_category, set_opening_balance, set_user_profile)
+from ..schema import bootstrap_db
+from .charts import (budget_progress_chart, kpi, pie_by_category, spending_chart, top_categories_chart,
+                     top_merchants_chart, top_tags_chart)
+from .widgets import (_toast_ok, background_jobs, export_panel, fill_when_ready, money_input, pending_slot,
+                      profile_panel, render_inline_notice, render_table, render_tx_search, render_tx_table_paged,
+                      show_notice)
+
+DEBUG_DB = os.environ.get("EXPENSE_DEBUG_DB") == "1"  # hiện số connection/statement mỗi rerun ở sidebar
+
+# ---------- Pages ----------
+@profiled("page")
+def page_transactions(uid):
+    st.subheader("🧾 Thêm giao dịch mới")
+    accounts = get_accounts(uid)
+    if accounts.empty:
+        st.warning("⚠️ Vui lòng tạo ít nhất 1 tài khoản trước khi thêm giao dịch.")
+        return
+
+    # Loại giao dịch
+    ttype_vi = st.radio("Loại giao dịch", ["Chi tiêu","Thu nhập"], horizontal=True)
+    ttype = "expense" if ttype_vi == "Chi tiêu" else "income"
+
+    # Lấy toàn bộ danh mục theo loại
+    if get_categories(uid, ttype).empty:
+        st.warning("⚠️ Chưa có danh mục phù hợp. Hãy tạo danh mục ở mục 🏷 trước.")
+        return
+
+    # --- Danh mục: mọi cấp, hiện cả đường dẫn (Ăn uống › Ăn trưa › …) theo thứ tự cây ---
+    category_id = _category_select("Danh mục", uid, ttype, key="add_tx_category")
+
+    # --- Ví/Tài khoản ---
+    acc_name = st.selectbox("Chọn ví/tài khoản", accounts["name"])
+    acc = accounts.loc[accounts["name"] == acc_name].iloc[0]
+    acc_id, acc_ccy = int(acc["id"]), acc["currency"]
+
+    # --- Số tiền & ghi chú (theo tiền tệ của ví) ---
+    amt = money_input(f"💰 Số tiền ({acc_ccy})", key="add_tx_amount", currency=acc_ccy,
+                      placeholder="VD: 5.000.000" if acc_ccy == BASE_CURRENCY else "VD: 12.50")
+    notes = st.text_input("📝 Ghi chú (tùy chọn)")
+    known_tags = list_tags(uid)["name"].tolist()
+    tags = st.multiselect("🏷 Thẻ (tùy chọn)", known_tags, key="add_tx_tags", accept_new_options=True,
+                          placeholder="Chọn hoặc gõ thẻ mới (vd: du lịch, công tác)")
+    # tên gõ mới được khớp với nơi chi tiêu đã có theo tên chuẩn hoá (queries.match_merchant) khi lưu
+    merchant = st.selectbox("🏪 Nơi chi tiêu (tùy chọn)", list_merchants(uid)["name"].tolist(), index=None,
+                            key="add_tx_merchant", accept_new_options=True,
+                            placeholder="Chọn hoặc gõ tên mới (vd: Highlands Coffee)")
+
+    # --- Thời gian ---
+    use_now = st.checkbox("Dùng thời gian hiện tại", value=True)
+    if use_now:
+        occurred_dt = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
+    else:
+        date = st.date_input("Ngày giao dịch", value=dt.date.today())
+        time = st.time_input("Giờ giao dịch", value=dt.datetime.now().time().replace(second=0, microsecond=0))
+        occurred_dt = join_date_time(date, time)
+
+    # --- Lưu ---
+    if st.button("💾 Lưu giao dịch", type="primary", use_container_width=True):
+        try:
+            if amt <= 0:
+                st.error("Số tiền phải lớn hơn 0.")
+                st.stop()
+            add_transaction(uid, acc_id, ttype, category_id, amt, notes, occurred_dt, tags, merchant)
+            _toast_ok("✅ Đã thêm giao dịch thành công")
+            st.session_state["add_tx_amount"] = ""
+        except Exception as e:
+            st.error(f"Lưu thất bại. Vui lòng kiểm tra lại dữ liệu. ({e})")
+
+# ----------------- HOME -----------------
+@profiled("page")
+def page_home(uid):
+    st.subheader("🏠 Trang chủ")
+    _render_fx_warning(uid)
+
+    today = dt.date.today()
+    # Giữ trạng thái bộ lọc ngày
+    if "filter_start" not in st.session_state:
+        st.session_state.filter_start = today.replace(day=1)
+    if "filter_end" not in st.session_state:
+        st.session_state.filter_end = today
+
+    # Hàng chọn ngày
+    c1, c2 = st.columns(2)
+    st.session_state.filter_start = c1.date_input("Từ ngày", st.session_state.filter_start)
+    st.session_state.filter_end   = c2.date_input("Đến ngày", st.session_state.filter_end)
+
+    # Snapshot khoảng ngày dùng thống nhất toàn trang
+    cur_start = st.session_state.filter_start
+    cur_end   = st.session_state.filter_end
+
+    # Lưu chế độ hiển thị trong session để KPI không “nhấp nháy” số
+    if "home_mode" not in st.session_state:
+        st.session_state.home_mode = "day"  # day/week/month/year
+
+    # Đọc DB chạy nền ngay từ đầu: 1 snapshot cho KPI/biểu đồ/cơ cấu/hạn mức + giao dịch gần đây.
+    # Trang dựng khung + placeholder, widget nào có số liệu trước vẽ trước; đổi khoảng ngày -> huỷ job cũ.
+    jobs = background_jobs("home", uid, {
+        "snap": (dashboard_snapshot, uid, cur_start, cur_end),
+        "recent": (_recent_tx_df, uid, today - dt.timedelta(days=7), today),
+    })
+
+    # KPI (tổng thu/chi/net đặt ngay dưới bộ chọn ngày)
+    ph_kpi = pending_slot()
+
+    st.divider()
+
+    # Hàng điều khiển: Chế độ hiển thị & Kiểu biểu đồ (đưa lên trước biểu đồ)
+    ctl1, ctl2, _ = st.columns([1.2, 1.0, 2])
+    mode = ctl1.radio("Chế độ hiển thị", ["Ngày","Tuần","Tháng","Năm"],
+                      horizontal=True,
+                      index=["day","week","month","year"].index(st.session_state.home_mode))
+    mode_key = {"Ngày":"day","Tuần":"week","Tháng":"month","Năm":"year"}[mode]
+    st.session_state.home_mode = mode_key  # cập nhật cho lần render kế tiếp
+
+    chart_type = ctl2.radio("Kiểu biểu đồ", ["Cột","Đường"], horizontal=True, index=0)
+
+    # Điều chỉnh khoảng cho CHART (riêng biểu đồ để dễ nhìn gọn)
+    chart_d1, chart_d2 = cur_start, cur_end
+    if mode_key == "week":
+        chart_d1 = start_weeks_back(chart_d2, 12)
+    elif mode_key == "month":
+        chart_d1 = start_months_back(chart_d2, 12)
+    elif mode_key == "year":
+        chart_d1, chart_d2 = year_window(chart_d2, 5)
+
+    colA, colB = st.columns([2, 1])
+    with colA:
+        st.markdown(f"#### Biểu đồ theo {mode.lower()}")
+        ph_chart = pending_slot()
+        st.caption(f"Khoảng hiển thị: {chart_d1} → {chart_d2}")
+
+    with colB:
+        st.markdown("#### Cơ cấu theo danh mục")
+        # Mặc định gộp theo danh mục cha = True
+        group_parent = st.toggle("Gộp theo danh mục cha", value=True, key="home_group_parent")
+        ph_pie = pending_slot()
+
+    st.divider()
+    st.markdown("#### Tiến độ hạn mức")
+    ph_budget = pending_slot()
+
+    st.divider()
+    st.markdown("#### Giao dịch gần đây")
+    ph_recent = pending_slot()
+
+    snap = jobs["snap"]
+    fill_when_ready([
+        (jobs["recent"], ph_recent, _render_recent_tx),
+        (snap, ph_kpi, lambda s: kpi(s, cur_start, cur_end, mode_key)),
+        (snap, ph_chart, lambda s: spending_chart(s, chart_d1, chart_d2, mode_key, chart_type)),
+        (snap, ph_pie, lambda s: pie_by_category(s, cur_start, cur_end, group_parent)),
+        (snap, ph_budget, lambda s: _render_budget_alert(s.budget_progress(cur_start, cur_end))),
+    ])
+
+def _recent_tx_df(uid, d1, d2):
+    """10 giao dịch mới nhất (LIMIT bằng SQL, không đọc cả tuần rồi cắt), đã định dạng để hiển thị."""
+    df = df_tx_vi(list_transactions_page(uid, d1, d2, limit=10))
+    if df is None or df.empty:
+        return df
+    if "Loại" in df.columns:
+        df["Loại"] = type_labels_vi(df["Loại"], emoji=True)
+    df = df.drop(columns=[c for c in df.columns if c in META_DROP], errors="ignore")
+    df.insert(0, "STT", range(1, len(df)+1))
+    return df
+
+def _render_recent_tx(df):
+    if df is None or df.empty:
+        st.info("Chưa có giao dịch tuần này.")
+    else:
+        st.dataframe(df, use_container_width=True, height=260, hide_index=True)
+
+def _render_budget_alert(dfb):
+    # Trang chủ: chỉ hiện các hạn mức sắp chạm/vượt (>= 90%)
+    near_threshold = 90.0
+    df_alert = dfb[dfb["%"] >= near_threshold] if dfb is not None and not dfb.empty else dfb
+    if df_alert is None or df_alert.empty:
+        st.success("🎉 Chưa có danh mục nào gần chạm hoặc vượt hạn mức.")
+    else:
+        budget_progress_chart(df_alert, title="Tiến độ hạn mức (gần chạm/vượt)")
+
+def _render_fx_warning(uid):
+    missing = missing_rates(uid)
+    if missing:
+        st.warning(f"⚠️ Chưa có tỷ giá {', '.join(missing)} → {BASE_CURRENCY}: số liệu quy đổi đang bỏ qua các ví này. "
+                   "Nạp tỷ giá ở 📤 Nhập dữ liệu › Tỷ giá.")
+
+@profiled("page")
+def page_accounts(uid):
+    render_inline_notice()
+
+    st.subheader("👛 Ví / Tài khoản")
+    df = get_accounts(uid)
+    if df.empty:
+        st.info("Chưa có ví nào.")
+    else:
+        disp = df.copy()
+        disp["Tên"]  = disp["name"]
+        disp["Loại"] = disp["type"].map({"cash":"Tiền mặt","bank":"Tài khoản ngân hàng","card":"Thẻ"})
+        disp["Tiền tệ"] = disp["currency"]
+        disp["Số dư hiện tại"] = format_money(disp["balance"], disp["currency"])
+        disp = disp[["Tên","Loại","Tiền tệ","Số dư hiện tại"]]
+
+        render_table(
+            disp,
+            default_sort_col="Số dư hiện tại",
+            default_asc=False,
+            height=320,
+            key_suffix="accounts",
+            exclude_sort_cols={"Tên","Loại","Tiền tệ"},
+            show_type_filters=False,
+            show_sort=True
+        )
+
+    st.markdown("#### Thêm ví mới")
+    name = st.text_input("Tên ví (tuỳ chọn)")
+    ttype = st.selectbox("Loại",["cash","bank","card"],
+                         format_func=lambda x: {"cash":"Tiền mặt","bank":"Tài khoản ngân hàng","card":"Thẻ"}[x])
+    currency = st.selectbox("Tiền tệ", CURRENCIES, help="Giao dịch của ví ghi theo tiền tệ này; báo cáo quy đổi "
+                            f"về {BASE_CURRENCY} theo bảng tỷ giá (Nhập dữ liệu › Tỷ giá).")
+    opening = money_input(f"Số dư ban đầu ({currency})", key="open_balance", placeholder="VD: 2.000.000",
+                          currency=currency)
+    if st.button("Thêm ví", type="primary"):
+        add_account(uid, name or {"cash":"Tiền mặt","bank":"Tài khoản ngân hàng","card":"Thẻ"}[ttype], ttype, opening,
+                    currency)
+        _toast_ok("✅ Đã thêm ví mới!")
+        st.rerun()
+
+def _category_select(label, uid, ctype, key, none_label=None, exclude=None):
+    """Selectbox danh mục theo đường dẫn đầy đủ; trả về id (None nếu chọn none_label)."""
+    paths = category_paths(uid, ctype)
+    if exclude is not None:    # bỏ cả cây con (không cho chọn làm cha của chính nó)
+        sub = get_df("SELECT descendant_id FROM category_closure WHERE ancestor_id=?", (int(exclude),))
+        paths = paths[~paths["id"].isin(sub["descendant_id"])]
+    label_of = dict(zip(paths["id"].tolist(), paths["path"].tolist()))
+    options = ([None] if none_label else []) + list(label_of)
+    return st.selectbox(label, options, key=key, format_func=lambda i: none_label if i is None else label_of[i])
+
+def _category_lines(nodes, totals, depth=0):
+    """Danh sách markdown lồng nhau: tên + tổng chi cả cây con tháng này."""
+    lines = []
+    for n in nodes:
+        total = totals.get(n["id"], 0.0)
+        lines.append(f"{'  ' * depth}- 🏷️ **{n['name']}**" + (f" · {format_vnd(total)} VND" if total else ""))
+        lines += _category_lines(n["children"], totals, depth + 1)
+    return lines
+
+@profiled("page")
+def page_categories(uid):
+    render_inline_notice()
+
+    st.subheader("🏷️ Danh mục")
+
+    tab_exp, tab_inc = st.tabs(["Chi tiêu","Thu nhập"])
+    for ctype_vi, tab in [("Chi tiêu", tab_exp), ("Thu nhập", tab_inc)]:
+        ctype = "expense" if ctype_vi=="Chi tiêu" else "income"
+        with tab:
+            roots, orphans = build_category_tree(uid, ctype)
+            today = dt.date.today()
+            totals = category_subtree_totals(uid, today.replace(day=1), today, ctype)
+            if not roots and not orphans:
+                st.info("Chưa có danh mục.")
+            else:
+                for p in roots + orphans:
+                    total = totals.get(p["id"], 0.0)
+                    with st.expander(f"🏷️ {p['name']}" + (f" · {format_vnd(total)} VND tháng này" if total else "")):
+                        if not p["children"]:
+                            st.caption("— (Chưa có danh mục con)")
+                        else:
+                            st.markdown("\n".join(_category_lines(p["children"], totals)))
+
+            st.markdown("##### Thêm danh mục")
+            cname = st.text_input(f"Tên danh mục ({ctype_vi})", key=f"cat_name_{ctype}")
+            # chọn cha ở cấp bất kỳ (có thể để (Không))
+            parent_id = _category_select("Thuộc danh mục cha (tuỳ chọn)", uid, ctype, key=f"cat_parent_{ctype}",
+                                         none_label="(Không)")
+
+            ccol1, ccol2, ccol3 = st.columns([1,1,1])
+            if ccol1.button("Thêm danh mục", key=f"btn_add_cat_{ctype}"):
+                if cname.strip():
+                    add_category(uid, cname.strip(), ctype, parent_id)
+                    _toast_ok("✅ Đã thêm danh mục!")
+                    st.rerun()
+                else:
+                    show_notice("❌ Tên danh mục không được để trống.", "error"); st.rerun()
+
+            with ccol2.popover("↪️ Đổi danh mục cha", use_container_width=True):
+                if not roots and not orphans:
+                    st.caption("Chưa có danh mục.")
+                else:
+                    mv_id = _category_select("Danh mục", uid, ctype, key=f"mv_{ctype}")
+                    new_parent = _category_select("Chuyển vào", uid, ctype, key=f"mv_to_{ctype}",
+                                                  none_label="(Không — thành danh mục gốc)", exclude=mv_id)
+                    st.caption("• Cả cây con đi theo danh mục được chuyển.")
+                    if st.button("Xác nhận chuyển", key=f"do_mv_{ctype}"):
+                        move_category(uid, mv_id, new_parent)
+                        _toast_ok("✅ Đã chuyển danh mục.")
+                        st.rerun()
+
+            with ccol3.popover("🗑️ Xoá danh mục", use_container_width=True):
+                if not roots and not orphans:
+                    st.caption("Chưa có danh mục để xoá.")
+                else:
+                    del_id = _category_select("Chọn danh mục", uid, ctype, key=f"del_{ctype}")
+                    st.caption("• Xoá sẽ: xoá budgets liên quan, set NULL cho giao dịch thuộc danh mục này, "
+                               "các danh mục con chuyển lên danh mục cha của nó.")
+                    if st.button("Xác nhận xoá", type="secondary", key=f"do_del_{ctype}"):
+                        delete_category(uid, del_id)
+                        _toast_ok("🗑️ Đã xoá danh mục.")
+                        st.rerun()
+
+@profiled("page")
+def page_budgets(uid):
+    render_inline_notice()
+
+    st.subheader("🎯 Ngân sách")
+    st.caption("Đặt hạn mức chi tiêu theo khoảng ngày cho từng danh mục Chi tiêu.")
+
+    cats = get_categories(uid, "expense")
+    if cats.empty:
+        st.info("Chưa có danh mục Chi tiêu."); return
+
+    cat_id = _category_select("Danh mục", uid, "expense", key="budget_category")
+    st.caption("Hạn mức tính cả chi tiêu của các danh mục con.")
+    start = st.date_input("Từ ngày", value=dt.date.today().replace(day=1))
+    end   = st.date_input("Đến ngày", value=dt.date.today())
+    amount = money_input("Hạn mức (VND)", key="budget_amount", placeholder="VD: 2.500.000")
+
+    bcol1, bcol2 = st.columns([1,1])
+    if bcol1.button("Lưu hạn mức", type="primary"):
+        add_budget(uid, cat_id, amount, start, end)
+        _toast_ok("✅ Đã lưu hạn mức!")
+        st.rerun()
+
+    with bcol2.popover("🗑️ Xoá hạn mức", use_container_width=True):
+        dfb = get_df("""SELECT b.id, c.name AS category, b.start_date, b.end_date, b.amount
+                        FROM budgets b JOIN categories c ON c.id=b.category_id
+                        WHERE b.user_id=? ORDER BY b.start_date DESC""", (uid,))
+        if dfb.empty:
+            st.caption("Chưa có hạn mức để xoá.")
+        else:
+            pick = st.selectbox("Chọn hạn mức", [f"{r['category']} ({r['start_date']} → {r['end_date']}) - {format_vnd(r['amount'])} VND" for _,r in dfb.iterrows()])
+            sel_idx = [f"{r['category']} ({r['start_date']} → {r['end_date']}) - {format_vnd(r['amount'])} VND" for _,r in dfb.iterrows()].index(pick)
+            bid = int(dfb.iloc[sel_idx]["id"])
+            if st.button("Xác nhận xoá", type="secondary"):
+                delete_budget(uid, bid)
+                _toast_ok("🗑️ Đã xoá hạn mức.")
+                st.rerun()
+
+    st.divider()
+    st.markdown("#### Hạn mức hiện có")
+    df = get_df("""SELECT b.id, c.name AS category, b.amount, b.start_date, b.end_date
+                   FROM budgets b JOIN categories c ON c.id=b.category_id
+                   WHERE b.user_id=? ORDER BY b.start_date DESC""", (uid,))
+    if df.empty:
+        st.info("Chưa có hạn mức.")
+    else:
+        df = df.rename(columns={"category":"Danh mục","amount":"Hạn mức (VND)","start_date":"Từ ngày","end_date":"Đến ngày"})
+        df["Hạn mức (VND)"] = format_vnd(df["Hạn mức (VND)"])
+        render_table(df, default_sort_col="Từ ngày", default_asc=False, height=260, key_suffix="budgets",
+                     exclude_sort_cols=set())
+
+    # Biểu đồ FULL tất cả hạn mức (lấy khoảng ngày chung nếu có, mặc định tháng này -> hôm nay)
+    st.divider()
+    chart_start = st.session_state.get("filter_start", dt.date.today().replace(day=1))
+    chart_end   = st.session_state.get("filter_end", dt.date.today())
+    df_all = budget_progress_df(uid, chart_start, chart_end)
+    budget_progress_chart(df_all, title="Tiến độ hạn mức (tất cả)")
+
+@profiled("page")
+def page_import(uid):
+    render_inline_notice()
+
+    st.subheader("📤 Nhập dữ liệu")
+    st.caption("Nhập hàng loạt từ sao kê: CSV/XLSX (cột Ngày giao dịch, Số tiền; tuỳ chọn Loại, "
+               "Ví / Tài khoản, Danh mục, Ghi chú, Tiền tệ — giống file xuất ở Báo cáo) hoặc OFX/QFX. "
+               "Số tiền ghi theo tiền tệ của ví.")
+    _fx_panel()
+    accounts = get_accounts(uid)
+    if accounts.empty:
+        st.warning("⚠️ Vui lòng tạo ít nhất 1 tài khoản trước khi nhập dữ liệu.")
+        return
+
+    up = st.file_uploader("Chọn file", type=list(IMPORT_READERS))
+    acc_name = st.selectbox("Ví mặc định (cho dòng không ghi ví)", accounts["name"])
+    acc_id = int(accounts.loc[accounts["name"] == acc_name, "id"].iloc[0])
+    create = st.checkbox("Tự tạo danh mục chưa có", value=False)
+    if up is None:
+        return
+    fmt = up.name.rsplit(".", 1)[-1].lower()
+
+    c1, c2 = st.columns(2)
+    dry = c1.button("🔍 Kiểm tra (không ghi)", use_container_width=True)
+    run = c2.button("📥 Nhập", type="primary", use_container_width=True)
+    if not (dry or run):
+        return
+    try:
+        with st.spinner("Đang xử lý…"):
+            r = import_transactions(uid, io.BytesIO(up.getvalue()), fmt, acc_id, dry_run=dry,
+                                    create_categories=create)
+    except Exception as e:
+        st.error(f"Không đọc được file. ({e})"); return
+    for line in format_import_report(r):
+        st.markdown(f"- {line}")
+    if r["errors"]:
+        st.dataframe(pd.DataFrame(r["errors"], columns=["Dòng", "Lỗi"]), use_container_width=True,
+                     height=220, hide_index=True)
+    if run and r["inserted"]:
+        st.success(f"✅ Đã nhập {r['inserted']} giao dịch.")
+
+def _fx_panel():
+    with st.expander(f"💱 Tỷ giá (quy đổi báo cáo về {BASE_CURRENCY})"):
+        st.caption("CSV cột date, from, to, rate (hoặc Ngày, Từ, Sang, Tỷ giá), vd. 2024-01-01,USD,VND,24500. "
+                   "Báo cáo dùng tỷ giá gần nhất tính đến ngày giao dịch.")
+        rates = latest_rates()
+        if not rates.empty:
+            st.dataframe(rates.rename(columns={"from_ccy": "Từ", "to_ccy": "Sang", "day": "Ngày", "rate": "Tỷ giá"}),
+                         use_container_width=True, height=180, hide_index=True)
+        fx_up = st.file_uploader("File tỷ giá", type=["csv"], key="fx_upload")
+        if fx_up is not None and st.button("Nạp tỷ giá", key="fx_load"):
+            try:
+                r = load_rates_csv(io.BytesIO(fx_up.getvalue()))
+            except ValueError as e:
+                st.error(str(e)); return
+            st.success(f"✅ Đã nạp {r['loaded']}/{r['rows']} dòng tỷ giá ({', '.join(r['pairs'])}).")
+            if r["errors"]:
+                st.dataframe(pd.DataFrame(r["errors"], columns=["Dòng", "Lỗi"]), use_container_width=True,
+                             height=160, hide_index=True)
+
+@profiled("page")
+def page_reports(uid):
+    render_inline_notice()
+
+    st.subheader("📈 Báo cáo")
+    _render_fx_warning(uid)
+
+    today = dt.date.today()
+    default_start = st.session_state.get("filter_start", today.replace(day=1))
+    default_end   = st.session_state.get("filter_end", today)
+    date_range = st.date_input("Theo ngày", value=(default_start, default_end))
+    if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+        start, end = date_range
+    else:
+        start, end = default_start, default_end
+    st.session_state.filter_start, st.session_state.filter_end = start, end
+
+    st.markdown("#### Top danh mục chi")
+    group_parent = st.toggle("Gộp theo danh mục cha", value=True, key="rep_group_parent")
+    merchant_by = "count" if st.session_state.get("rep_merchant_by") == "Số giao dịch" else "amount"
+    # Top danh mục tính nền trong lúc bảng giao dịch (keyset, nhanh) vẽ trước
+    jobs = background_jobs("reports", uid, {"top": (category_expense_df, uid, start, end, group_parent, 10),
+                                            "tags": (tag_expense_df, uid, start, end, 15),
+                                            "merchants": (top_merchants_df, uid, start, end, 10, merchant_by)})
+    ph_top = pending_slot()
+
+    st.markdown("#### 🏷 Chi tiêu theo thẻ")
+    ph_tags = pending_slot()
+
+    st.markdown("#### 🏪 Top nơi chi tiêu")
+    st.radio("Xếp theo", ["Tổng chi", "Số giao dịch"], horizontal=True, key="rep_merchant_by",
+             label_visibility="collapsed")
+    ph_merchants = pending_slot()
+
+    st.markdown("#### 📊 Danh sách giao dịch")
+    if not render_tx_search(uid, start, end, key_suffix="report_tx", height=380):
+        render_tx_table_paged(uid, start, end, key_suffix="report_tx", height=380)
+
+    st.divider()
+    st.markdown("#### 📥 Xuất dữ liệu")
+    export_panel(uid, start, end)
+
+    fill_when_ready([(jobs["top"], ph_top,
+                      lambda df: st.info("Chưa có dữ liệu.") if df.empty else top_categories_chart(df)),
+                     (jobs["tags"], ph_tags,
+                      lambda df: st.info("Chưa có giao dịch gắn thẻ.") if df.empty else top_tags_chart(df)),
+                     (jobs["merchants"], ph_merchants,
+                      lambda df: st.info("Chưa có giao dịch ghi nơi chi tiêu.") if df.empty
+                      else top_merchants_chart(df, merchant_by))])
+
+@profiled("page")
+def page_about(uid):
+    render_inline_notice()
+
+    st.subheader("ℹ️ Giới thiệu")
+    st.markdown(
+        """
+**Expense Manager** là ứng dụng quản lý thu chi cá nhân viết bằng **Python + Streamlit**, lưu trữ bằng **SQLite**.
+
+### Tính năng nổi bật
+- **Theo dõi thu/chi** theo **ngày–tuần–tháng–năm** với **KPI** và so sánh **kỳ trước**
+- **Biểu đồ** chi tiêu dạng **Cột/Đường**; **Pie chart** theo danh mục (mặc định **gộp theo danh mục cha**)
+- **Danh mục cha–con** (tạo/sửa/xoá); thêm giao dịch theo **cha** hoặc **con**
+- **Hạn mức (Ngân sách) theo danh mục**: đặt mục tiêu, xem tiến độ, cảnh báo vượt mức
+- **Báo cáo**: Top danh mục chi, danh sách giao dịch, **xuất CSV/XLSX**
+- **Quản lý ví/tài khoản** và tính **số dư hiện tại**
+- **Xoá an toàn**: giao dịch, hạn mức, danh mục (tự xử lý ràng buộc liên quan)
+
+> Mặc định mọi thống kê đều **gộp theo danh mục cha**; bạn có thể tắt để xem theo danh mục con khi cần.
+        """
+    )
+
+# ---------- Onboarding ----------
+def onboarding_wizard(uid):
+    render_inline_notice()
+
+    st.title("🚀 Thiết lập lần đầu")
+    if "ob_step" not in st.session_state: st.session_state.ob_step = 1
+
+    if st.session_state.ob_step == 1:
+        name = st.text_input("Tên hiển thị của bạn", "")
+        if st.button("Tiếp tục ➜", type="primary", disabled=(not name.strip())):
+            set_user_profile(uid, name.strip()); st.session_state.ob_step = 2; st.rerun()
+
+    elif st.session_state.ob_step == 2:
+        st.write("Nhập số dư ban đầu cho ví (**số tiền thực tế bạn đang có**):")
+        df = get_accounts(uid)
+        try:
+            cash_id = int(df[df["type"]=="cash"]["id"].iloc[0])
+            bank_id = int(df[df["type"]=="bank"]["id"].iloc[0])
+        except Exception:
+            st.error("Không tìm thấy ví mặc định. Hãy đăng xuất và đăng ký lại."); return
+        c1,c2 = st.columns(2)
+        cash_text = c1.text_input("Tiền mặt (VND)", placeholder="VD: 2.000.000", key="ob_cash")
+        bank_text = c2.text_input("Tài khoản ngân hàng (VND)", placeholder="VD: 8.000.000", key="ob_bank")
+        if st.button("Lưu & tiếp tục ➜", type="primary"):
+            set_opening_balance(uid, cash_id, parse_vnd_str(cash_text))
+            set_opening_balance(uid, bank_id, parse_vnd_str(bank_text))
+            st.session_state.ob_step = 3; st.rerun()
+
+    else:
+        st.write("Tạo **ít nhất một danh mục Chi tiêu** và **một danh mục Thu nhập**.")
+        cats_all = get_categories(uid)
+        col = st.columns(2)
+        with col[0]:
+            cname_e = st.text_input("Tên danh mục Chi tiêu", key="ob_e")
+            if st.button("Thêm danh mục Chi tiêu"):
+                if cname_e.strip(): add_category(uid, cname_e.strip(), "expense"); st.rerun()
+        with col[1]:
+            cname_i = st.text_input("Tên danh mục Thu nhập", key="ob_i")
+            if st.button("Thêm danh mục Thu nhập"):
+                if cname_i.strip(): add_category(uid, cname_i.strip(), "income"); st.rerun()
+
+        if not cats_all.empty:
+            show = cats_all.rename(columns={"name":"Tên","type":"Loại"})[["Tên","Loại"]]
+            render_table(show, height=220, key_suffix="ob", show_type_filters=False, show_sort=False)
+
+        ok = (not get_categories(uid, "expense").empty) and (not get_categories(uid, "income").empty)
+        if st.button("Hoàn tất", type="primary", disabled=(not ok)):
+            finish_onboarding(uid); st.success("Xong! Bắt đầu dùng ứng dụng thôi 🎉"); st.rerun()
+
+# ---------- Shell ----------
+def screen_login():
+    st.title("💸 Expense Manager")
+    st.caption("Quản lý chi tiêu cá nhân — Streamlit + SQLite")
+
+    render_inline_notice()
+
+    tab1, tab2 = st.tabs(["Đăng nhập","Đăng ký"])
+
+    with tab1:
+        email = st.text_input("Email")
+        pw    = st.text_input("Mật khẩu", type="password")
+        if st.button("Đăng nhập", type="primary", use_container_width=True):
+            uid = login_user(email, pw)
+            if uid:
+                st.session_state.user_id = int(uid)
+                _toast_ok("✅ Đăng nhập thành công")
+                st.rerun()
+            else:
+                show_notice("❌ Sai email hoặc mật khẩu.", "error"); st.rerun()
+
+    with tab2:
+        email_r = st.text_input("Email đăng ký")
+        pw1 = st.text_input("Mật khẩu", type="password", key="pw1")
+        pw2 = st.text_input("Nhập lại mật khẩu", type="password", key="pw2")
+        if st.button("Tạo tài khoản", use_container_width=True):
+            if not email_r or not pw1:
+                show_notice("❌ Vui lòng điền đầy đủ thông tin.", "error"); st.rerun()
+            elif pw1 != pw2:
+                show_notice("❌ Mật khẩu nhập lại không khớp.", "error"); st.rerun()
+            else:
+                ok, msg = create_user(email_r, pw1)
+                if ok:
+                    _toast_ok(msg)
+                    st.rerun()
+                else:
+                    show_notice(msg, "error"); st.rerun()
+
+def app_shell(uid: int):
+    u = get_user(uid)
+    with st.sidebar:
+        st.markdown("### 💶 Expense Manager")
+        st.write(f"👤 **{u['display_name'] or u['email']}**")
+        st.caption(dt.date.today().strftime("%d/%m/%Y"))
+        nav = st.radio("Điều hướng",
+                       ["Trang chủ","Giao dịch","Ví/Tài khoản","Danh mục","Ngân sách","Báo cáo","Nhập dữ liệu","Giới thiệu"],
+                       label_visibility="collapsed", index=0)
+        st.session_state.nav = nav
+        if st.button("Đăng xuất", use_container_width=True):
+            st.session_state.clear()
+            _toast_ok("Đã đăng xuất")
+            st.rerun()
+
+    if nav == "Trang chủ":      page_home(uid)
+    elif nav == "Giao dịch":    page_transactions(uid)
+    elif nav == "Ví/Tài khoản": page_accounts(uid)
+    elif nav == "Danh mục":     page_categories(uid)
+    elif nav == "Ngân sách":    page_budgets(uid)
+    elif nav == "Báo cáo":      page_reports(uid)
+    elif nav == "Nhập dữ liệu": page_import(uid)
+    else:                       page_about(uid)
+
+# ---------- Main ----------
+def main():
+    st.set_page_config(page_title="Expense Manager", page_icon="💸", layout="wide")
+    bootstrap_db(db.DB_PATH)
+    get_pool().reset_stats()
+    profiling.begin_run(st.session_state.get("nav", "login"))
+    try:
+        if "user_id" not in st.session_state:
+            screen_login(); return
+        u = get_user(st.session_state.user_id)
+        if not u:
+            st.session_state.clear(); screen_login(); return
+        if int(u["onboarded"] or 0) == 0:
+            onboarding_wizard(st.session_state.user_id)
+        else:
+            app_shell(st.session_state.user_id)
+    finally:
+        if DEBUG_DB:
+            s, cs = db_stats(), cache_stats()
+            st.sidebar.caption(f"DB: {s['connections']} connection · {s['statements']} statement / rerun")
+            st.sidebar.caption(f"Cache: {cs['hits']} hit · {cs['misses']} miss · {cs['evictions']} evict · "
+                               f"{cs['entries']} mục · {cs['bytes']/2**20:.1f} MB")
+            ws = writer_stats()
+            st.sidebar.caption(f"Ghi: hàng đợi {ws['queue_depth']} · {ws['committed']} commit / {ws['groups']} nhóm · "
+                               f"commit p95 {ws['commit_ms_p95'] or 0:.1f} ms · ack p95 {ws['latency_ms_p95'] or 0:.1f} ms")
+            rs = reader_stats()
+            st.sidebar.caption(f"Đọc nền: {rs['running']} đang chạy · {rs['completed']} xong · "
+                               f"{rs['cancelled']} huỷ · {rs['failed']} lỗi")
+        run = profiling.end_run()
+        if run is not None:
+            profile_panel(run)
@@ -0,0 +1,311 @@
+# ==========================================
+# Thành phần giao diện dùng lại: thông báo, ô nhập tiền, bảng (sắp xếp / phân trang), xuất file, profiling,
+# widget tính nền (placeholder -> vẽ khi job xong).
+# ==========================================
+import math, os, re, tempfile, time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, wait
+
+import pandas as pd
+import streamlit as st
+
+from ..cache import get_query_cache
+from ..db import get_pool
+from ..export import EXPORT_FORMATS, EXPORT_MAX_ROWS, count_export_rows
+from ..helpers import (BASE_CURRENCY, META_DROP, _detect_sort_kind, df_tx_vi, format_vnd, minor_exponent,
+                       parse_money_str, parse_vnd_str, sort_df_for_display, type_labels_vi)
+from ..profiling import summarize
+from ..queries import count_transactions, get_accounts, list_transactions_page
+from ..search import SEARCH_LIMIT, search_transactions
+
+# ==== Notices (thông báo đứng lại đủ lâu) ====
+def show_notice(msg: str, level: str = "success"):
+    """Ghim notice (success/info/error) cho lần render hiện tại."""
+    st.session_state["__inline_notice__"] = (msg, level)
+
+def render_inline_notice():
+    """Hiển thị notice nếu có và tự clear ở lần rerun kế tiếp."""
+    note = st.session_state.pop("__inline_notice__", None)
+    if note:
+        msg, level = note
+        if level == "error":
+            st.error(msg)
+        elif level == "info":
+            st.info(msg)
+        else:
+            st.success(msg)
+
+def _toast_ok(msg: str):
+    # Streamlit toast không chỉnh thời lượng -> kết hợp toast + inline notice
+    try:
+        st.toast(msg)
+    except Exception:
+        pass
+    show_notice(msg, "success")
+
+# Ô nhập tiền có auto chèn dấu chấm
+def money_input(label: str, key: str, placeholder: str = "VD: 5.000.000", currency: str = BASE_CURRENCY):
+    raw = st.text_input(label, key=key, placeholder=placeholder)
+    if minor_exponent(currency):
+        # tiền có phần lẻ: giữ nguyên chuỗi người dùng gõ (1.234,56 hoặc 1,234.56)
+        return parse_money_str(raw, currency)
+    cleaned = re.sub(r"[^\d]", "", raw or "")
+    if cleaned and raw and raw != "." and cleaned != raw.replace(".", ""):
+        pretty = f"{int(cleaned):,}".replace(",", ".")
+        st.session_state[key] = pretty
+    return parse_vnd_str(st.session_state.get(key, raw))
+
+def render_table(
+    df: pd.DataFrame,
+    default_sort_col: str | None = None,
+    default_asc: bool = False,
+    height: int = 320,
+    key_suffix: str = "",
+    exclude_sort_cols: set[str] | None = None,
+    show_type_filters: bool = True,
+    show_sort: bool = True,
+):
+    if df is None or df.empty:
+        st.info("Chưa có dữ liệu.")
+        return
+
+    df = df.drop(columns=[c for c in df.columns if c in META_DROP], errors="ignore").copy()
+
+    # Lọc theo 'Loại' (nếu cho phép)
+    if show_type_filters and ("Loại" in df.columns):
+        state_key = f"filter_{key_suffix}"
+        if state_key not in st.session_state:
+            st.session_state[state_key] = "Tất cả"
+
+        b_all, b_exp, b_inc = st.columns([1, 1, 1])
+        if b_all.button("⚪ Tất cả", key=f"all_{key_suffix}"):
+            st.session_state[state_key] = "Tất cả"
+        if b_exp.button("🔴 Chỉ Chi tiêu", key=f"exp_{key_suffix}"):
+            st.session_state[state_key] = "Chi tiêu"
+        if b_inc.button("🟢 Chỉ Thu nhập", key=f"inc_{key_suffix}"):
+            st.session_state[state_key] = "Thu nhập"
+
+        pick = st.session_state[state_key]
+        if pick != "Tất cả":
+            df = df[df["Loại"].astype(str).str.contains(pick, case=False, na=False)]
+
+    # Không hiển thị UI sắp xếp
+    if not show_sort:
+        df_show = df.copy()
+        df_show.insert(0, "STT", range(1, len(df_show) + 1))
+        st.dataframe(df_show, use_container_width=True, height=height, hide_index=True)
+        return
+
+    cols = [c for c in df.columns if (exclude_sort_cols is None or c not in exclude_sort_cols)]
+    if not cols:
+        df.insert(0, "STT", range(1, len(df) + 1))
+        st.dataframe(df, use_container_width=True, height=height, hide_index=True)
+        return
+
+    c1, c2, _ = st.columns([1.6, 1.2, 2])
+    idx = cols.index(default_sort_col) if default_sort_col in cols else 0
+    sort_col = c1.selectbox("Sắp xếp theo", cols, index=idx, key=f"sort_{key_suffix}")
+    kind = _detect_sort_kind(df, sort_col)
+
+    if kind == "type":
+        st.caption("Thứ tự 'Loại' cố định: Chi tiêu → Thu nhập")
+        ascending = True
+    else:
+        if kind == "time":
+            labels = ["Mới nhất", "Cũ nhất"]
+        elif kind == "number":
+            labels = ["Cao → Thấp", "Thấp → Cao"]
+        else:
+            labels = ["A → Z", "Z → A"]
+
+        pick = c2.radio("Thứ tự", labels, horizontal=True, key=f"order_{key_suffix}")
+        if labels == ["Mới nhất", "Cũ nhất"]:
+            ascending = (pick == "Cũ nhất")
+        elif labels == ["Cao → Thấp", "Thấp → Cao"]:
+            ascending = (pick == "Thấp → Cao")
+        else:
+            ascending = (pick == "A → Z")
+
+    df_sorted = sort_df_for_display(df, sort_col, ascending)
+    df_sorted.insert(0, "STT", range(1, len(df_sorted) + 1))
+    st.dataframe(df_sorted, use_container_width=True, height=height, hide_index=True)
+
+def render_tx_table_paged(uid, d1, d2, key_suffix: str, height: int = 380):
+    """
+    Bảng giao dịch phân trang phía server: lọc loại + sắp xếp bằng SQL, keyset theo (cột, id),
+    chỉ định dạng các dòng của trang đang xem.
+    """
+    state_key = f"filter_{key_suffix}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = "Tất cả"
+    b_all, b_exp, b_inc = st.columns([1, 1, 1])
+    if b_all.button("⚪ Tất cả", key=f"all_{key_suffix}"):
+        st.session_state[state_key] = "Tất cả"
+    if b_exp.button("🔴 Chỉ Chi tiêu", key=f"exp_{key_suffix}"):
+        st.session_state[state_key] = "Chi tiêu"
+    if b_inc.button("🟢 Chỉ Thu nhập", key=f"inc_{key_suffix}"):
+        st.session_state[state_key] = "Thu nhập"
+    ttype = {"Chi tiêu": "expense", "Thu nhập": "income"}.get(st.session_state[state_key])
+
+    c1, c2, c3 = st.columns([1.6, 1.2, 1])
+    # Số tiền sắp theo giá trị quy đổi (ví khác tiền tệ vẫn so được với nhau), bảng vẫn hiện tiền gốc
+    sort_vi = c1.selectbox("Sắp xếp theo", ["Thời điểm", f"Số tiền (quy đổi {BASE_CURRENCY})"], key=f"sort_{key_suffix}")
+    sort = "occurred_at" if sort_vi == "Thời điểm" else "amount"
+    labels = ["Mới nhất", "Cũ nhất"] if sort == "occurred_at" else ["Cao → Thấp", "Thấp → Cao"]
+    ascending = c2.radio("Thứ tự", labels, horizontal=True, key=f"order_{key_suffix}") == labels[1]
+    page_size = c3.selectbox("Số dòng / trang", [25, 50, 100, 200], index=1, key=f"size_{key_suffix}")
+
+    # Danh sách 'after' của các trang đã đi qua; reset khi đổi bộ lọc/sắp xếp/khoảng ngày/dữ liệu
+    view = (uid, str(d1), str(d2), ttype, sort, ascending, page_size, get_query_cache().version(uid))
+    cur_key = f"cursor_{key_suffix}"
+    if st.session_state.get(f"{cur_key}_view") != view:
+        st.session_state[f"{cur_key}_view"] = view
+        st.session_state[cur_key] = [None]
+    cursors = st.session_state[cur_key]
+
+    total = count_transactions(uid, d1, d2, ttype)
+    if total == 0:
+        st.info("Chưa có dữ liệu.")
+        return
+    page = list_transactions_page(uid, d1, d2, ttype, sort, ascending, cursors[-1], page_size)
+
+    n_page = len(cursors)
+    first_row = (n_page - 1) * page_size
+    df = df_tx_vi(page)
+    df["Loại"] = type_labels_vi(df["Loại"], emoji=True)
+    df = df.drop(columns=[c for c in df.columns if c in META_DROP], errors="ignore")
+    df.insert(0, "STT", range(first_row + 1, first_row + len(df) + 1))
+    st.dataframe(df, use_container_width=True, height=height, hide_index=True)
+
+    p1, p2, p3 = st.columns([1, 2, 1])
+    if p1.button("◀ Trang trước", key=f"prev_{key_suffix}", disabled=n_page == 1):
+        cursors.pop(); st.rerun()
+    p2.caption(f"Trang {n_page}/{max(1, math.ceil(total / page_size))} · "
+               f"dòng {first_row + 1}–{first_row + len(df)} / {format_vnd(total)}")
+    has_next = first_row + len(page) < total
+    if p3.button("Trang sau ▶", key=f"next_{key_suffix}", disabled=not has_next):
+        last = page.iloc[-1]
+        key = last["sort_key"]
+        cursors.append((key.item() if hasattr(key, "item") else key, int(last["id"])))
+        st.rerun()
+
+
+def render_tx_search(uid, d1, d2, key_suffix: str, height: int = 380) -> bool:
+    """
+    Ô tìm theo ghi chú / thẻ / nơi chi tiêu (FTS, không dấu, gõ dở vẫn khớp) trong [d1, d2], lọc thêm ví.
+    Trả về True nếu đang tìm (người gọi bỏ qua bảng phân trang).
+    """
+    c1, c2 = st.columns([2, 1])
+    text = c1.text_input("🔎 Tìm giao dịch", key=f"search_{key_suffix}",
+                         placeholder="Ghi chú, thẻ, nơi chi tiêu… (vd: ca phe)")
+    if not (text or "").strip():
+        return False
+    accounts = get_accounts(uid)
+    acc_label = dict(zip(accounts["id"].tolist(), accounts["name"].tolist()))
+    acc_id = c2.selectbox("Ví", [None, *acc_label], key=f"search_acc_{key_suffix}",
+                          format_func=lambda i: "Tất cả ví" if i is None else acc_label[i])
+    df = search_transactions(uid, text, d1, d2, acc_id)
+    if df.empty:
+        st.info("Không có giao dịch khớp.")
+        return True
+    df = df_tx_vi(df)
+    df["Loại"] = type_labels_vi(df["Loại"], emoji=True)
+    df = df.drop(columns=[c for c in df.columns if c in META_DROP], errors="ignore")
+    df.insert(0, "STT", range(1, len(df) + 1))
+    st.dataframe(df, use_container_width=True, height=height, hide_index=True)
+    st.caption(f"{len(df)} giao dịch khớp" + (f" (hiện {SEARCH_LIMIT} mới nhất)" if len(df) >= SEARCH_LIMIT else ""))
+    return True
+
+def export_panel(uid, start, end):
+    """Chỉ dựng file khi người dùng bấm 'Chuẩn bị file'; file nằm ở thư mục tạm, không giữ trong RAM mỗi rerun."""
+    n = count_export_rows(uid, start, end)
+    if n == 0:
+        st.caption("Không có dữ liệu để xuất."); return
+    note = f" — chỉ xuất {format_vnd(EXPORT_MAX_ROWS)} dòng mới nhất" if n > EXPORT_MAX_ROWS else ""
+    st.caption(f"{format_vnd(n)} giao dịch trong khoảng đã chọn{note}.")
+
+    fmt = st.radio("Định dạng", list(EXPORT_FORMATS), horizontal=True, key="export_fmt")
+    writer, fname, mime = EXPORT_FORMATS[fmt]
+    want = (uid, str(start), str(end), fmt, get_query_cache().version(uid))
+    ready = st.session_state.get("__export_file__")
+
+    if st.button("⚙️ Chuẩn bị file", key="export_build"):
+        if ready and os.path.exists(ready[1]):
+            os.remove(ready[1])
+        bar = st.progress(0.0, text="Đang xuất…")
+        fd, path = tempfile.mkstemp(prefix="expense_export_", suffix=os.path.splitext(fname)[1])
+        with os.fdopen(fd, "wb") as fh:
+            rows = writer(uid, start, end, fh,
+                          progress=lambda done, total: bar.progress(min(1.0, done / max(total, 1)),
+                                                                     text=f"Đang xuất… {done}/{total}"))
+        bar.empty()
+        ready = st.session_state["__export_file__"] = (want, path, rows)
+
+    if ready and ready[0] == want and os.path.exists(ready[1]):
+        with open(ready[1], "rb") as fh:
+            st.download_button(f"Tải {fname} ({format_vnd(ready[2])} dòng)", fh, file_name=fname, mime=mime)
+
+def profile_panel(run: dict):
+    """Sidebar: thời gian rerun, tổng theo loại (sql/query/page/chart) và các câu SQL chậm nhất."""
+    s = summarize(run)
+    with st.sidebar.expander(f"⏱ Profiling · {s['ms']:.0f} ms", expanded=False):
+        st.caption(" · ".join(f"{k}: {v['count']}× {v['ms']:.1f} ms" for k, v in sorted(s["by_kind"].items())))
+        if s["spans"]:
+            st.dataframe(pd.DataFrame([(e["kind"], e["name"], e["ms"]) for e in s["spans"]],
+                                      columns=["Loại", "Tên", "ms"]),
+                         hide_index=True, use_container_width=True)
+        if s["slowest_sql"]:
+            st.markdown("**SQL chậm nhất**")
+            st.dataframe(pd.DataFrame([(e["ms"], e.get("rows"), e["sql"][:200]) for e in s["slowest_sql"]],
+                                      columns=["ms", "Dòng", "SQL"]),
+                         hide_index=True, use_container_width=True)
+
+# ==== Widget tính nền ====
+def background_jobs(page: str, uid, jobs: dict) -> dict:
+    """
+    Gửi các job đọc {tên: (fn, *args)} lên thread pool đọc ngay đầu trang; trả về {tên: Future}.
+    - Rerun với cùng tham số + cùng data version khi job cũ còn chạy: dùng lại Future đó
+    - Job của rerun trước không còn cần (đổi khoảng ngày, dữ liệu đổi…) mà chưa xong: huỷ
+    """
+    ex, version = get_pool().reader(), get_query_cache().version(uid)
+    state_key = f"_bg_jobs_{page}"
+    prev = dict(st.session_state.get(state_key, {}))
+    cur = {}
+    for name, (fn, *args) in jobs.items():
+        sig = (name, fn.__module__, fn.__qualname__, version, tuple(args))
+        fut = prev.pop(sig, None)
+        cur[sig] = fut if fut is not None and not fut.done() else ex.submit(fn, *args)
+    for fut in prev.values():
+        ex.cancel(fut)
+    st.session_state[state_key] = cur
+    return {sig[0]: fut for sig, fut in cur.items()}
+
+def pending_slot(text: str = "⏳ Đang tải…"):
+    """Placeholder giữ chỗ cho widget đang tính nền."""
+    ph = st.empty()
+    ph.caption(text)
+    return ph
+
+def fill_when_ready(slots, poll: float = 0.25):
+    """
+    slots = [(Future, placeholder, render(kết_quả))]: vẽ từng widget ngay khi job của nó xong
+    (thứ tự hoàn thành, nhiều slot dùng chung 1 Future được). Trong lúc chờ cập nhật placeholder
+    mỗi `poll` giây — đó cũng là lúc Streamlit dừng script cũ nếu người dùng đã đổi bộ lọc.
+    """
+    pending, t0 = list(slots), time.perf_counter()
+    while pending:
+        wait({fut for fut, _, _ in pending}, timeout=poll, return_when=FIRST_COMPLETED)
+        still = []
+        for fut, ph, render in pending:
+            if not fut.done():
+                still.append((fut, ph, render))
+                continue
+            with ph.container():
+                try:
+                    res = fut.result()
+                except CancelledError:
+                    st.caption("⏹ Đã huỷ.")
+                    continue
+                render(res)
+        for _, ph, _ in still:
+            ph.caption(f"⏳ Đang tính… {time.perf_counter() - t0:.1f}s")
+        pending = still
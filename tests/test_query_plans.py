@@ -0,0 +1,38 @@
+# ==========================================
+# Kiểm tra query plan của các truy vấn nóng trên DB DEMO tạm (user-003).
+# ==========================================
+import datetime as dt
+
+import pytest
+
+from expense_app import db, schema
+from expense_app.maintenance import TX_SCAN_RE, check_query_plans
+
+DEMO_UID = 1
+
+@pytest.fixture
+def demo_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "expense.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    monkeypatch.setattr(schema, "ENABLE_DEMO", True)
+    schema.init_db(path)
+    return path
+
+def last_month():
+    first = dt.date.today().replace(day=1)
+    d1 = (first - dt.timedelta(days=1)).replace(day=1)
+    return d1, first - dt.timedelta(days=1)
+
+def test_hot_queries_use_indexes(demo_db):
+    d1, d2 = last_month()
+    assert check_query_plans(DEMO_UID, d1, d2) == []
+
+def test_check_flags_unindexed_query(demo_db):
+    d1, d2 = last_month()
+    with db.get_pool().connection() as c:
+        for r in c.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='transactions' "
+                           "AND sql IS NOT NULL").fetchall():
+            c.execute(f"DROP INDEX {r['name']}")
+        c.commit()
+    bad = check_query_plans(DEMO_UID, d1, d2)
+    assert bad and all(TX_SCAN_RE.match(detail) for _, detail in bad)